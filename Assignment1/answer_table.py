@@ -0,0 +1,417 @@
+"""CSC148 Assignment 1
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Misha Schwartz, Mario Badr, Christine Murad, Diane Horton, Sophia Huynh
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) 2020 Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+=== Module Description ===
+
+This file contains a class that stores the answers of many students to the
+questions of a survey in one compact column per question, instead of in one
+Answer object per student per question.
+"""
+from __future__ import annotations
+from array import array
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
+from survey import Answer, MultipleChoiceQuestion, NumericQuestion, \
+    CheckboxQuestion, is_valid_answer
+if TYPE_CHECKING:
+    from course import Student
+    from survey import Question
+
+# The code stored in a multiple choice column for a student with no answer
+MISSING = -1
+# The code stored in a column for an answer that is kept in AnswerTable._extra
+EXTRA = -2
+
+Column = Union[array, memoryview, List[Optional[Answer]]]
+Bitmap = Union[bytearray, memoryview]
+
+
+def _kind(question: Question) -> str:
+    """ Return the name of the encoding used to store answers to <question> """
+    if isinstance(question, MultipleChoiceQuestion):
+        return 'choice'
+    if isinstance(question, NumericQuestion):
+        return 'numeric'
+    if isinstance(question, CheckboxQuestion) and len(question.options) <= 64:
+        return 'checkbox'
+    return 'object'
+
+
+class AnswerTable:
+    """
+    A columnar store of answers to a fixed set of questions.
+
+    Each student added to the table is given a row. For each question there is
+    one column holding the answer of every row:
+
+    - multiple choice answers are stored as the index of the chosen option
+      (MISSING if there is no answer),
+    - numeric answers are stored as floats (NaN if there is no answer),
+    - checkbox answers are stored as a bitmask of the chosen options (0 if
+      there is no answer), see CheckboxQuestion.encode_answer,
+    - answers to any other question are stored as Answer objects.
+
+    Answers that cannot be encoded this way (for example an option that is not
+    one of the question's options) are kept as Answer objects in _extra and
+    their column holds EXTRA (or NaN / 0 for numeric / checkbox columns).
+
+    Answers read back from the table are equal in content to the answers that
+    were stored, except that the options of a checkbox answer are returned in
+    the order of the question's options. Rows with the same value in a column
+    are given the same Answer object when they are read back.
+
+    Each answer is validated once, when it is stored, and its validity is kept
+    in a bitmap per question.
+
+    The columns and bitmaps of a table restored with load_columns may be
+    memoryviews (for example of a memory-mapped snapshot file). They are copied
+    into arrays the first time a row is added.
+
+    === Private Attributes ===
+    _questions: a dictionary mapping each question's id to the question itself
+    _kinds: a dictionary mapping each question's id to the name of the
+            encoding used for its column
+    _columns: a dictionary mapping each question's id to its column
+    _answers: a dictionary mapping the id of each multiple choice, numeric
+              and checkbox question to a dictionary mapping each value stored
+              in its column to one shared Answer, used when reading answers
+              back. The Answers for numeric and checkbox values are made the
+              first time the value is read.
+    _codes: a dictionary mapping the id of each multiple choice question to a
+            dictionary mapping each option to its index
+    _rows: a dictionary mapping the id of each student in the table to their
+           row
+    _extra: a dictionary mapping a (question id, row) pair to an answer that
+            could not be encoded in its column
+    _valid: a dictionary mapping each question's id to a bitmap with one byte
+            per row, which is 1 iff that row's answer to the question is valid
+
+    === Representation Invariants ===
+    Every column and every bitmap in _valid has len(_rows) entries
+    Each key in _questions equals the id attribute of its value
+    """
+
+    _questions: Dict[int, Question]
+    _kinds: Dict[int, str]
+    _columns: Dict[int, Column]
+    _answers: Dict[int, Dict[Union[int, float], Answer]]
+    _codes: Dict[int, Dict[object, int]]
+    _rows: Dict[int, int]
+    _extra: Dict[Tuple[int, int], Answer]
+    _valid: Dict[int, Bitmap]
+
+    def __init__(self, questions: List[Question]) -> None:
+        """ Initialize an empty table with a column for each question in
+        <questions>.
+
+        === Precondition ===
+        No two questions in <questions> have the same id
+        """
+        self._questions = {}
+        self._kinds = {}
+        self._columns = {}
+        self._answers = {}
+        self._codes = {}
+        self._rows = {}
+        self._extra = {}
+        self._valid = {}
+        for question in questions:
+            kind = _kind(question)
+            self._valid[question.id] = bytearray()
+            self._questions[question.id] = question
+            self._kinds[question.id] = kind
+            if kind in ('numeric', 'checkbox'):
+                self._answers[question.id] = {}
+            if kind == 'choice':
+                self._answers[question.id] = {i: Answer(option) for i, option
+                                              in enumerate(question.options)}
+                self._codes[question.id] = {option: i for i, option in
+                                            enumerate(question.options)}
+                typecode = 'b' if len(question.options) < 127 else 'h'
+                self._columns[question.id] = array(typecode)
+            elif kind == 'numeric':
+                self._columns[question.id] = array('d')
+            elif kind == 'checkbox':
+                self._columns[question.id] = array('Q')
+            else:
+                self._columns[question.id] = []
+
+    def __len__(self) -> int:
+        """ Return the number of rows in this table """
+        return len(self._rows)
+
+    def __contains__(self, question: Question) -> bool:
+        """ Return True iff this table has a column for a question with the
+        same id as <question>.
+        """
+        return question.id in self._columns
+
+    def get_questions(self) -> List[Question]:
+        """ Return a list of the questions this table has a column for """
+        return list(self._questions.values())
+
+    def has_student(self, student_id: int) -> bool:
+        """ Return True iff the student with id <student_id> has a row in this
+        table.
+        """
+        return student_id in self._rows
+
+    def get_row(self, student_id: int) -> int:
+        """ Return the row of the student with id <student_id>
+
+        === Precondition ===
+        The student with id <student_id> has a row in this table
+        """
+        return self._rows[student_id]
+
+    def get_column(self, question: Question) -> Column:
+        """ Return the column of encoded answers to <question>. The column is
+        not a copy and should not be modified.
+
+        === Precondition ===
+        <question> is in this table
+        """
+        return self._columns[question.id]
+
+    def get_validity(self, question: Question) -> Bitmap:
+        """ Return the bitmap of which rows have a valid answer to <question>.
+        The bitmap is not a copy and should not be modified.
+
+        === Precondition ===
+        <question> is in this table
+        """
+        return self._valid[question.id]
+
+    def get_extra(self, question: Question) -> Dict[int, Answer]:
+        """ Return a dictionary mapping each row whose answer to <question>
+        could not be encoded in its column to that answer.
+
+        === Precondition ===
+        <question> is in this table
+        """
+        return {row: answer for (id_, row), answer in self._extra.items()
+                if id_ == question.id}
+
+    def load_columns(self, student_ids: List[int], columns: Dict[int, Column],
+                     valid: Dict[int, Bitmap],
+                     extra: Dict[Tuple[int, int], Answer]) -> None:
+        """ Fill this table with one row for each id in <student_ids>, in
+        order, using <columns>, <valid> and <extra> as its columns, bitmaps and
+        unencoded answers, without encoding or validating any answer.
+
+        === Precondition ===
+        This table has no rows
+        <columns> and <valid> map the id of each question in this table to a
+            column and bitmap encoded as described in the class docstring,
+            with one entry per id in <student_ids>
+        Each key of <extra> is a (question id, row) pair of this table
+        """
+        self._rows = {id_: row for row, id_ in enumerate(student_ids)}
+        self._columns = dict(columns)
+        self._valid = dict(valid)
+        self._extra = dict(extra)
+
+    def _own_columns(self) -> None:
+        """ Replace every column and bitmap that is a memoryview with a copy
+        that rows can be added to.
+        """
+        for id_, column in self._columns.items():
+            if isinstance(column, memoryview):
+                self._columns[id_] = array(column.format, column)
+        for id_, bitmap in self._valid.items():
+            if isinstance(bitmap, memoryview):
+                self._valid[id_] = bytearray(bitmap)
+
+    def add_student(self, student_id: int) -> int:
+        """ Add a row with no answers for the student with id <student_id> and
+        return it. If the student already has a row, return that row instead.
+        """
+        if student_id in self._rows:
+            return self._rows[student_id]
+        self._own_columns()
+        row = len(self._rows)
+        self._rows[student_id] = row
+        for bitmap in self._valid.values():
+            bitmap.append(0)
+        for id_, column in self._columns.items():
+            kind = self._kinds[id_]
+            if kind == 'choice':
+                column.append(MISSING)
+            elif kind == 'numeric':
+                column.append(float('nan'))
+            elif kind == 'checkbox':
+                column.append(0)
+            else:
+                column.append(None)
+        return row
+
+    def set_answer(self, student_id: int, question: Question,
+                   answer: Answer) -> None:
+        """ Record <answer> as the answer of the student with id <student_id>
+        to <question>.
+
+        === Precondition ===
+        The student with id <student_id> has a row in this table
+        <question> is in this table
+        """
+        row = self._rows[student_id]
+        id_ = question.id
+        self._extra.pop((id_, row), None)
+        self._valid[id_][row] = is_valid_answer(self._questions[id_], answer)
+        kind = self._kinds[id_]
+        column = self._columns[id_]
+        if kind == 'object':
+            column[row] = answer
+            return
+        code = self._encode(id_, answer)
+        if code is None:
+            self._extra[(id_, row)] = answer
+            code = {'choice': EXTRA, 'numeric': float('nan'),
+                    'checkbox': 0}[kind]
+        column[row] = code
+
+    def _encode(self, question_id: int,
+                answer: Answer) -> Optional[Union[int, float]]:
+        """ Return the value stored in the column of the question with id
+        <question_id> for <answer>, or None if <answer> cannot be encoded.
+        """
+        kind = self._kinds[question_id]
+        content = answer.content
+        if kind == 'choice':
+            try:
+                code = self._codes[question_id].get(content)
+            except TypeError:
+                return None
+            # An equal value of another type, such as 1 for True, would be
+            # read back as the option instead
+            options = self._questions[question_id].options
+            if code is None or type(options[code]) is not type(content):
+                return None
+            return code
+        if kind == 'numeric':
+            # Integers are read back as ints and other numbers as floats, so
+            # only those that will be read back unchanged are encoded
+            if type(content) is int and float(content) == content:
+                return float(content)
+            if type(content) is float and content == content and \
+                    not content.is_integer():
+                return content
+            return None
+        question = self._questions[question_id]
+        if isinstance(content, list) and question.validate_answer(answer):
+            return question.encode_answer(answer)
+        return None
+
+    def is_valid(self, student_id: int, question: Question) -> bool:
+        """ Return True iff the student with id <student_id> has a valid answer
+        to <question>.
+
+        The validity recorded when the answer was stored is used, unless
+        <question> is not the question object this table was created with.
+
+        === Precondition ===
+        The student with id <student_id> has a row in this table
+        <question> is in this table
+        """
+        if self._questions[question.id] is not question:
+            return is_valid_answer(question,
+                                   self.get_answer(student_id, question))
+        return self._valid[question.id][self._rows[student_id]] == 1
+
+    def get_answer(self, student_id: int,
+                   question: Question) -> Optional[Answer]:
+        """ Return the answer of the student with id <student_id> to
+        <question>, or None if they have not answered it.
+
+        === Precondition ===
+        The student with id <student_id> has a row in this table
+        <question> is in this table
+        """
+        row = self._rows[student_id]
+        id_ = question.id
+        value = self._columns[id_][row]
+        answers = self._answers.get(id_)
+        if answers is None:
+            return value
+        answer = answers.get(value)
+        if answer is None:
+            answer = self._decode(id_, row, value)
+        return answer
+
+    def get_valid_answers(self, question: Question,
+                          students: List[Student]) -> Optional[List[Answer]]:
+        """ Return the answers of <students> to <question>, or None if any of
+        them does not have a valid answer to it, as Student.has_answer and
+        Student.get_answer would.
+
+        The answers of students attached to this table are read straight from
+        its columns. Any other student's answer is read through the student.
+        """
+        id_ = question.id
+        ours = self._questions.get(id_) is question
+        if ours:
+            rows = self._rows
+            column = self._columns[id_]
+            valid = self._valid[id_]
+            shared = self._answers.get(id_)
+        answers = []
+        for student in students:
+            if not ours or student.get_answer_table() is not self:
+                if not student.has_answer(question):
+                    return None
+                answers.append(student.get_answer(question))
+                continue
+            row = rows[student.id]
+            if not valid[row]:
+                return None
+            value = column[row]
+            if shared is None:
+                answers.append(value)
+                continue
+            answer = shared.get(value)
+            if answer is None:
+                answer = self._decode(id_, row, value)
+            answers.append(answer)
+        return answers
+
+    def _decode(self, question_id: int, row: int,
+                value: Union[int, float]) -> Optional[Answer]:
+        """ Return the answer in <row> of the column of the question with id
+        <question_id>, which holds <value>, or None if there is no answer.
+        Keep the answer to be shared with the other rows holding <value>.
+        """
+        if (question_id, row) in self._extra:
+            return self._extra[(question_id, row)]
+        kind = self._kinds[question_id]
+        if kind == 'choice' or value != value or not value and \
+                kind == 'checkbox':
+            return None
+        if kind == 'numeric':
+            answer = Answer(int(value) if value.is_integer() else value)
+        else:
+            options = self._questions[question_id].options
+            answer = Answer([option for i, option in enumerate(options)
+                             if value >> i & 1])
+        self._answers[question_id][value] = answer
+        return answer
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={'extra-imports': ['typing',
+                                                  'array',
+                                                  'survey']})
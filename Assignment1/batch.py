@@ -0,0 +1,319 @@
+"""CSC148 Assignment 1
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Misha Schwartz, Mario Badr, Christine Murad, Diane Horton, Sophia Huynh
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) 2020 Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+=== Module Description ===
+
+This file contains a class that scores every group of a grouping at once.
+
+The answers of the students in a course are encoded once as one array per
+question. The groups of a grouping are then gathered by size into (groups x
+size) arrays of rows, and the answers of all groups of each size are compared
+in one pass per question.
+"""
+from __future__ import annotations
+from typing import TYPE_CHECKING, Dict, List, Tuple
+import numpy as np
+from criterion import HomogeneousCriterion, HeterogeneousCriterion, \
+    InvalidAnswerError
+from survey import MultipleChoiceQuestion, NumericQuestion, CheckboxQuestion
+from scoring import PAIR_CRITERIA
+from compiled import popcount
+if TYPE_CHECKING:
+    from course import Course
+    from criterion import Criterion
+    from grouper import Group, Grouping
+    from survey import Survey, Question
+
+
+class GroupingScore:
+    """
+    The score of a grouping, with the score of each group and the score of
+    each group on each question.
+
+    === Public Attributes ===
+    score: the score of the grouping, as given by Survey.score_grouping
+    group_scores: the score of each group, in the order of the groups in the
+                  grouping
+    question_scores: an array with a row for each group and a column for each
+                     question, holding the score the question's criterion
+                     gives to the group's answers (before weighting). The row
+                     of a group that scores zero because of an invalid answer
+                     is all zero.
+    questions: the questions, in the order of the columns of question_scores
+    weights: the weight of each question in questions
+
+    === Representation Invariants ===
+    question_scores has shape (len(group_scores), len(questions))
+    """
+
+    score: float
+    group_scores: np.ndarray
+    question_scores: np.ndarray
+    questions: List[Question]
+    weights: np.ndarray
+
+    def __init__(self, group_scores: np.ndarray, question_scores: np.ndarray,
+                 questions: List[Question], weights: np.ndarray) -> None:
+        """ Initialize the score of a grouping whose groups have the scores
+        <group_scores> and per-question scores <question_scores>.
+        """
+        self.group_scores = group_scores
+        self.question_scores = question_scores
+        self.questions = questions
+        self.weights = weights
+        self.score = float(group_scores.mean()) if len(group_scores) else 0.0
+
+    def get_question_score(self, question: Question) -> float:
+        """ Return the average score the criterion of <question> gives to the
+        groups, or 0.0 if there are no groups.
+
+        === Precondition ===
+        <question> is in questions
+        """
+        ids = [q.id for q in self.questions]
+        column = self.question_scores[:, ids.index(question.id)]
+        return float(column.mean()) if len(column) else 0.0
+
+
+class BatchScorer:
+    """
+    A scorer of groupings of the students in a course, according to a survey.
+
+    Multiple choice, numeric and checkbox questions (with at most 64 options)
+    whose criterion is one of PAIR_CRITERIA are scored with array operations
+    over all groups at once. Any other question is scored group by group with
+    its criterion's score_valid_answers method.
+
+    === Private Attributes ===
+    _rows: a dictionary mapping each student's id to their row in the encoded
+           answers
+    _questions: the questions in the survey, in the survey's order
+    _criteria: the criterion associated with each question in _questions
+    _weights: the weight associated with each question in _questions
+    _valid: for each question, an array that is True at a row iff that
+            student has a valid answer to the question
+    _keys: for each question, an array of integer codes such that two rows
+           with valid answers have the same code iff their answers have the
+           same answer key
+    _values: for each question scored with array operations, the encoded
+             answers: codes for multiple choice questions, numbers for numeric
+             questions and option bitmasks for checkbox questions. None for any
+             other question.
+
+    === Representation Invariants ===
+    _questions, _criteria, _valid, _keys and _values have the same length
+    _weights has the same length as _questions
+    Every array in _valid, _keys and _values has len(_rows) entries
+
+    === Precondition ===
+    The answers of the students in the course do not change once the scorer
+    has been created.
+    """
+
+    _rows: Dict[int, int]
+    _questions: List[Question]
+    _criteria: List[Criterion]
+    _weights: np.ndarray
+    _valid: List[np.ndarray]
+    _keys: List[np.ndarray]
+    _values: List[np.ndarray]
+
+    def __init__(self, survey: Survey, course: Course) -> None:
+        """ Initialize a scorer of groupings of the students in <course>
+        according to <survey>, by encoding their answers.
+        """
+        students = course.get_students()
+        self._rows = {student.id: row for row, student in
+                      enumerate(students)}
+        self._questions = list(survey.get_questions())
+        self._criteria = [survey._get_criterion(q) for q in self._questions]
+        self._weights = np.array([survey._get_weight(q)
+                                  for q in self._questions], dtype=np.float64)
+        self._valid = []
+        self._keys = []
+        self._values = []
+        for question, criterion_ in zip(self._questions, self._criteria):
+            answers = [student.get_answer(question) for student in students]
+            valid = np.array([student.has_answer(question)
+                              for student in students], dtype=bool)
+            codes = {}
+            keys = np.full(len(answers), -1, dtype=np.int64)
+            for row, answer in enumerate(answers):
+                if valid[row]:
+                    keys[row] = codes.setdefault(question.answer_key(answer),
+                                                 len(codes))
+            self._valid.append(valid)
+            self._keys.append(keys)
+            if type(criterion_) not in PAIR_CRITERIA:
+                self._values.append(None)
+            else:
+                self._values.append(self._encode(question, answers, valid))
+
+    @staticmethod
+    def _encode(question: Question, answers: List,
+                valid: np.ndarray) -> np.ndarray:
+        """ Return the encoded valid <answers> to <question>, or None if
+        <question> cannot be scored with array operations. Invalid answers are
+        encoded as a value that does not cause division by zero.
+        """
+        if isinstance(question, MultipleChoiceQuestion):
+            codes = {option: i for i, option in enumerate(question.options)}
+            values = np.full(len(answers), -1, dtype=np.int64)
+            for row, answer in enumerate(answers):
+                if valid[row]:
+                    values[row] = codes[answer.content]
+            return values
+        if isinstance(question, NumericQuestion):
+            values = np.zeros(len(answers), dtype=np.float64)
+            for row, answer in enumerate(answers):
+                if valid[row]:
+                    values[row] = answer.content
+            return values
+        if isinstance(question, CheckboxQuestion) and \
+                len(question.options) <= 64:
+            values = np.ones(len(answers), dtype=np.uint64)
+            for row, answer in enumerate(answers):
+                if valid[row]:
+                    values[row] = question.encode_answer(answer)
+            return values
+        return None
+
+    def _gather(self, groups: List[Group]) -> List[Tuple[np.ndarray,
+                                                         np.ndarray]]:
+        """ Return a pair (positions, index) for each size of the groups in
+        <groups>: the positions of the groups of that size in <groups>, and an
+        array with a row for each of those groups holding the rows of its
+        members.
+
+        Groups are gathered by size so that scoring a group never costs more
+        than the number of pairs of its own members.
+        """
+        by_size = {}
+        for position, group in enumerate(groups):
+            by_size.setdefault(len(group), []).append(position)
+        gathered = []
+        for size, positions in by_size.items():
+            index = np.array([[self._rows[member.id] for member in
+                               groups[position].get_members()]
+                              for position in positions], dtype=np.intp)
+            gathered.append((np.array(positions, dtype=np.intp),
+                             index.reshape(len(positions), size)))
+        return gathered
+
+    def score_grouping(self, grouping: Grouping) -> GroupingScore:
+        """
+        Return the score of <grouping>, with the score of each group and of
+        each group on each question. The scores are those given by
+        Survey.score_grouping and Survey.score_students, up to floating point
+        rounding.
+
+        === Precondition ===
+        Every student in <grouping> is enrolled in the course this scorer was
+            created for
+        """
+        groups = grouping.get_groups()
+        scores = np.zeros((len(groups), len(self._questions)))
+        for positions, index in self._gather(groups):
+            scores[positions] = self._score_index(
+                index, [groups[position] for position in positions])
+        group_scores = scores @ self._weights / max(len(self._questions), 1)
+        return GroupingScore(group_scores, scores, self._questions,
+                             self._weights)
+
+    def _score_index(self, index: np.ndarray,
+                     groups: List[Group]) -> np.ndarray:
+        """ Return an array with a row for each of <groups>, whose members are
+        at the rows in the same row of <index>, and a column for each question,
+        holding the score the question's criterion gives to the group.
+
+        === Precondition ===
+        Every group in <groups> has the same size
+        """
+        n_groups, size = index.shape
+        pairs = np.triu(np.ones((size, size), dtype=bool), k=1)
+        scores = np.zeros((n_groups, len(self._questions)))
+        ok = np.full(n_groups, bool(self._questions))
+        for valid in self._valid:
+            ok &= valid[index].all(axis=1)
+        for q, question in enumerate(self._questions):
+            if self._values[q] is None:
+                self._score_groups(q, groups, ok, scores)
+                continue
+            mean = 1.0
+            if size > 1:
+                mean = self._pair_sums(question, self._values[q][index],
+                                       pairs) / (size * (size - 1) / 2)
+            criterion_ = self._criteria[q]
+            if type(criterion_) is HomogeneousCriterion:
+                scores[:, q] = mean
+            elif type(criterion_) is HeterogeneousCriterion:
+                scores[:, q] = 1.0 - mean
+            else:
+                keys = self._keys[q][index]
+                same = keys[:, :, None] == keys[:, None, :]
+                singles = (same.sum(axis=2) == 1).sum(axis=1)
+                scores[:, q] = (size == 1) | (singles == 0)
+        scores[~ok] = 0.0
+        return scores
+
+    @staticmethod
+    def _pair_sums(question: Question, values: np.ndarray,
+                   pairs: np.ndarray) -> np.ndarray:
+        """ Return, for each row of <values>, the sum of the similarities of
+        the answers encoded in <values> at every pair of positions in <pairs>.
+        """
+        left = values[:, :, None]
+        right = values[:, None, :]
+        if isinstance(question, MultipleChoiceQuestion):
+            similarity = (left == right).astype(np.float64)
+        elif isinstance(question, NumericQuestion):
+            span = question._max - question._min
+            similarity = 1.0 - np.abs(left - right) / span
+        else:
+            similarity = popcount(left & right) / popcount(left | right)
+        return np.where(pairs, similarity, 0.0).sum(axis=(1, 2))
+
+    def _score_groups(self, q: int, groups: List[Group], ok: np.ndarray,
+                      scores: np.ndarray) -> None:
+        """ Store in column <q> of <scores> the score that the criterion of
+        question <q> gives to each group in <groups> that is <ok>. A group
+        whose answers the criterion rejects is no longer <ok>.
+        """
+        question = self._questions[q]
+        for i, group in enumerate(groups):
+            if not ok[i]:
+                continue
+            answers = [member.get_answer(question)
+                       for member in group.get_members()]
+            try:
+                scores[i, q] = self._criteria[q].score_valid_answers(question,
+                                                                     answers)
+            except InvalidAnswerError:
+                ok[i] = False
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={'extra-imports': ['typing',
+                                                  'numpy',
+                                                  'criterion',
+                                                  'survey',
+                                                  'scoring',
+                                                  'compiled',
+                                                  'course',
+                                                  'grouper']})
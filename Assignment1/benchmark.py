@@ -0,0 +1,248 @@
+"""CSC148 Assignment 1
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Misha Schwartz, Mario Badr, Christine Murad, Diane Horton, Sophia Huynh
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) 2020 Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+=== Module Description ===
+
+This file contains functions that generate random courses and surveys from a
+seed, and a benchmark that measures how long each grouper takes to group
+courses of different sizes, how much memory it uses and how good its groupings
+are.
+
+Run this file to benchmark the groupers and write the results as JSON, for
+example:
+
+    python benchmark.py --sizes 100 400 --groupers GreedyGrouper \
+        WindowGrouper --output results.json
+"""
+from __future__ import annotations
+import argparse
+import json
+import random
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional, Tuple
+import course
+import criterion
+import grouper
+import survey
+
+# The kinds of question that can be generated
+QUESTION_KINDS = ('multiple_choice', 'numeric', 'yes_no', 'checkbox')
+# The criteria given to generated questions by default, in turn
+DEFAULT_CRITERIA = ('HomogeneousCriterion', 'HeterogeneousCriterion',
+                    'LonelyMemberCriterion')
+# The groupers benchmarked by default
+DEFAULT_GROUPERS = ('AlphaGrouper', 'RandomGrouper', 'GreedyGrouper',
+                    'WindowGrouper')
+
+
+def generate_survey(seed: int,
+                    question_mix: Optional[Dict[str, int]] = None,
+                    n_options: int = 4,
+                    criteria: Optional[List[str]] = None) -> survey.Survey:
+    """
+    Return a survey generated from <seed>.
+
+    <question_mix> maps each kind of question in QUESTION_KINDS to the number
+    of questions of that kind (one of each kind by default). Multiple choice
+    and checkbox questions have <n_options> options and numeric questions have
+    answers from 0 to <n_options>. The questions are given the criteria named
+    in <criteria> (DEFAULT_CRITERIA by default) in turn, and a random weight
+    from 1 to 3.
+
+    === Precondition ===
+    Every key in <question_mix> is in QUESTION_KINDS
+    n_options >= 2
+    Every name in <criteria> is a criterion class in the criterion module
+    """
+    rand = random.Random(seed)
+    if question_mix is None:
+        question_mix = {kind: 1 for kind in QUESTION_KINDS}
+    if not criteria:
+        criteria = list(DEFAULT_CRITERIA)
+    options = [f'option {i}' for i in range(n_options)]
+    questions = []
+    for kind in QUESTION_KINDS:
+        for _ in range(question_mix.get(kind, 0)):
+            id_ = len(questions) + 1
+            text = f'{kind} question {id_}'
+            if kind == 'multiple_choice':
+                questions.append(survey.MultipleChoiceQuestion(id_, text,
+                                                               options))
+            elif kind == 'numeric':
+                questions.append(survey.NumericQuestion(id_, text, 0,
+                                                        n_options))
+            elif kind == 'yes_no':
+                questions.append(survey.YesNoQuestion(id_, text))
+            else:
+                questions.append(survey.CheckboxQuestion(id_, text, options))
+    survey_ = survey.Survey(questions)
+    for i, question in enumerate(questions):
+        survey_.set_criterion(getattr(criterion, criteria[i % len(criteria)])(),
+                              question)
+        survey_.set_weight(rand.randint(1, 3), question)
+    return survey_
+
+
+def _random_answer(rand: random.Random,
+                   question: survey.Question) -> survey.Answer:
+    """ Return a random valid answer to <question> """
+    if isinstance(question, survey.MultipleChoiceQuestion):
+        return survey.Answer(rand.choice(question.options))
+    if isinstance(question, survey.NumericQuestion):
+        return survey.Answer(rand.randint(question._min, question._max))
+    count = rand.randint(1, min(3, len(question.options)))
+    return survey.Answer(rand.sample(question.options, count))
+
+
+def generate_course(n_students: int, survey_: survey.Survey,
+                    seed: int) -> course.Course:
+    """
+    Return a course of <n_students> students generated from <seed>, each with
+    a random valid answer to every question in <survey_>.
+    """
+    rand = random.Random(seed)
+    ids = rand.sample(range(10 * n_students + 10), n_students)
+    students = []
+    for id_ in ids:
+        student = course.Student(id_, f'student {id_}')
+        for question in survey_.get_questions():
+            student.set_answer(question, _random_answer(rand, question))
+        students.append(student)
+    course_ = course.Course('benchmark')
+    course_.enroll_many(students)
+    return course_
+
+
+def generate(n_students: int, seed: int = 0,
+             question_mix: Optional[Dict[str, int]] = None,
+             n_options: int = 4,
+             criteria: Optional[List[str]] = None) -> Tuple[course.Course,
+                                                            survey.Survey]:
+    """
+    Return a course of <n_students> students and a survey they have answered,
+    generated from <seed> as described in generate_survey and generate_course.
+    """
+    survey_ = generate_survey(seed, question_mix, n_options, criteria)
+    return generate_course(n_students, survey_, seed), survey_
+
+
+def run_grouper(grouper_: grouper.Grouper, course_: course.Course,
+                survey_: survey.Survey, measure_memory: bool = True,
+                seed: int = 0) -> Dict[str, Any]:
+    """
+    Return a dictionary with the wall time in seconds that <grouper_> takes to
+    group the students in <course_> ('seconds'), the peak memory in bytes
+    allocated while doing so ('peak_bytes', or None if not <measure_memory>)
+    and the score of its grouping ('score').
+
+    The grouper is timed on a run without tracing allocations, and the peak
+    memory is measured on a second run. The random module is seeded with
+    <seed> before each run, so that groupers that use it (such as
+    RandomGrouper) make the same grouping every time.
+    """
+    random.seed(seed)
+    start = time.perf_counter()
+    grouping = grouper_.make_grouping(course_, survey_)
+    seconds = time.perf_counter() - start
+    peak = None
+    if measure_memory:
+        random.seed(seed)
+        tracemalloc.start()
+        try:
+            grouper_.make_grouping(course_, survey_)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return {'seconds': seconds, 'peak_bytes': peak,
+            'score': survey_.score_grouping(grouping)}
+
+
+def benchmark(grouper_names: List[str], sizes: List[int],
+              group_size: int = 4, seed: int = 0,
+              measure_memory: bool = True,
+              **options: Any) -> List[Dict[str, Any]]:
+    """
+    Return the results of running each grouper class named in <grouper_names>
+    with <group_size> on a generated course of each size in <sizes>.
+
+    Each course is generated from <seed> and <options>, which are passed on to
+    generate, and each grouper is run with <seed> as described in run_grouper.
+    Each result is a dictionary with the 'grouper', number of
+    'students', 'group_size' and the measurements described in run_grouper.
+
+    === Precondition ===
+    Every name in <grouper_names> is a grouper class found by
+        grouper.find_grouper
+    group_size > 1
+    """
+    results = []
+    for size in sizes:
+        course_, survey_ = generate(size, seed, **options)
+        for name in grouper_names:
+            grouper_ = grouper.find_grouper(name)(group_size)
+            result = {'grouper': name, 'students': size,
+                      'group_size': group_size}
+            result.update(run_grouper(grouper_, course_, survey_,
+                                      measure_memory, seed))
+            results.append(result)
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """ Run the benchmark described by the command line arguments <argv>,
+    write its results as JSON and return them.
+    """
+    parser = argparse.ArgumentParser(description='Benchmark the groupers on '
+                                                 'generated courses.')
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[50, 100, 200])
+    parser.add_argument('--groupers', nargs='+',
+                        default=list(DEFAULT_GROUPERS))
+    parser.add_argument('--group-size', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--options', type=int, default=4,
+                        help='options per multiple choice and checkbox '
+                             'question')
+    for kind in QUESTION_KINDS:
+        parser.add_argument(f'--{kind.replace("_", "-")}', type=int,
+                            default=1, help=f'number of {kind} questions')
+    parser.add_argument('--criteria', nargs='+',
+                        default=list(DEFAULT_CRITERIA))
+    parser.add_argument('--no-memory', action='store_true',
+                        help='do not measure peak memory')
+    parser.add_argument('--output', default='-',
+                        help='file to write the JSON results to (default: '
+                             'standard output)')
+    args = parser.parse_args(argv)
+    results = benchmark(args.groupers, args.sizes, args.group_size,
+                        args.seed, not args.no_memory,
+                        question_mix={kind: getattr(args, kind)
+                                      for kind in QUESTION_KINDS},
+                        n_options=args.options, criteria=args.criteria)
+    if args.output == '-':
+        print(json.dumps(results, indent=2))
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == '__main__':
+    main()
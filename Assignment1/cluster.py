@@ -0,0 +1,252 @@
+"""CSC148 Assignment 1
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Misha Schwartz, Mario Badr, Christine Murad, Diane Horton, Sophia Huynh
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) 2020 Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+=== Module Description ===
+
+This file contains a grouper that groups students by clustering their answers
+instead of scoring candidate groups, so that it scales to very large courses.
+
+Each student's answers are embedded as a vector of numbers: multiple choice
+answers as one-hot vectors, numeric answers scaled to the range of the
+question and checkbox answers as vectors of the options chosen. Each question's
+part of the vector is scaled so that the squared distance between two answers
+is at most the weight of the question.
+"""
+from __future__ import annotations
+from typing import TYPE_CHECKING, List, Tuple
+import numpy as np
+from criterion import HeterogeneousCriterion
+from survey import NumericQuestion, CheckboxQuestion
+from grouper import Grouper, Grouping, Group
+if TYPE_CHECKING:
+    from course import Course, Student
+    from survey import Survey, Question
+
+# The number of 2-means iterations used to split a cluster in two
+_SPLIT_ITERATIONS = 3
+
+
+def embed_answers(question: Question, students: List[Student],
+                  weight: float = 1.0) -> np.ndarray:
+    """
+    Return a (len(students) x features) array that embeds the answers of
+    <students> to <question>, scaled so that the squared distance between two
+    rows is at most <weight>. Students without a valid answer have a row of
+    zeros.
+
+    Numeric answers are scaled to the range of the question and checkbox
+    answers are unit vectors of the options chosen. The answers to any other
+    question are one-hot vectors of their answer keys.
+
+    >>> from course import Student
+    >>> from survey import NumericQuestion, Answer
+    >>> q = NumericQuestion(1, 'How many?', 0, 4)
+    >>> students = [Student(1, 'A'), Student(2, 'B')]
+    >>> students[0].set_answer(q, Answer(1))
+    >>> students[1].set_answer(q, Answer(3))
+    >>> embed_answers(q, students).tolist()
+    [[0.25], [0.75]]
+    """
+    valid = [row for row, student in enumerate(students)
+             if student.has_answer(question)]
+    answers = [students[row].get_answer(question) for row in valid]
+    if isinstance(question, NumericQuestion):
+        span = question._max - question._min
+        vectors = np.zeros((len(students), 1))
+        vectors[valid, 0] = [(ans.content - question._min) / span
+                             for ans in answers]
+    elif isinstance(question, CheckboxQuestion):
+        vectors = np.zeros((len(students), len(question.options)))
+        columns = {option: i for i, option in enumerate(question.options)}
+        for row, ans in zip(valid, answers):
+            chosen = [columns[option] for option in ans.content]
+            if chosen:
+                vectors[row, chosen] = 1.0 / np.sqrt(2 * len(chosen))
+    else:
+        codes = {}
+        columns = [codes.setdefault(question.answer_key(ans), len(codes))
+                   for ans in answers]
+        vectors = np.zeros((len(students), len(codes)))
+        vectors[valid, columns] = np.sqrt(0.5)
+    return vectors * np.sqrt(weight)
+
+
+def embed_survey(survey: Survey,
+                 students: List[Student]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return a pair of arrays that embed the answers of <students> to the
+    questions in <survey>, weighted by the weight of each question: the first
+    embeds the questions that students should share answers to and the second
+    embeds the questions with a HeterogeneousCriterion.
+    """
+    similar = [np.zeros((len(students), 0))]
+    different = [np.zeros((len(students), 0))]
+    for question in survey.get_questions():
+        vectors = embed_answers(question, students,
+                                survey._get_weight(question))
+        if isinstance(survey._get_criterion(question),
+                      HeterogeneousCriterion):
+            different.append(vectors)
+        else:
+            similar.append(vectors)
+    return np.hstack(similar), np.hstack(different)
+
+
+def _split(points: np.ndarray, unit: int) -> Tuple[np.ndarray, int]:
+    """
+    Return a pair (order, cut) that splits the rows of <points> into two
+    clusters found by 2-means: the rows at order[:cut] form one cluster and
+    the rows at order[cut:] form the other.
+
+    <cut> is a multiple of <unit>, and the clusters are balanced to that size
+    by moving the rows that are closest to the other cluster.
+
+    === Precondition ===
+    len(points) > unit > 0
+    """
+    n = len(points)
+    cuts = (n - 1) // unit
+    order = np.arange(n)
+    cut = (cuts + 1) // 2 * unit
+    if points.shape[1] == 0:
+        return order, cut
+    # Start from the point farthest from the mean and the point farthest from
+    # that one
+    first = points[np.argmax(((points - points.mean(axis=0)) ** 2).sum(1))]
+    second = points[np.argmax(((points - first) ** 2).sum(1))]
+    for iteration in range(_SPLIT_ITERATIONS):
+        if iteration > 0:
+            first = points[order[:cut]].mean(axis=0)
+            second = points[order[cut:]].mean(axis=0)
+        # How much closer each point is to the first centre than the second
+        closer = points @ (second - first) + \
+            (first @ first - second @ second) / 2
+        cut = min(max(round(int((closer < 0).sum()) / unit), 1), cuts) * unit
+        order = np.argpartition(closer, cut - 1)
+    return order, cut
+
+
+def cluster_order(points: np.ndarray, unit: int) -> np.ndarray:
+    """
+    Return the indices of the rows of <points> in an order such that every
+    <unit> consecutive rows, starting from the first, are close together.
+
+    The rows are split in two by 2-means, and each half is split again, until
+    every cluster has at most <unit> rows. Every cluster has exactly <unit>
+    rows except the last, which may have fewer.
+
+    === Precondition ===
+    unit > 0
+    """
+    points = points.copy()
+    index = np.arange(len(points))
+    stack = [(0, len(points))]
+    while stack:
+        start, stop = stack.pop()
+        if stop - start <= unit:
+            continue
+        order, cut = _split(points[start:stop], unit)
+        points[start:stop] = points[start:stop][order]
+        index[start:stop] = index[start:stop][order]
+        stack.append((start + cut, stop))
+        stack.append((start, start + cut))
+    return index
+
+
+def _spread(points: np.ndarray, rows: np.ndarray, size: int) -> np.ndarray:
+    """
+    Return <rows> reordered so that every <size> consecutive rows form a group
+    whose <points> are far apart.
+
+    The rows are ordered so that similar rows are next to each other, and then
+    dealt out to the groups in turn, so that no group gets two rows from the
+    same cluster of <size> similar rows.
+
+    === Precondition ===
+    len(rows) is a multiple of size
+    """
+    groups = len(rows) // size
+    rows = rows[cluster_order(points[rows], size)]
+    return rows.reshape(size, groups).T.reshape(-1)
+
+
+class ClusterGrouper(Grouper):
+    """
+    A grouper used to create a grouping of students by clustering the
+    embeddings of their answers to a survey.
+
+    Students are put in groups with the students whose answers are closest to
+    theirs on the questions that group members should agree on. Groups are then
+    mixed up in blocks of self.group_size groups so that the students in each
+    group are spread out on the questions with a HeterogeneousCriterion.
+
+    This grouper takes time proportional to n log n for n students rather than
+    scoring candidate groups, so it can group very large courses, but it does
+    not use the scores of the survey's criteria and its groupings usually score
+    lower than those of GreedyGrouper.
+
+    === Public Attributes ===
+    group_size: the ideal number of students that should be in each group
+
+    === Representation Invariants ===
+    group_size > 1
+    """
+
+    group_size: int
+
+    def make_grouping(self, course: Course, survey: Survey) -> Grouping:
+        """
+        Return a grouping for all students in <course> using the questions in
+        <survey> to create the grouping.
+
+        Students are split in two by 2-means clustering of the embeddings of
+        their answers, and each half is split again, until every cluster has
+        self.group_size students. Clusters are balanced at every split so that
+        every group has exactly self.group_size members except for one group,
+        made of similar students, which may have fewer than self.group_size
+        members if that is required to make sure all students in <course> are
+        members of a group.
+        """
+        students = list(course.get_students())
+        similar, different = embed_survey(survey, students)
+        order = cluster_order(similar, self.group_size)
+        full = len(students) // self.group_size * self.group_size
+        if different.shape[1] > 0:
+            block = full
+            if similar.shape[1] > 0:
+                block = self.group_size * self.group_size
+            for start in range(0, full, block):
+                stop = min(start + block, full)
+                order[start:stop] = _spread(different, order[start:stop],
+                                            self.group_size)
+        grouping = Grouping()
+        for start in range(0, len(students), self.group_size):
+            grouping.add_group(Group([students[row] for row in
+                                      order[start:start + self.group_size]]))
+        return grouping
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={'extra-imports': ['typing',
+                                                  'numpy',
+                                                  'criterion',
+                                                  'survey',
+                                                  'grouper',
+                                                  'course']})
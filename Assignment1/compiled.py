@@ -0,0 +1,570 @@
+"""CSC148 Assignment 1
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Misha Schwartz, Mario Badr, Christine Murad, Diane Horton, Sophia Huynh
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) 2020 Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+=== Module Description ===
+
+This file contains a class that describes a survey that has been compiled
+against the students of a single course. Every pairwise similarity is computed
+once when the survey is compiled so that scoring a group of students only needs
+to look up values in a precomputed matrix.
+"""
+from __future__ import annotations
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+import numpy as np
+from criterion import HomogeneousCriterion, HeterogeneousCriterion, \
+    LonelyMemberCriterion, InvalidAnswerError
+from survey import MultipleChoiceQuestion, NumericQuestion, CheckboxQuestion
+from scoring import PAIR_CRITERIA, criterion_score, content_key
+if TYPE_CHECKING:
+    from course import Course, Student
+    from criterion import Criterion
+    from grouper import Grouping
+    from survey import Survey, Question, Answer
+
+# The criteria whose scores are found from the similarity matrices, by their
+# index in this tuple. Any other criterion has the index len(_KINDS).
+_KINDS = (HomogeneousCriterion, HeterogeneousCriterion, LonelyMemberCriterion)
+
+
+def popcount(masks: np.ndarray) -> np.ndarray:
+    """ Return an array of the number of bits set in each element of the
+    unsigned integer array <masks>.
+    """
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(masks)
+    as_bytes = masks[..., None].view(np.uint8)
+    return np.unpackbits(as_bytes, axis=-1).sum(axis=-1)
+
+
+def jaccard_similarity(masks1: np.ndarray, masks2: np.ndarray) -> np.ndarray:
+    """ Return the similarity between every pair of checkbox answers encoded
+    as bitmasks in <masks1> and <masks2>, broadcast against each other.
+
+    The similarity of two answers is the number of options chosen in both
+    divided by the number of options chosen in either one.
+
+    === Precondition ===
+    <masks1> and <masks2> have dtype uint64 and every mask is non-zero
+
+    >>> masks = np.array([0b011, 0b110], dtype=np.uint64)
+    >>> jaccard_similarity(masks[:, None], masks[None, :]).tolist()
+    [[1.0, 0.3333333333333333], [0.3333333333333333, 1.0]]
+    """
+    return popcount(masks1 & masks2) / popcount(masks1 | masks2)
+
+
+class CompiledSurvey:
+    """
+    A survey whose questions have been answered by the students in a course and
+    whose pairwise similarities have been precomputed.
+
+    A compiled survey can be used anywhere a survey is only used to score
+    students (for example as the <survey> argument to a grouper) and will
+    return the same scores, up to floating point rounding.
+
+    === Public Attributes ===
+    survey: the survey this compiled survey was built from
+
+    === Private Attributes ===
+    _rows: a dictionary mapping each student's id to their row in the matrices
+    _questions: the questions in the survey, in the survey's order
+    _criteria: the criterion associated with each question in _questions
+    _weights: the weight associated with each question in _questions
+    _kinds: for each question in _questions, the index of the type of its
+            criterion in _KINDS, or len(_KINDS) if it is of any other type
+    _matrices: for each question in _questions, a student x student matrix
+               of the similarity between each pair of students' answers
+    _valid: for each question in _questions, an array that is True at a row
+            iff that student's answer is a valid answer to the question
+    _complete: an array that is True at a row iff that student has a valid
+               answer to every question in _questions
+    _keys: for each question in _questions, a row of integer codes such that
+           two students with valid answers have the same code iff their
+           answers have the same answer key
+
+    === Representation Invariants ===
+    _questions, _criteria, _weights, _kinds, _matrices, _valid and _keys all
+        have the same length
+    Every matrix in _matrices is symmetric and has shape (len(_rows),
+        len(_rows))
+
+    === Precondition ===
+    The answers of the students in the course do not change once the survey
+    has been compiled.
+    """
+
+    survey: Survey
+    _rows: Dict[int, int]
+    _questions: List[Question]
+    _criteria: List[Criterion]
+    _weights: np.ndarray
+    _kinds: np.ndarray
+    _matrices: np.ndarray
+    _valid: List[np.ndarray]
+    _complete: np.ndarray
+    _keys: np.ndarray
+
+    def __init__(self, survey: Survey, course: Course) -> None:
+        """
+        Initialize a compiled survey by computing the similarity between the
+        answers of every pair of students in <course> for every question in
+        <survey>.
+        """
+        self.survey = survey
+        students = course.get_students()
+        self._rows = {student.id: row for row, student in enumerate(students)}
+        self._questions = list(survey.get_questions())
+        self._criteria = [survey._get_criterion(question)
+                          for question in self._questions]
+        self._weights = np.array([survey._get_weight(question)
+                                  for question in self._questions],
+                                 dtype=np.float64)
+        self._kinds = np.array([_KINDS.index(type(criterion_))
+                                if type(criterion_) in _KINDS
+                                else len(_KINDS)
+                                for criterion_ in self._criteria],
+                               dtype=np.intp)
+        self._matrices = np.zeros((len(self._questions), len(students),
+                                   len(students)), dtype=np.float64)
+        self._valid = []
+        self._complete = np.ones(len(students), dtype=bool)
+        self._keys = np.full((len(self._questions), len(students)), -1,
+                             dtype=np.intp)
+        for i, question in enumerate(self._questions):
+            answers = [student.get_answer(question) for student in students]
+            valid = np.array([student.has_answer(question)
+                              for student in students], dtype=bool)
+            self._valid.append(valid)
+            self._complete &= valid
+            self._keys[i] = self._encode_keys(question, answers, valid)
+            self._matrices[i] = self._similarity_matrix(question, answers,
+                                                        valid)
+
+    def __len__(self) -> int:
+        """ Return the number of students this survey was compiled against """
+        return len(self._rows)
+
+    @staticmethod
+    def _encode_keys(question: Question, answers: List[Optional[Answer]],
+                     valid: np.ndarray) -> np.ndarray:
+        """
+        Return an array of integer codes for <answers> to <question> where two
+        <valid> answers have the same code iff they have the same answer key.
+        Invalid answers all have the code -1.
+        """
+        codes = {}
+        keys = np.full(len(answers), -1, dtype=np.intp)
+        for row, ans in enumerate(answers):
+            if valid[row]:
+                keys[row] = codes.setdefault(question.answer_key(ans),
+                                             len(codes))
+        return keys
+
+    @staticmethod
+    def _similarity_matrix(question: Question,
+                           answers: List[Optional[Answer]],
+                           valid: np.ndarray) -> np.ndarray:
+        """
+        Return a matrix of the similarity between every pair of <answers> to
+        <question>. Entries involving an invalid answer are 0.0.
+        """
+        n = len(answers)
+        rows = np.flatnonzero(valid)
+        matrix = np.zeros((n, n), dtype=np.float64)
+        if isinstance(question, MultipleChoiceQuestion):
+            codes = {option: i for i, option in enumerate(question.options)}
+            values = np.array([codes[answers[row].content] for row in rows])
+            sub = values[:, None] == values[None, :]
+        elif isinstance(question, NumericQuestion):
+            values = np.array([answers[row].content for row in rows],
+                              dtype=np.float64)
+            span = question._max - question._min
+            sub = 1.0 - np.abs(values[:, None] - values[None, :]) / span
+        elif isinstance(question, CheckboxQuestion) and \
+                len(question.options) <= 64:
+            masks = np.array([question.encode_answer(answers[row])
+                              for row in rows], dtype=np.uint64)
+            sub = jaccard_similarity(masks[:, None], masks[None, :])
+        else:
+            sub = np.ones((len(rows), len(rows)), dtype=np.float64)
+            for i, row in enumerate(rows):
+                for j in range(i + 1, len(rows)):
+                    similarity = question.get_similarity(answers[row],
+                                                         answers[rows[j]])
+                    sub[i, j] = similarity
+                    sub[j, i] = similarity
+        matrix[np.ix_(rows, rows)] = sub
+        return matrix
+
+    def _indices(self, students: List[Student]) -> np.ndarray:
+        """ Return the rows of <students> in this compiled survey """
+        return np.fromiter((self._rows[student.id] for student in students),
+                           dtype=np.intp, count=len(students))
+
+    def get_similarities(self, question: Question,
+                         students: List[Student]) -> np.ndarray:
+        """
+        Return a matrix of the precomputed similarity between the answers of
+        every pair of <students> to <question>. Entries involving an invalid
+        answer are 0.0.
+
+        === Precondition ===
+        <question> is in the survey this survey was compiled from
+        Every student in <students> was enrolled in the course this survey was
+            compiled against
+        """
+        i = [q.id for q in self._questions].index(question.id)
+        idx = self._indices(students)
+        return self._matrices[i][np.ix_(idx, idx)]
+
+    def score_students(self, students: List[Student]) -> float:
+        """
+        Return a quality score for <students> calculated in the same way as
+        Survey.score_students, using the precomputed similarities.
+
+        If any student in <students> does not have a valid answer to a question
+        in this survey, or if there are no questions in this survey, return
+        zero.
+
+        === Precondition ===
+        Every student in <students> was enrolled in the course this survey was
+            compiled against
+        len(students) > 0
+        """
+        if not self._questions:
+            return 0.0
+        idx = self._indices(students)
+        for valid in self._valid:
+            if not valid[idx].all():
+                return 0.0
+        score = 0.0
+        for i, question in enumerate(self._questions):
+            try:
+                score += self._score_question(i, idx, students) * \
+                    self._weights[i]
+            except InvalidAnswerError:
+                return 0.0
+        return score / len(self._questions)
+
+    def _score_question(self, i: int, idx: np.ndarray,
+                        students: List[Student]) -> float:
+        """
+        Return the score that the criterion for question <i> gives to the
+        answers of the students at rows <idx>.
+
+        Criteria other than the three provided ones are scored by calling their
+        score_valid_answers method directly.
+        """
+        criterion_ = self._criteria[i]
+        if type(criterion_) not in PAIR_CRITERIA:
+            question = self._questions[i]
+            answers = [student.get_answer(question) for student in students]
+            return criterion_.score_valid_answers(question, answers)
+        sub = self._matrices[i][np.ix_(idx, idx)]
+        pair_sum = (sub.sum() - np.trace(sub)) / 2
+        counts = np.unique(self._keys[i][idx], return_counts=True)[1]
+        return criterion_score(criterion_, len(idx), float(pair_sum),
+                               int((counts == 1).sum()))
+
+    def make_accumulator(self, students: List[Student] = ()) -> \
+            CompiledAccumulator:
+        """ Return an accumulator that scores the group containing <students>
+        with the precomputed similarities of this survey.
+        """
+        return CompiledAccumulator(self, students)
+
+    def _group_scores(self, size: int, pair_sums: np.ndarray,
+                      singles: np.ndarray, valid: np.ndarray,
+                      groups: Optional[List[List[Student]]]) -> np.ndarray:
+        """
+        Return an array of the scores of several groups of <size> students,
+        where column j of <pair_sums> and <singles> holds, for each question,
+        the sum of the similarities of every pair of answers in group j and the
+        number of its answer codes that occur exactly once, and <valid>[j] is
+        True iff every member of group j has a valid answer to every question.
+
+        <groups> holds the members of each group, and is only used to score
+        the questions whose criterion is not one of _KINDS.
+
+        === Precondition ===
+        size > 0
+        groups is not None if any question's criterion is not one of _KINDS
+        """
+        if not self._questions:
+            return np.zeros(len(valid))
+        if size == 1:
+            mean = np.ones(pair_sums.shape)
+            lonely = mean
+        else:
+            mean = pair_sums / (size * (size - 1) / 2)
+            lonely = (singles == 0).astype(np.float64)
+        kinds = self._kinds[:, None]
+        values = np.where(kinds == 0, mean,
+                          np.where(kinds == 1, 1.0 - mean, lonely))
+        valid = valid.copy()
+        for i in np.flatnonzero(self._kinds == len(_KINDS)):
+            question = self._questions[i]
+            for j in np.flatnonzero(valid):
+                answers = [student.get_answer(question)
+                           for student in groups[j]]
+                try:
+                    values[i, j] = self._criteria[i].score_valid_answers(
+                        question, answers)
+                except InvalidAnswerError:
+                    valid[j] = False
+        scores = (values * self._weights[:, None]).sum(axis=0) / \
+            len(self._questions)
+        scores[~valid] = 0.0
+        return scores
+
+    def score_grouping(self, grouping: Grouping) -> float:
+        """ Return a score for <grouping> calculated in the same way as
+        Survey.score_grouping, using the precomputed similarities.
+
+        === Precondition ===
+        Every student in <grouping> was enrolled in the course this survey was
+            compiled against
+        """
+        groups = grouping.get_groups()
+        if not groups:
+            return 0.0
+        score = 0.0
+        for group in groups:
+            score += self.score_students(group.get_members())
+        return score / len(groups)
+
+
+class CompiledAccumulator:
+    """
+    A group of students with the same interface as GroupAccumulator, whose
+    score is kept with the precomputed similarities of a CompiledSurvey.
+
+    For each question, the sum of the members' rows of the question's
+    similarity matrix is kept, so adding or removing a student takes time
+    linear in the number of students the survey was compiled against, and the
+    score of the group with another student added only needs that student's
+    column of these sums. No group is ever rescored from scratch.
+
+    === Private Attributes ===
+    _compiled: the compiled survey used to score the group
+    _members: the students in the group, in the order they were added
+    _rows: the rows of _members in the matrices of _compiled, in the same order
+    _incomplete: the number of members without a valid answer to every
+                 question
+    _totals: for each question, the sum of the rows of _members in the
+             question's similarity matrix
+    _pair_sums: for each question, the sum of the similarities of every pair
+                of members' answers
+    _key_counts: for each question, the number of members whose answer has
+                 each answer code, with invalid answers counted in the last
+                 column
+    _singles: for each question, the number of answer codes counted exactly
+              once in _key_counts
+
+    === Precondition ===
+    Every student given to this accumulator was enrolled in the course the
+        compiled survey was compiled against
+    """
+
+    _compiled: CompiledSurvey
+    _members: List[Student]
+    _rows: List[int]
+    _incomplete: int
+    _totals: np.ndarray
+    _pair_sums: np.ndarray
+    _key_counts: np.ndarray
+    _singles: np.ndarray
+
+    # Whether score and score_with are exactly the values Survey.score_students
+    # would return, rather than equal up to floating point rounding.
+    exact = False
+
+    def __init__(self, compiled: CompiledSurvey,
+                 students: List[Student] = ()) -> None:
+        """
+        Initialize an accumulator for <compiled> whose group contains the
+        students in <students>.
+        """
+        self._compiled = compiled
+        self.clear()
+        for student in students:
+            self.add(student)
+
+    def __len__(self) -> int:
+        """ Return the number of students in the group """
+        return len(self._members)
+
+    def clear(self) -> None:
+        """ Remove every student from the group """
+        questions = len(self._compiled._questions)
+        width = int(self._compiled._keys.max(initial=-1)) + 2
+        self._members = []
+        self._rows = []
+        self._incomplete = 0
+        self._totals = np.zeros((questions, len(self._compiled)))
+        self._pair_sums = np.zeros(questions)
+        self._key_counts = np.zeros((questions, width), dtype=np.intp)
+        self._singles = np.zeros(questions, dtype=np.intp)
+
+    def get_members(self) -> List[Student]:
+        """ Return a list of the students in the group, in the order they were
+        added.
+        """
+        return self._members[:]
+
+    def profile_key(self, student: Student) -> Tuple:
+        """ Return a key such that two students have the same key iff their
+        answers to every question have equal content.
+        """
+        answers = [student.get_answer(q) for q in self._compiled._questions]
+        try:
+            return tuple(None if answer is None else content_key(answer.content)
+                         for answer in answers)
+        except TypeError:
+            return ('student', student.id)
+
+    def _codes(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """ Return the indices into _key_counts of the answers of the students
+        at <rows> to every question, as a pair of (questions x rows) arrays.
+        """
+        codes = self._compiled._keys[:, rows]
+        questions = np.arange(len(codes))[:, None]
+        return questions, codes
+
+    def add(self, student: Student) -> None:
+        """ Add <student> to the group.
+
+        === Precondition ===
+        <student> is not in the group
+        """
+        row = self._compiled._rows[student.id]
+        index = self._codes(np.array([row]))
+        counts = self._key_counts[index][:, 0]
+        self._singles += (counts == 0) * 1 - (counts == 1)
+        self._key_counts[index] += 1
+        self._pair_sums += self._totals[:, row]
+        self._totals += self._compiled._matrices[:, row]
+        self._incomplete += not self._compiled._complete[row]
+        self._members.append(student)
+        self._rows.append(row)
+
+    def remove(self, student: Student) -> None:
+        """ Remove the member of the group with the same id as <student>.
+
+        === Precondition ===
+        A student with the same id as <student> is in the group
+        """
+        index = [member.id for member in self._members].index(student.id)
+        self._members.pop(index)
+        row = self._rows.pop(index)
+        self._totals -= self._compiled._matrices[:, row]
+        self._pair_sums -= self._totals[:, row]
+        index = self._codes(np.array([row]))
+        self._key_counts[index] -= 1
+        counts = self._key_counts[index][:, 0]
+        self._singles += (counts == 1) * 1 - (counts == 0)
+        self._incomplete -= not self._compiled._complete[row]
+
+    def score(self) -> float:
+        """
+        Return the score of the group, equal to calling Survey.score_students
+        on its members (up to floating point rounding).
+
+        === Precondition ===
+        The group is not empty
+        """
+        valid = np.array([self._incomplete == 0])
+        return float(self._compiled._group_scores(
+            len(self._members), self._pair_sums[:, None],
+            self._singles[:, None], valid, [self._members])[0])
+
+    def score_with(self, student: Student) -> float:
+        """
+        Return the score the group would have if <student> were added to it,
+        without adding them.
+
+        === Precondition ===
+        <student> is not in the group
+        """
+        return self.scores_with([student])[0]
+
+    def scores_with(self, students: List[Student]) -> List[float]:
+        """
+        Return the score the group would have with each student in <students>
+        added to it, in the order of <students>, without adding them.
+
+        === Precondition ===
+        No student in <students> is in the group
+        """
+        if not students:
+            return []
+        rows = self._compiled._indices(students)
+        index = self._codes(rows)
+        counts = self._key_counts[index]
+        singles = self._singles[:, None] + (counts == 0) * 1 - (counts == 1)
+        pair_sums = self._pair_sums[:, None] + self._totals[:, rows]
+        valid = self._compiled._complete[rows] & (self._incomplete == 0)
+        groups = None
+        if (self._compiled._kinds == len(_KINDS)).any():
+            groups = [self._members + [student] for student in students]
+        return self._compiled._group_scores(len(self._members) + 1, pair_sums,
+                                            singles, valid, groups).tolist()
+
+    def score_with_swap(self, leaving: Student, joining: Student) -> float:
+        """
+        Return the score the group would have if <leaving> were replaced by
+        <joining>, without changing the group.
+
+        === Precondition ===
+        A student with the same id as <leaving> is in the group
+        <joining> is not in the group
+        """
+        index = [member.id for member in self._members].index(leaving.id)
+        row_out = self._rows[index]
+        row_in = self._compiled._rows[joining.id]
+        matrices = self._compiled._matrices
+        pair_sums = self._pair_sums - self._totals[:, row_out] + \
+            matrices[:, row_out, row_out] + self._totals[:, row_in] - \
+            matrices[:, row_in, row_out]
+        index_out = self._codes(np.array([row_out]))
+        index_in = self._codes(np.array([row_in]))
+        counts = self._key_counts[index_out][:, 0]
+        singles = self._singles + (counts == 2) * 1 - (counts == 1)
+        counts = self._key_counts[index_in][:, 0] - \
+            (index_in[1] == index_out[1])[:, 0]
+        singles += (counts == 0) * 1 - (counts == 1)
+        valid = np.array([self._compiled._complete[row_in] and
+                          self._incomplete ==
+                          (not self._compiled._complete[row_out])])
+        members = self._members[:]
+        members[index] = joining
+        return float(self._compiled._group_scores(
+            len(members), pair_sums[:, None], singles[:, None], valid,
+            [members])[0])
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={'extra-imports': ['typing',
+                                                  'numpy',
+                                                  'criterion',
+                                                  'survey',
+                                                  'scoring',
+                                                  'course',
+                                                  'grouper']})
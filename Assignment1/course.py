@@ -23,8 +23,10 @@ This file contains classes that describe a university course and the students
 who are enrolled in these courses.
 """
 from __future__ import annotations
-from typing import TYPE_CHECKING, List, Tuple, Optional, Dict
+from typing import TYPE_CHECKING, List, Tuple, Optional, Dict, \
+    Iterable
 import survey
+from answer_table import AnswerTable
 
 if TYPE_CHECKING:
     from survey import Answer, Survey, Question
@@ -56,19 +58,39 @@ class Student:
     id: the id of the student
     name: the name of the student
     _questions: a dictionary of questions and answers the student has answered
+    _table: an answer table with a row for this student that holds their
+            answers to the questions it has columns for, or None
+    _validity: a dictionary mapping the id of each question in _questions to
+               the question the answer was recorded for and whether the answer
+               is valid for it
 
     === Representation Invariants ===
     name is not the empty string
+    No key in _questions is the id of a question in _table
+    _validity has the same keys as _questions
+
+    === Precondition ===
+    The content of an answer is not changed after it has been recorded with
+    set_answer, since its validity is only checked then.
+
+    Students have __slots__, so other attributes (such as a section) can only
+    be added by a subclass.
     """
 
+    __slots__ = ('id', 'name', '_questions', '_table', '_validity')
+
     id: int
     name: str
     _questions: Dict[int: Answer]
+    _table: Optional[AnswerTable]
+    _validity: Dict[int, Tuple[Question, bool]]
 
     def __init__(self, id_: int, name: str) -> None:
         """ Initialize a student with name <name> and id <id>"""
         self.id = id_
         self._questions = {}
+        self._table = None
+        self._validity = {}
         if name == '':
             raise AttributeError
         self.name = name
@@ -82,28 +104,81 @@ class Student:
         Return True iff this student has an answer for a question with the same
         id as <question> and that answer is a valid answer for <question>.
         """
-        if question.id not in self._questions:
+        if self._table is not None and question in self._table:
+            return self._table.is_valid(self.id, question)
+        if question.id not in self._validity:
             return False
-        else:
-            return survey.Answer.is_valid(self._questions[question.id],
-                                          question)
+        recorded, valid = self._validity[question.id]
+        if recorded is question:
+            return valid
+        return survey.is_valid_answer(question, self._questions[question.id])
 
     def set_answer(self, question: Question, answer: Answer) -> None:
         """
         Record this student's answer <answer> to the question <question>.
+
+        Whether <answer> is valid for <question> is checked once here, and is
+        then read by has_answer.
+        """
+        if self._table is not None and question in self._table:
+            self._table.set_answer(self.id, question, answer)
+        else:
+            self._store(question, answer)
+
+    def _store(self, question: Question, answer: Answer) -> None:
+        """
+        Record <answer> to <question> in this student's own dictionary of
+        answers, along with whether it is valid.
         """
         self._questions[question.id] = answer
+        self._validity[question.id] = (question,
+                                       survey.is_valid_answer(question, answer))
 
     def get_answer(self, question: Question) -> Optional[Answer]:
         """
         Return this student's answer to the question <question>. Return None if
         this student does not have an answer to <question>
         """
-        if question.id not in self._questions:
+        if self._table is not None and question in self._table:
+            return self._table.get_answer(self.id, question)
+        elif question.id not in self._questions:
             return None
         else:
             return self._questions[question.id]
 
+    def get_answer_table(self) -> Optional[AnswerTable]:
+        """ Return the answer table holding this student's answers to the
+        questions it has columns for, or None if there is no such table.
+        """
+        return self._table
+
+    def _attach(self, table: AnswerTable) -> None:
+        """
+        Move this student's answers to the questions in <table> into their row
+        of <table>, which is added if they do not have one yet. Answers held in
+        a table this student was attached to before are moved back to this
+        student first.
+        """
+        if self._table is table:
+            return
+        if self._table is not None:
+            old, self._table = self._table, None
+            for question in old.get_questions():
+                answer = old.get_answer(self.id, question)
+                if answer is not None:
+                    self._store(question, answer)
+        table.add_student(self.id)
+        self._table = table
+        for question in table.get_questions():
+            if question.id in self._questions:
+                del self._validity[question.id]
+                table.set_answer(self.id, question,
+                                 self._questions.pop(question.id))
+        # Dictionaries do not shrink when keys are deleted, so copy what is
+        # left of them to free the space the moved answers took
+        self._questions = dict(self._questions)
+        self._validity = dict(self._validity)
+
 
 class Course:
     """
@@ -113,13 +188,29 @@ class Course:
     name: the name of the course
     students: a list of students enrolled in the course
 
+    === Private Attributes ===
+    _table: the answer table holding the answers of the students in this
+            course, or None if their answers are kept by each student
+    _index: a dictionary mapping the id of each student in this course to the
+            student
+    _sorted: the students in this course, in order of id if _view is not
+             None
+    _view: a tuple of the students in _sorted, or None if students were
+           enrolled since it was made
+
     === Representation Invariants ===
     - No two students in this course have the same id
     - name is not the empty string
+    - If _table is not None, every student in students is attached to it
+    - _index and _sorted contain exactly the students in students
     """
 
     name: str
     students: List[Student]
+    _table: Optional[AnswerTable]
+    _index: Dict[int, Student]
+    _sorted: List[Student]
+    _view: Optional[Tuple[Student, ...]]
 
     def __init__(self, name: str) -> None:
         """
@@ -129,6 +220,10 @@ class Course:
             raise AttributeError
         self.name = name
         self.students = []
+        self._table = None
+        self._index = {}
+        self._sorted = []
+        self._view = None
 
     def enroll_students(self, students: List[Student]) -> None:
         """
@@ -137,36 +232,85 @@ class Course:
         If adding any student would violate a representation invariant,
         do not add any of the students in <students> to the course.
         """
-        curr_students = self.students[:]
-        if not curr_students:
-            valid_students = self._check_duplicates(students)
-            self.students = valid_students
-        else:
-            valid_students = self._check_duplicates(students)
+        self.enroll_many(students)
+
+    def enroll_many(self, students: Iterable[Student]) -> int:
+        """
+        Enroll the students in <students> in the same way as enroll_students
+        and return the number of students that were enrolled. A student whose
+        id is already used by a student in this course, or by an earlier
+        student in <students>, is not enrolled.
+
+        <students> may be any iterable, and is only iterated over once. This
+        takes time linear in the number of students in <students>.
+        """
+        valid_students = self._check_duplicates(students)
+        if not valid_students:
+            return 0
+        for student in valid_students:
+            self._index[student.id] = student
+        self.students.extend(valid_students)
+        self._sorted.extend(valid_students)
+        self._view = None
+        if self._table is not None:
             for student in valid_students:
-                self.students.append(student)
+                student._attach(self._table)
+        return len(valid_students)
 
-    def _check_duplicates(self, students: List[Student]) -> List[Student]:
+    def _check_duplicates(self, students: Iterable[Student]) -> List[Student]:
         """
-        Return a list of students from <students> after checking that <students>
-        does not contain any duplicates and that each student in <students>
-        isn't already part of self.students
+        Return a list of the students from <students> whose id is not used by a
+        student in self.students or by an earlier student in <students>.
         """
-        list_id = []
+        seen = set()
         valid = []
         for student in students:
-            if student.id not in list_id:
+            if student.id not in seen and student.id not in self._index:
                 valid.append(student)
-                list_id.append(student.id)
-        if len(self.students) == 0:
-            return valid
-        valid_students = []
-        for new_student in valid:
-            for curr_student in self.students:
-                if not curr_student.id == new_student.id:
-                    valid_students.append(new_student)
+                seen.add(student.id)
+        return valid
+
+    def get_student(self, id_: int) -> Optional[Student]:
+        """
+        Return the student enrolled in this course with the id <id_>, or None if
+        there is no such student.
+        """
+        return self._index.get(id_)
+
+    def attach_answer_table(self, questions: List[Question]) -> AnswerTable:
+        """
+        Store the answers of every student in this course (and every student
+        enrolled later) to <questions> in a new AnswerTable, and return it.
+
+        Students keep answering questions and reading their answers through
+        Student.set_answer and Student.get_answer, which use the table for the
+        questions it has columns for.
 
-        return valid_students
+        === Precondition ===
+        No two questions in <questions> have the same id
+        """
+        table = AnswerTable(list(questions))
+        self.set_answer_table(table)
+        return table
+
+    def set_answer_table(self, table: AnswerTable) -> None:
+        """
+        Store the answers of every student in this course (and every student
+        enrolled later) to the questions in <table> in <table>.
+
+        Students that already have a row in <table> keep the answers in that
+        row, except for answers they hold themselves, which are moved into it.
+        """
+        self._table = table
+        for student in self.students:
+            student._attach(table)
+
+    def get_answer_table(self) -> Optional[AnswerTable]:
+        """
+        Return the answer table holding the answers of the students in this
+        course, or None if there is no such table.
+        """
+        return self._table
 
     def all_answered(self, surveys: Survey) -> bool:
         """
@@ -188,10 +332,16 @@ class Course:
 
         Hint: the sort_students function might be useful
         """
-        return tuple(sort_students(self.students, 'id'))
+        if self._view is None:
+            # The students enrolled before are already sorted, so this takes
+            # time linear in their number
+            self._sorted.sort(key=lambda s: s.id)
+            self._view = tuple(self._sorted)
+        return self._view
 
 
 if __name__ == '__main__':
     import python_ta
 
-    python_ta.check_all(config={'extra-imports': ['typing', 'survey']})
+    python_ta.check_all(config={'extra-imports': ['typing', 'survey',
+                                                  'answer_table']})
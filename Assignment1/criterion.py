@@ -23,6 +23,7 @@ This file contains classes that describe different types of criteria used to
 evaluate a group of answers to a survey question.
 """
 from __future__ import annotations
+from collections import Counter
 from typing import TYPE_CHECKING, List
 if TYPE_CHECKING:
     from survey import Question, Answer
@@ -53,6 +54,30 @@ class Criterion:
         """
         raise NotImplementedError
 
+    def score_valid_answers(self, question: Question,
+                            answers: List[Answer]) -> float:
+        """
+        Return the same score as score_answers for <answers>, which are already
+        known to be valid answers to <question>.
+
+        Implementations may skip validating <answers>. By default this calls
+        score_answers.
+
+        === Precondition ===
+        Every answer in <answers> is a valid answer to <question>
+        """
+        return self.score_answers(question, answers)
+
+
+def _check_answers(question: Question, answers: List[Answer]) -> None:
+    """
+    Raise InvalidAnswerError if any answer in <answers> is not a valid answer
+    to <question>.
+    """
+    for answer in answers:
+        if not question.validate_answer(answer):
+            raise InvalidAnswerError
+
 
 class HomogeneousCriterion(Criterion):
     """
@@ -80,21 +105,22 @@ class HomogeneousCriterion(Criterion):
         === Precondition ===
         len(answers) > 0
         """
-        for answer in answers:
-            if not question.validate_answer(answer):
-                raise InvalidAnswerError
+        _check_answers(question, answers)
+        return self.score_valid_answers(question, answers)
+
+    def score_valid_answers(self, question: Question,
+                            answers: List[Answer]) -> float:
+        """
+        Return the same score as score_answers for <answers> without
+        validating them.
+
+        === Precondition ===
+        len(answers) > 0
+        Every answer in <answers> is a valid answer to <question>
+        """
         if len(answers) == 1:
             return 1.0
-        score = 0
-        permute = 0
-        for ans in answers:
-            i = answers.index(ans)
-            for other in answers:
-                j = answers.index(other)
-                if i < j:
-                    score += question.get_similarity(ans, other)
-                    permute += 1
-        return score / permute
+        return question.get_group_similarity(answers)
 
 
 
@@ -123,7 +149,21 @@ class HeterogeneousCriterion(HomogeneousCriterion):
         === Precondition ===
         len(answers) > 0
         """
-        score = HomogeneousCriterion.score_answers(self, question, answers)
+        _check_answers(question, answers)
+        return self.score_valid_answers(question, answers)
+
+    def score_valid_answers(self, question: Question,
+                            answers: List[Answer]) -> float:
+        """
+        Return the same score as score_answers for <answers> without
+        validating them.
+
+        === Precondition ===
+        len(answers) > 0
+        Every answer in <answers> is a valid answer to <question>
+        """
+        score = HomogeneousCriterion.score_valid_answers(self, question,
+                                                         answers)
         return 1.0 - score
 
 
@@ -143,7 +183,8 @@ class LonelyMemberCriterion(HomogeneousCriterion):
         <answers> and will be 1.0 otherwise.
 
         An answer is not unique if there is at least one other answer in
-        <answers> with identical content.
+        <answers> that is the same answer (see Question.answer_key). A single
+        answer is never unique.
 
         Raise InvalidAnswerError if any answer in <answers> is not a valid
         answer to <question>.
@@ -151,18 +192,32 @@ class LonelyMemberCriterion(HomogeneousCriterion):
         === Precondition ===
         len(answers) > 0
         """
-        score = HomogeneousCriterion.score_answers(self, question, answers)
-        if score == 1.0:
-            return 1.0
-        else:
-            responses = [a.content for a in answers]
-            for answer in answers:
-                if responses.count(answer.content) == 1:
-                    return 0.0
+        _check_answers(question, answers)
+        return self.score_valid_answers(question, answers)
+
+    def score_valid_answers(self, question: Question,
+                            answers: List[Answer]) -> float:
+        """
+        Return the same score as score_answers for <answers> without
+        validating them.
+
+        The answers are counted by their keys in a single pass.
+
+        === Precondition ===
+        len(answers) > 0
+        Every answer in <answers> is a valid answer to <question>
+        """
+        if len(answers) == 1:
             return 1.0
+        counts = Counter(question.answer_key(answer) for answer in answers)
+        for count in counts.values():
+            if count == 1:
+                return 0.0
+        return 1.0
 
 
 if __name__ == '__main__':
     import python_ta
     python_ta.check_all(config={'extra-imports': ['typing',
+                                                  'collections',
                                                   'survey']})
@@ -17,12 +17,23 @@ All of the files in this directory and all subdirectories are:
 Copyright (c) 2020 Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
 Sophia Huynh and Jaisie Sin
 """
+import argparse
 import json
-from typing import Dict, Any
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, TextIO, List, Optional, Tuple, Union
 import grouper
 import course
 import criterion
 import survey
+import snapshot
+
+# The data shared by the worker processes of run_groupers: the course, the
+# survey used to make groupings and the survey used to score them.
+_worker_data = None
+
+# The characters that can come right after a JSON value (or an object's key)
+_DELIMITERS = ',]}: \t\n\r'
 
 
 def _load_criterion(data: Dict[str, Any]) -> criterion.Criterion:
@@ -76,40 +87,316 @@ def load_data(json_filename: str) -> Dict[str, Any]:
 
 def answer_questions(survey_: survey.Survey,
                      course_: course.Course,
-                     data: Dict[str, Any]) -> None:
+                     data: Dict[str, Any],
+                     pool: Optional[survey.AnswerPool] = None) -> None:
     """
     Answer the questions in <survey_> by assigning answers to the
     student in <course_> accoding to the data in <data>
+
+    Students who give the same answer to a question share one answer from
+    <pool>, or from a new pool if <pool> is None.
     """
+    if pool is None:
+        pool = survey.AnswerPool()
     students = {s.id: s for s in course_.get_students()}
     questions = {q.id: q for q in survey_.get_questions()}
     for s_data in data['students']:
         student = students[s_data['id']]
         for a_data in s_data['answers']:
             question = questions[a_data['question_id']]
-            answer = survey.Answer(a_data['answer'])
+            answer = pool.get_answer(question, a_data['answer'])
             student.set_answer(question, answer)
 
 
+
+class _JSONReader:
+    """
+    A reader of the JSON values in a text file, one value at a time.
+
+    Only the part of the file that has not been decoded yet is kept in memory,
+    so a large file can be read one record at a time.
+
+    === Private Attributes ===
+    _file: the file being read
+    _chunk_size: the number of characters read from _file at a time
+    _buffer: the characters read from _file that have not been discarded
+    _pos: the index in _buffer of the first character not yet decoded
+    _eof: True iff all of _file has been read
+    _decoder: the decoder used to decode each value
+    """
+
+    _file: TextIO
+    _chunk_size: int
+    _buffer: str
+    _pos: int
+    _eof: bool
+    _decoder: json.JSONDecoder
+
+    def __init__(self, file: TextIO, chunk_size: int) -> None:
+        """ Initialize a reader of <file> that reads <chunk_size> characters at
+        a time.
+        """
+        self._file = file
+        self._chunk_size = chunk_size
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _read(self) -> bool:
+        """ Discard the decoded part of the buffer and add the next chunk of
+        the file to it. Return False iff the whole file has already been read.
+        """
+        if self._eof:
+            return False
+        chunk = self._file.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self) -> str:
+        """ Skip any whitespace and return the next character, or the empty
+        string if the end of the file has been reached.
+        """
+        while True:
+            while self._pos < len(self._buffer) and \
+                    self._buffer[self._pos] in ' \t\n\r':
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read():
+                return ''
+
+    def skip(self, char: str) -> bool:
+        """ Skip over the character <char> and return True if it is the next
+        character that is not whitespace. Otherwise return False.
+        """
+        if self._peek() == char:
+            self._pos += 1
+            return True
+        return False
+
+    def expect(self, char: str) -> None:
+        """ Skip over the character <char>, which must be the next character
+        that is not whitespace. Raise a JSONDecodeError if it is not.
+        """
+        if not self.skip(char):
+            raise json.JSONDecodeError(f'Expecting {char!r}', self._buffer,
+                                       self._pos)
+
+    def decode(self) -> Any:
+        """ Decode and return the next JSON value.
+
+        A value is only accepted once the character after it is one that can
+        follow a JSON value (a delimiter in _DELIMITERS), or the whole file
+        has been read. Otherwise it is decoded again once more of the file has
+        been read, since a number or literal could continue in the next chunk
+        (for example, "2020." decodes as 2020 until "25" is read).
+        """
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._read():
+                    raise
+                continue
+            if (end < len(self._buffer) and
+                    self._buffer[end] in _DELIMITERS) or not self._read():
+                self._pos = end
+                return value
+
+
+def _answer_student(students: Dict[int, course.Student],
+                    questions: Dict[int, survey.Question],
+                    s_data: Dict[str, Any], pool: survey.AnswerPool) -> None:
+    """
+    Create the student described by <s_data>, unless a student with their id is
+    already in <students>, and assign their answers to the questions in
+    <questions>, taken from <pool>, in the same way as answer_questions.
+    """
+    if s_data['id'] not in students:
+        students[s_data['id']] = course.Student(s_data['id'], s_data['name'])
+    student = students[s_data['id']]
+    for a_data in s_data['answers']:
+        question = questions[a_data['question_id']]
+        answer = pool.get_answer(question, a_data['answer'])
+        student.set_answer(question, answer)
+
+
+def stream_course(json_filename: str, survey_: survey.Survey,
+                  chunk_size: int = 1 << 16,
+                  pool: Optional[survey.AnswerPool] = None) -> course.Course:
+    """
+    Return a course created from the course json file <json_filename>, with
+    the answers of its students to the questions in <survey_> assigned. The
+    result is the same as calling load_course and then answer_questions on the
+    data in <json_filename>.
+
+    The file is parsed one student at a time, reading <chunk_size> characters
+    at a time, and each student's data is discarded once their answers have
+    been assigned, so the whole file is never held in memory. Students who
+    give the same answer to a question share one answer from <pool>, or from a
+    new pool if <pool> is None.
+
+    === Precondition ===
+    chunk_size > 0
+    """
+    if pool is None:
+        pool = survey.AnswerPool()
+    questions = {q.id: q for q in survey_.get_questions()}
+    students = {}
+    data = {}
+    with open(json_filename) as f:
+        reader = _JSONReader(f, chunk_size)
+        reader.expect('{')
+        while not reader.skip('}'):
+            key = reader.decode()
+            reader.expect(':')
+            if key != 'students':
+                value = reader.decode()
+                if key == 'name':
+                    data[key] = value
+            else:
+                reader.expect('[')
+                while not reader.skip(']'):
+                    _answer_student(students, questions, reader.decode(),
+                                    pool)
+                    if not reader.skip(','):
+                        reader.expect(']')
+                        break
+            if not reader.skip(','):
+                reader.expect('}')
+                break
+    course_ = course.Course(data['name'])
+    course_.enroll_many(students.values())
+    return course_
+
+
+def _init_worker(data: Union[str, Tuple[course.Course, Any,
+                                             survey.Survey]]) -> None:
+    """ Set up a worker process of run_groupers with <data>, which is either
+    the name of a snapshot file to load or the data itself.
+    """
+    global _worker_data
+    if isinstance(data, str):
+        course_, survey_ = snapshot.load_snapshot(data)
+        data = (course_, survey_, survey_)
+    _worker_data = data
+
+
+def _run_grouper(name: str, group_size: int) -> Dict[str, Any]:
+    """ Return the result of grouping the students of the worker's course
+    with the grouper class <name> and <group_size>, as described in
+    run_groupers.
+    """
+    course_, grouping_survey, survey_ = _worker_data
+    grouper_ = grouper.find_grouper(name)(group_size)
+    start = time.perf_counter()
+    grouping = grouper_.make_grouping(course_, grouping_survey)
+    seconds = time.perf_counter() - start
+    return {'grouper': name, 'group_size': group_size,
+            'score': survey_.score_grouping(grouping), 'seconds': seconds,
+            'groups': [[member.id for member in group.get_members()]
+                       for group in grouping.get_groups()]}
+
+
+def run_groupers(data: Union[str, Tuple[course.Course, Any, survey.Survey]],
+                 grouper_names: List[str], group_sizes: List[int],
+                 workers: int = 1) -> List[Dict[str, Any]]:
+    """
+    Return the result of grouping the students of a course with each grouper
+    class named in <grouper_names> and each group size in <group_sizes>.
+
+    <data> is either the name of a snapshot file holding the course and the
+    survey, or a tuple of the course, the survey (or a survey compiled against
+    the course) used to make groupings, and the survey used to score them.
+
+    Each result is a dictionary with the 'grouper', 'group_size', the 'score'
+    of the grouping, the 'seconds' it took to make and the ids of the members
+    of each of its 'groups'. Results are in the order of <grouper_names>, then
+    of <group_sizes>.
+
+    If <workers> > 1, the combinations are run concurrently by that many
+    worker processes. <data> is sent to each worker once, when it starts (a
+    snapshot file is loaded by each worker instead, sharing its pages).
+
+    === Precondition ===
+    Every name in <grouper_names> is a grouper class found by
+        grouper.find_grouper
+    Every size in <group_sizes> is greater than 1
+    """
+    jobs = [(name, size) for name in grouper_names for size in group_sizes]
+    if workers <= 1:
+        _init_worker(data)
+        return [_run_grouper(name, size) for name, size in jobs]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(data,)) as executor:
+        futures = [executor.submit(_run_grouper, name, size)
+                   for name, size in jobs]
+        return [future.result() for future in futures]
+
+
+def main(argv: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """ Group the students of a course as described by the command line
+    arguments <argv>, print the results and return them.
+    """
+    parser = argparse.ArgumentParser(
+        description='Group the students of a course using a survey.')
+    parser.add_argument('course_file', nargs='?',
+                        default='example_course.json')
+    parser.add_argument('survey_file', nargs='?',
+                        default='example_survey.json')
+    parser.add_argument('--snapshot',
+                        help='load the course and survey from this snapshot '
+                             'file instead of the json files')
+    parser.add_argument('--groupers', nargs='+', default=['GreedyGrouper'],
+                        help='names of the grouper classes to run')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[4],
+                        help='group sizes to run each grouper with')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of worker processes')
+    parser.add_argument('--compile', action='store_true',
+                        help='precompute the similarities between students '
+                             'once before grouping')
+    parser.add_argument('--json', action='store_true',
+                        help='print the results as json')
+    args = parser.parse_args(argv)
+
+    if args.snapshot is not None:
+        course_, survey_ = snapshot.load_snapshot(args.snapshot)
+    else:
+        survey_ = load_survey(load_data(args.survey_file))
+        course_ = stream_course(args.course_file, survey_)
+    grouping_survey = survey_
+    if args.compile:
+        import compiled
+        grouping_survey = compiled.CompiledSurvey(survey_, course_)
+    if args.snapshot is not None and not args.compile:
+        data = args.snapshot
+    else:
+        data = (course_, grouping_survey, survey_)
+    results = run_groupers(data, args.groupers, args.sizes, args.workers)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return results
+    for result in results:
+        grouping = grouper.Grouping()
+        for ids in result['groups']:
+            grouping.add_group(grouper.Group([course_.get_student(id_)
+                                              for id_ in ids]))
+        print(f'Grouper Type: {result["grouper"]}',
+              f'Group Size: {result["group_size"]}',
+              f'Grouping:\n{grouping}',
+              f'Score: {result["score"]}',
+              f'Seconds: {result["seconds"]:.3f}',
+              sep='\n\n', end='\n\n')
+    return results
+
+
 if __name__ == '__main__':
-    course_file = 'example_course.json'
-    survey_file = 'example_survey.json'
-
-    course_data = load_data(course_file)
-    survey_data = load_data(survey_file)
-
-    new_survey = load_survey(survey_data)
-    new_course = load_course(course_data)
-    answer_questions(new_survey, new_course, course_data)
-
-    # change the two variables below to test your code with different group
-    # sizes and grouper types.
-    group_size = 4
-    grouper_type = grouper.GreedyGrouper
-
-    grouping = grouper_type(group_size).make_grouping(new_course, new_survey)
-    score = new_survey.score_grouping(grouping)
-    print(f'Grouper Type: {grouper_type.__name__}',
-          f'Grouping:\n{grouping}',
-          f'Score: {score}',
-          sep='\n\n')
+    main()
@@ -25,11 +25,28 @@ questions. This file also contain a classe that describes a group of students as
 well as a grouping (a group of groups).
 """
 from __future__ import annotations
+import importlib
+import math
 import random
-from typing import TYPE_CHECKING, List, Any
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Any, Optional, Dict, \
+    FrozenSet, Callable, Hashable, Tuple, Union
 from course import sort_students, Course, Student
-if TYPE_CHECKING:
-    from survey import Survey
+from criterion import HomogeneousCriterion, HeterogeneousCriterion, \
+    LonelyMemberCriterion
+from survey import Question, Survey
+from scoring import make_accumulator, best_candidate, at_least, is_close, \
+    Accumulator, content_key
+
+# The modules other than this one that define groupers. They need numpy, so
+# they are only imported when one of their groupers is looked up by name.
+GROUPER_MODULES = ('cluster',)
+
+# The state of a worker process used by GreedyGrouper: an accumulator for the
+# survey and a dictionary mapping each student's id to the student.
+_greedy_worker = None
 
 
 
@@ -94,9 +111,55 @@ def windows(lst: List[Any], n: int) -> List[List[Any]]:
     return new_lst
 
 
+def find_grouper(name: str) -> type:
+    """
+    Return the grouper class called <name>, defined either in this module or
+    in one of GROUPER_MODULES. Raise AttributeError if there is no such
+    grouper.
 
+    >>> find_grouper('AlphaGrouper') is AlphaGrouper
+    True
+    """
+    found = globals().get(name)
+    for module_name in GROUPER_MODULES:
+        if found is not None:
+            break
+        found = getattr(importlib.import_module(module_name), name, None)
+    if not (isinstance(found, type) and issubclass(found, Grouper)):
+        raise AttributeError(f'there is no grouper called {name}')
+    return found
 
 
+def _init_greedy_worker(survey: Survey, students: List[Student]) -> None:
+    """
+    Set up a GreedyGrouper worker process to score groups of <students> with
+    <survey>. This runs once per worker, so the survey and the students are
+    only sent to each worker once.
+    """
+    global _greedy_worker
+    _greedy_worker = (make_accumulator(survey),
+                      {student.id: student for student in students})
+
+
+def _score_greedy_candidates(member_ids: List[int],
+                             candidate_ids: List[int]) -> List[float]:
+    """
+    Return the score of the group of the students with ids <member_ids> plus
+    each student with an id in <candidate_ids>, in the order of
+    <candidate_ids>. Runs in a worker set up by _init_greedy_worker.
+
+    The worker's group is only rebuilt when <member_ids> does not extend it, so
+    a worker keeps its cached similarities while a group grows.
+    """
+    group, students = _greedy_worker
+    current = [member.id for member in group.get_members()]
+    if current != member_ids[:len(current)]:
+        group.clear()
+        current = []
+    for id_ in member_ids[len(current):]:
+        group.add(students[id_])
+    return group.scores_with([students[id_] for id_ in candidate_ids])
+
 
 class Grouper:
     """
@@ -220,12 +283,30 @@ class GreedyGrouper(Grouper):
 
     === Public Attributes ===
     group_size: the ideal number of students that should be in each group
+    workers: the number of processes used to score the candidate students
 
     === Representation Invariants ===
     group_size > 1
+    workers > 0
     """
 
     group_size: int
+    workers: int
+
+    def __init__(self, group_size: int, workers: int = 1) -> None:
+        """
+        Initialize a grouper that creates groups of size <group_size>.
+
+        If <workers> is greater than 1, the candidate students at each step are
+        split between <workers> worker processes which score them in parallel.
+        The groupings made are the same as with a single process.
+
+        === Precondition ===
+        group_size > 1
+        workers > 0
+        """
+        Grouper.__init__(self, group_size)
+        self.workers = workers
 
     def make_grouping(self, course: Course, survey: Survey) -> Grouping:
         """
@@ -245,8 +326,12 @@ class GreedyGrouper(Grouper):
            equal to self.group_size.
         4. repeat steps 1-3 until all students have been placed in a group.
 
-        In step 2 above, use the <survey>.score_students method to determine
-        the score of each group of students.
+        In step 2 above, the score of each group of students is the score given
+        by the <survey>.score_students method. The score of the new group is
+        kept up to date as students are added to it, so each candidate student
+        only costs the similarities between them and the current members.
+        If several students would give the group the same highest score, the
+        last of them in the tuple is selected.
 
         The final group created may have fewer than N members if that is
         required to make sure all students in <course> are members of a group.
@@ -254,25 +339,135 @@ class GreedyGrouper(Grouper):
         tup_students = course.get_students()
         free_students = list(tup_students)
         grouping = Grouping()
-        while len(free_students) > self.group_size:
-            first_student = free_students.pop(0)
-            group = [first_student]
-            while not len(group) == self.group_size:
-                group_scores = {}
-                for student in free_students:
-                    try_group = group + [student]
-                    score = survey.score_students(try_group)
-                    group_scores[score] = student
-                max_score = max(group_scores.keys())
-                next_student = group_scores[max_score]
-                group.append(next_student)
-                free_students.remove(next_student)
-            group = Group(group)
-            grouping.add_group(group)
+        group = make_accumulator(survey)
+        executor = None
+        if self.workers > 1 and len(free_students) > self.group_size:
+            executor = ProcessPoolExecutor(self.workers,
+                                           initializer=_init_greedy_worker,
+                                           initargs=(survey, tup_students))
+        try:
+            while len(free_students) > self.group_size:
+                first_student = free_students.pop(0)
+                group.clear()
+                group.add(first_student)
+                while not len(group) == self.group_size:
+                    scores = self._score_candidates(executor, group,
+                                                    free_students)
+                    next_student = best_candidate(survey, group,
+                                                  free_students, scores)
+                    group.add(next_student)
+                    free_students.remove(next_student)
+                grouping.add_group(Group(group.get_members()))
+        finally:
+            if executor is not None:
+                executor.shutdown()
         last_group = Group(free_students)
         grouping.add_group(last_group)
         return grouping
 
+    def _score_candidates(self, executor: Optional[ProcessPoolExecutor],
+                          group: Accumulator,
+                          candidates: List[Student]) -> List[float]:
+        """
+        Return the score of <group> with each student in <candidates> added to
+        it, in the order of <candidates>.
+
+        If <executor> is not None, <candidates> is split into one contiguous
+        slice per worker and each slice is scored by a worker process.
+        """
+        if executor is None:
+            return group.scores_with(candidates)
+        member_ids = [member.id for member in group.get_members()]
+        candidate_ids = [student.id for student in candidates]
+        size = -(-len(candidate_ids) // self.workers)
+        futures = [executor.submit(_score_greedy_candidates, member_ids,
+                                   candidate_ids[start:start + size])
+                   for start in range(0, len(candidate_ids), size)]
+        scores = []
+        for future in futures:
+            scores.extend(future.result())
+        return scores
+
+
+class _FreeList:
+    """
+    A doubly linked list of the positions 0 to n - 1 of the students that have
+    not been put in a group yet, in increasing order. Removing a run of
+    positions does not shift the positions after it.
+
+    === Public Attributes ===
+    head: the first position in the list, or end if the list is empty
+    end: the position that follows the last position in the list (n)
+
+    === Private Attributes ===
+    _next: _next[i] is the position after i in the list, or end
+    _prev: _prev[i] is the position before i in the list, or -1
+    _size: the number of positions in the list
+    """
+
+    head: int
+    end: int
+    _next: List[int]
+    _prev: List[int]
+    _size: int
+
+    def __init__(self, n: int) -> None:
+        """ Initialize a list containing the positions 0 to <n> - 1 """
+        self.head = 0
+        self.end = n
+        self._next = list(range(1, n + 1))
+        self._prev = list(range(-1, n - 1))
+        self._size = n
+
+    def __len__(self) -> int:
+        """ Return the number of positions in this list """
+        return self._size
+
+    def after(self, position: int) -> int:
+        """ Return the position after <position>, or end if there is none """
+        return self._next[position]
+
+    def window(self, position: int, n: int) -> List[int]:
+        """ Return the <n> positions starting at <position>.
+
+        === Precondition ===
+        There are at least <n> positions from <position> to the end
+        """
+        positions = []
+        for _ in range(n):
+            positions.append(position)
+            position = self._next[position]
+        return positions
+
+    def back(self, position: int, n: int) -> int:
+        """ Return the position <n> places before <position>, or the head if
+        there are fewer than <n> positions before it.
+        """
+        for _ in range(n):
+            if self._prev[position] == -1:
+                break
+            position = self._prev[position]
+        return position
+
+    def remove(self, position: int, n: int) -> List[int]:
+        """ Remove the <n> positions starting at <position> from this list and
+        return them.
+
+        === Precondition ===
+        There are at least <n> positions from <position> to the end
+        """
+        positions = self.window(position, n)
+        before = self._prev[positions[0]]
+        after = self._next[positions[-1]]
+        if before == -1:
+            self.head = after
+        else:
+            self._next[before] = after
+        if after != self.end:
+            self._prev[after] = before
+        self._size -= n
+        return positions
+
 
 class WindowGrouper(Grouper):
     """
@@ -306,71 +501,791 @@ class WindowGrouper(Grouper):
            step 1. If the current window is the last window, compare it to the
            first window instead.
 
-        In step 2 above, use the <survey>.score_students to determine the score
-        of each window (list of students).
+        In step 2 above, the score of each window (list of students) is the
+        score given by <survey>.score_students. The score is kept up to date as
+        the window slides, by removing the student that leaves the window and
+        adding the student that enters it.
 
-        In step 1 and 2 above, use the windows function to get the windows of
-        the list of students.
+        The students who have not been put in a group are kept in a linked
+        list. When a group is made from the window at index i, the windows
+        before index i - group_size are unchanged, and every comparison between
+        them already failed, so step 1 starts again at index i - group_size
+        instead of at the first window.
 
         If there are any remaining students who have not been put in a group
         after repeating steps 1 and 2 above, put the remaining students into a
         new group.
         """
-        tup_students = course.get_students()
-        lst_students = list(tup_students)
+        students = list(course.get_students())
+        free = _FreeList(len(students))
         grouping = Grouping()
-        lst_winds = windows(lst_students, self.group_size)
-        while len(lst_winds) != 1:
-            result = self._find_best_window(survey, lst_winds, lst_students)
-            wind = result[0]
-            group = Group(wind)
-            grouping.add_group(group)
-            lst_winds = result[1]
-        last_winds = []
-        for student in lst_winds[0]:
-            last_winds.append(student)
-        grouping.add_group(Group(last_winds))
+        window = make_accumulator(survey)
+        start = free.head
+        while len(free) > self.group_size:
+            first = self._find_best_window(survey, window, students, free,
+                                           start)
+            start = free.back(first, self.group_size)
+            members = free.remove(first, self.group_size)
+            if start == first:
+                start = free.head
+            grouping.add_group(Group([students[i] for i in members]))
+        last_group = [students[i] for i in free.window(free.head, len(free))]
+        grouping.add_group(Group(last_group))
         return grouping
 
-    def _find_best_window(self, survey: Survey,
-                          windows_: List[List[Any]],
-                          lst_students: List[Student]) -> List:
-        """"
-        Return a list, first element is the new group to be added to window,
-        second element is the new windows list
-        """
-
-        for index, window in enumerate(windows_):
-            if index + 1 == len(windows_):
-                wind_curr_score = survey.score_students(window)
-                wind_first = survey.score_students(windows_[0])
-                if wind_curr_score >= wind_first:
-                    new_lst = self._new_windows(window, lst_students)
-                    return [window, new_lst]
+    def _find_best_window(self, survey: Survey, window: Accumulator,
+                          students: List[Student], free: _FreeList,
+                          start: int) -> int:
+        """
+        Return the first position of the window that should be made into the
+        next group, comparing windows from the window starting at <start>.
+
+        <students> are the students in order of position, <free> holds the
+        positions of the students that are not in a group yet and <window> is
+        the accumulator used to score windows.
+
+        === Precondition ===
+        len(free) > self.group_size
+        """
+        positions = free.window(start, self.group_size)
+        window.clear()
+        for i in positions:
+            window.add(students[i])
+        score = window.score()
+        while True:
+            after = free.after(positions[-1])
+            current = [students[i] for i in positions]
+            if after == free.end:
+                first = [students[i] for i in free.window(free.head,
+                                                          self.group_size)]
+                window.clear()
+                for student in first:
+                    window.add(student)
+                if at_least(survey, window, score, window.score(), current,
+                            first):
+                    return positions[0]
+                return free.head
+            position = positions[0]
+            window.remove(students[position])
+            window.add(students[after])
+            positions = positions[1:] + [after]
+            next_score = window.score()
+            if at_least(survey, window, score, next_score, current,
+                        [students[i] for i in positions]):
+                return position
+            score = next_score
+
+
+class LocalSearchGrouper(Grouper):
+    """
+    A grouper that starts from the grouping made by another grouper and
+    improves it by repeatedly trying to swap two students in different groups.
+
+    Each group's score is kept by an accumulator, so trying a swap only
+    computes the similarities between the two swapped students and the other
+    members of their groups, instead of rescoring both groups.
+
+    With a temperature of 0.0, a swap is kept only if it increases the score of
+    the grouping by more than floating point rounding (hill climbing). With a positive temperature, a swap that
+    decreases the score by d is also kept with probability exp(-d / t), where
+    the temperature t is multiplied by <cooling> after every attempt
+    (simulated annealing). The best grouping found is returned.
+
+    === Public Attributes ===
+    group_size: the ideal number of students that should be in each group
+    start: the grouper used to make the grouping that is improved
+    max_iterations: the maximum number of swaps to try
+    time_limit: the maximum number of seconds to spend trying swaps, or None
+                for no limit
+    temperature: the starting temperature for simulated annealing
+    cooling: the factor the temperature is multiplied by after each attempt
+
+    === Private Attributes ===
+    _random: the random number generator used to choose swaps
+
+    === Representation Invariants ===
+    group_size > 1
+    max_iterations >= 0
+    temperature >= 0.0
+    0.0 < cooling <= 1.0
+    """
+
+    group_size: int
+    start: Grouper
+    max_iterations: int
+    time_limit: Optional[float]
+    temperature: float
+    cooling: float
+    _random: random.Random
+
+    def __init__(self, group_size: int, start: Optional[Grouper] = None,
+                 max_iterations: int = 10000,
+                 time_limit: Optional[float] = None,
+                 temperature: float = 0.0, cooling: float = 0.999,
+                 seed: Optional[int] = None) -> None:
+        """
+        Initialize a grouper that creates groups of size <group_size> by
+        improving the grouping made by <start>, or by an AlphaGrouper if
+        <start> is None. Swaps are chosen randomly using <seed>.
+
+        === Precondition ===
+        group_size > 1
+        max_iterations >= 0
+        temperature >= 0.0
+        0.0 < cooling <= 1.0
+        """
+        Grouper.__init__(self, group_size)
+        self.start = start if start is not None else AlphaGrouper(group_size)
+        self.max_iterations = max_iterations
+        self.time_limit = time_limit
+        self.temperature = temperature
+        self.cooling = cooling
+        self._random = random.Random(seed)
+
+    def make_grouping(self, course: Course, survey: Survey) -> Grouping:
+        """
+        Return a grouping for all students in <course>, made by improving the
+        grouping that self.start makes for <course> and <survey>.
+
+        The groups have the same sizes as the groups made by self.start.
+        """
+        return self.improve(self.start.make_grouping(course, survey), survey)
+
+    def improve(self, grouping: Grouping, survey: Survey) -> Grouping:
+        """
+        Return a new grouping with groups of the same sizes as the groups in
+        <grouping>, whose score according to <survey> is at least the score of
+        <grouping>.
+
+        Stop after self.max_iterations attempted swaps or self.time_limit
+        seconds, whichever comes first.
+        """
+        groups = [make_accumulator(survey, group.get_members())
+                  for group in grouping.get_groups()]
+        if len(groups) < 2:
+            return _grouping_of([group.get_members() for group in groups])
+        scores = [group.score() for group in groups]
+        total = sum(scores)
+        best_total = total
+        # The swaps kept since the best grouping so far, which are undone at
+        # the end instead of copying the grouping whenever it improves
+        since_best = []
+        temperature = self.temperature
+        deadline = None
+        if self.time_limit is not None:
+            deadline = time.perf_counter() + self.time_limit
+        for _ in range(self.max_iterations):
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            i, j = self._random.sample(range(len(groups)), 2)
+            student1 = self._random.choice(groups[i].get_members())
+            student2 = self._random.choice(groups[j].get_members())
+            score1 = groups[i].score_with_swap(student1, student2)
+            score2 = groups[j].score_with_swap(student2, student1)
+            delta = score1 + score2 - scores[i] - scores[j]
+            if is_close(score1 + score2, scores[i] + scores[j]):
+                # Only floating point rounding, which differs between surveys
+                # and compiled surveys
+                delta = 0.0
+            if delta > 0 or (temperature > 0 and self._random.random() <
+                             math.exp(delta / temperature)):
+                groups[i].remove(student1)
+                groups[i].add(student2)
+                groups[j].remove(student2)
+                groups[j].add(student1)
+                scores[i] = score1
+                scores[j] = score2
+                total += delta
+                if total > best_total:
+                    best_total = total
+                    since_best.clear()
                 else:
-                    window = windows_[0]
-                    new_lst = self._new_windows(window, lst_students)
-                    return [window, new_lst]
+                    since_best.append((i, j, student1, student2))
+            temperature *= self.cooling
+        best = [group.get_members() for group in groups]
+        for i, j, student1, student2 in reversed(since_best):
+            best[i][best[i].index(student2)] = student1
+            best[j][best[j].index(student1)] = student2
+        return _grouping_of(best)
+
+
+def _grouping_of(groups: List[List[Student]]) -> Grouping:
+    """ Return a grouping made of a group for each list in <groups> """
+    grouping = Grouping()
+    for members in groups:
+        grouping.add_group(Group(members))
+    return grouping
+
+
+def _group_shard(grouper: Grouper, name: str, students: List[Student],
+                 survey: Survey) -> List[List[int]]:
+    """
+    Return the ids of the members of each group made by <grouper> for a course
+    named <name> with the students in <students>. Used by ShardedGrouper, in
+    a worker process if it has more than one worker.
+    """
+    shard = Course(name)
+    shard.enroll_many(students)
+    return [[member.id for member in group.get_members()]
+            for group in grouper.make_grouping(shard, survey).get_groups()]
+
+
+class ShardedGrouper(Grouper):
+    """
+    A grouper that splits the students in a course into shards (for example
+    by section) and groups the students of each shard separately with another
+    grouper, so that no group has students from two shards.
+
+    Students are put in the same shard iff they have the same key. The key of
+    a student is either the value of one of their attributes, the answer key
+    of their answer to a survey question (see Question.answer_key, or None if
+    they have no valid answer), or the value returned by a function called on
+    them.
+
+    Student has __slots__, so attributes such as a section cannot be set on
+    a Student itself. A section must come from a subclass of Student that
+    defines it, from a survey question or from a function (for example, one
+    that looks up each student's id in a dictionary of sections).
+
+    === Public Attributes ===
+    group_size: the ideal number of students that should be in each group
+    grouper: the grouper used to group the students of each shard
+    key: the name of a student attribute, a question or a function that gives
+         the key of each student
+    workers: the number of processes used to group the shards
+
+    === Representation Invariants ===
+    group_size > 1
+    group_size == grouper.group_size
+    workers >= 1
+    """
+
+    group_size: int
+    grouper: Grouper
+    key: Union[str, Question, Callable[[Student], Hashable]]
+    workers: int
+
+    def __init__(self, grouper: Grouper,
+                 key: Union[str, Question, Callable[[Student], Hashable]],
+                 workers: int = 1) -> None:
+        """
+        Initialize a grouper that groups the students with the same <key> with
+        <grouper>, using <workers> processes.
+
+        If <workers> > 1, <grouper> and the students of each shard are sent to
+        the worker processes, so they must be picklable.
+
+        === Precondition ===
+        workers >= 1
+        If <key> is a string, it is the name of an attribute of every student,
+            such as one defined by a subclass of Student
+        """
+        Grouper.__init__(self, grouper.group_size)
+        self.grouper = grouper
+        self.key = key
+        self.workers = workers
+
+    def _key_of(self, student: Student) -> Hashable:
+        """ Return the key of <student> """
+        if isinstance(self.key, str):
+            return getattr(student, self.key)
+        if isinstance(self.key, Question):
+            if student.has_answer(self.key):
+                return self.key.answer_key(student.get_answer(self.key))
+            return None
+        return self.key(student)
+
+    def shard(self, course: Course) -> List[List[Student]]:
+        """
+        Return the students in <course> split into shards by their key. Shards
+        are in order of their lowest student id, and the students in each
+        shard are in order of id.
+        """
+        shards = {}
+        for student in course.get_students():
+            shards.setdefault(self._key_of(student), []).append(student)
+        return list(shards.values())
+
+    def make_grouping(self, course: Course, survey: Survey) -> Grouping:
+        """
+        Return a grouping for all students in <course>, made by grouping the
+        students of each shard with self.grouper.
+
+        The groupings of the shards are merged into one grouping. Raise
+        ValueError if the merged grouping would have a student in two groups,
+        or if a student in <course> would not be in any group.
+        """
+        shards = self.shard(course)
+        names = [f'{course.name} ({i})' for i in range(len(shards))]
+        if self.workers > 1 and len(shards) > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                futures = [executor.submit(_group_shard, self.grouper, name,
+                                           students, survey)
+                           for name, students in zip(names, shards)]
+                results = [future.result() for future in futures]
+        else:
+            results = [_group_shard(self.grouper, name, students, survey)
+                       for name, students in zip(names, shards)]
+        grouping = Grouping()
+        for group_ids in results:
+            for ids in group_ids:
+                members = [course.get_student(id_) for id_ in ids]
+                if None in members:
+                    raise ValueError('a shard was grouped with a student '
+                                     'who is not in the course')
+                if not grouping.add_group(Group(members)):
+                    raise ValueError('shards were grouped with a student in '
+                                     'more than one group')
+        for student in course.get_students():
+            if student not in grouping:
+                raise ValueError(f'student {student.id} is not in any group')
+        return grouping
+
+
+class _PartitionSearch:
+    """
+    A branch and bound search for the grouping of a list of students with the
+    highest total group score, used by OptimalGrouper.
+
+    Students are referred to by their position in the list. Groups are made
+    one at a time: the free student at the lowest position starts each group
+    and the other members of a group are added in increasing order of
+    position, so that every grouping is reached exactly once.
+
+    A partly made group is not extended if an upper bound on the total score
+    of every grouping it can lead to is not higher than the best total found
+    so far. The bound is found from scores computed once for every pair of
+    students:
+
+    - on a question whose criterion is HomogeneousCriterion or
+      HeterogeneousCriterion, a group scores the average of its pair scores,
+      which is at most the sum over its members of the average of their
+      largest pair scores with the free students, divided by its size.
+    - on a question whose criterion is LonelyMemberCriterion, a group of two
+      or more students scores nothing if one of its members has an answer
+      that no other free student has.
+    - every other question is counted as if every group got the highest
+      score for it.
+
+    === Public Attributes ===
+    timed_out: True iff the search was stopped by its deadline
+
+    === Private Attributes ===
+    _survey: the survey used to score the groups
+    _students: the students to group
+    _scores: a dictionary mapping the positions of the members of every group
+             scored so far, in increasing order, to the score of the group
+    _pairs: _pairs[i][j] is the most that students i and j together add to
+            the sum of the pair scores of any group they are both in (see
+            _pair_scores)
+    _single: the score a group of one student gets from its pair scores
+    _lonely: for each question whose criterion is LonelyMemberCriterion, its
+             weight divided by the number of questions and the answer key
+             of each student, or None if their answer is invalid
+    _other: the highest score a group can get from the questions whose
+            criterion is not HomogeneousCriterion, HeterogeneousCriterion or
+            LonelyMemberCriterion
+    _order: _order[i] is the positions of the students other than i, in
+            decreasing order of _pairs[i]
+    _top: _top[i][t] is the sum of the t largest values of _pairs[i][j] for
+          the students j other than i that were free when the group being
+          made was started, for t up to _size - 1
+    _paired: _paired[i] is the sum of the shares in _lonely of the questions
+             for which student i has an invalid answer or some other student
+             who was free when the group being made was started has the same
+             answer key
+    _shares: _shares[i] is the most that student i can add to the score of
+             a group that has not been started yet (see _share), or 0.0 if
+             no group can be started after the group being made
+    _size: the size of every group but the smaller one
+    _last: the size of the smaller group, or 0 if there is none
+    _full: the number of groups of _size that have not been started
+    _last_open: True iff the smaller group has not been started
+    _free: _free[i] is True iff student i is not in a group
+    _groups: the positions of the members of every group made so far
+    _pair_sum: the sum of _pairs[i][j] over every pair of members of the
+               group being made
+    _rest: a dictionary mapping a set of free students (as a bit mask of
+           their positions) and whether the smaller group has not been
+           started to an upper bound on the total score of the groups those
+           students can be split into, found by an earlier search
+    _best: the highest total group score found so far
+    _best_groups: the positions of the members of every group in the grouping
+                  with total score _best, or None if it was not found by
+                  this search
+    _deadline: the value of time.perf_counter() at which to stop searching,
+               or None for no limit
+    _steps: the number of times a group has been extended
+
+    === Representation Invariants ===
+    0 <= _last < _size
+    """
+
+    timed_out: bool
+    _survey: Survey
+    _students: List[Student]
+    _scores: Dict[Tuple[int, ...], float]
+    _pairs: List[List[float]]
+    _single: float
+    _lonely: List[Tuple[float, List[Optional[Hashable]]]]
+    _other: float
+    _order: List[List[int]]
+    _top: List[List[float]]
+    _paired: List[float]
+    _shares: List[float]
+    _size: int
+    _last: int
+    _full: int
+    _last_open: bool
+    _free: List[bool]
+    _groups: List[List[int]]
+    _pair_sum: float
+    _rest: Dict[Tuple[int, bool], float]
+    _best: float
+    _best_groups: Optional[List[List[int]]]
+    _deadline: Optional[float]
+    _steps: int
+
+    def __init__(self, survey: Survey, students: List[Student],
+                 group_size: int, deadline: Optional[float]) -> None:
+        """ Initialize a search for the best grouping of <students> into
+        groups of <group_size> and one smaller group with the students left
+        over, scored with <survey>, that stops at <deadline>.
+
+        === Precondition ===
+        group_size > 1
+        """
+        self.timed_out = False
+        self._survey = survey
+        self._students = students
+        self._scores = {}
+        self._pairs = [[0.0] * len(students) for _ in students]
+        self._single = 0.0
+        self._lonely = []
+        self._other = 0.0
+        self._pair_scores(survey)
+        self._order = [sorted((j for j in range(len(students)) if j != i),
+                              key=row.__getitem__, reverse=True)
+                       for i, row in enumerate(self._pairs)]
+        self._top = []
+        self._paired = []
+        self._shares = []
+        self._size = group_size
+        self._last = len(students) % group_size
+        self._full = len(students) // group_size
+        self._last_open = self._last > 0
+        self._free = [True] * len(students)
+        self._groups = []
+        self._pair_sum = 0.0
+        self._rest = {}
+        self._best = -math.inf
+        self._best_groups = None
+        self._deadline = deadline
+        self._steps = 0
+
+    def _pair_scores(self, survey: Survey) -> None:
+        """
+        Compute _pairs, _single, _lonely and _other for the questions in
+        <survey>.
+
+        The pair score of two students on a question whose criterion is
+        HomogeneousCriterion (or HeterogeneousCriterion) is its weight times
+        their similarity (or one minus their similarity) divided by the number
+        of questions, or its weight divided by the number of questions if one
+        of them has an invalid answer.
+
+        If <survey> is a CompiledSurvey, the similarities it has already
+        computed are used.
+        """
+        compiled = None
+        if not isinstance(survey, Survey):
+            compiled, survey = survey, survey.survey
+        questions = list(survey.get_questions())
+        n = len(self._students)
+        for question in questions:
+            criterion = survey._get_criterion(question)
+            share = survey._get_weight(question) / len(questions)
+            answers = [student.get_answer(question)
+                       if student.has_answer(question) else None
+                       for student in self._students]
+            if type(criterion) is LonelyMemberCriterion:
+                self._lonely.append((share, [
+                    None if answer is None else question.answer_key(answer)
+                    for answer in answers]))
+                continue
+            if type(criterion) not in (HomogeneousCriterion,
+                                       HeterogeneousCriterion):
+                self._other += share
+                continue
+            homogeneous = type(criterion) is HomogeneousCriterion
+            if homogeneous:
+                self._single += share
+            similarities = None
+            if compiled is not None:
+                similarities = compiled.get_similarities(
+                    question, self._students).tolist()
+            for i in range(n):
+                for j in range(i + 1, n):
+                    if answers[i] is None or answers[j] is None:
+                        score = share
+                    else:
+                        similarity = question.get_similarity(
+                            answers[i], answers[j]) if similarities is None \
+                            else similarities[i][j]
+                        score = share * (similarity if homogeneous else
+                                         1.0 - similarity)
+                    self._pairs[i][j] += score
+                    self._pairs[j][i] += score
+
+    def run(self, total: float) -> Optional[List[List[int]]]:
+        """
+        Search for a grouping whose total group score is higher than <total>.
+        Return the positions of the members of each group of the best
+        grouping found, or None if none was higher.
+        """
+        self._best = total
+        self._best_groups = None
+        self._start_group(0.0)
+        return self._best_groups
+
+    def _prepare(self) -> None:
+        """ Compute _top and _paired for the free students """
+        free = [j for j, is_free in enumerate(self._free) if is_free]
+        self._top = [[] for _ in self._free]
+        self._paired = [0.0 for _ in self._free]
+        for i in free:
+            top = [0.0]
+            for j in self._order[i]:
+                if len(top) == self._size:
+                    break
+                if self._free[j]:
+                    top.append(top[-1] + self._pairs[i][j])
+            self._top[i] = top
+        for share, keys in self._lonely:
+            counts = Counter(keys[i] for i in free)
+            for i in free:
+                if keys[i] is None or counts[keys[i]] > 1:
+                    self._paired[i] += share
+
+    def _start_group(self, total: float) -> None:
+        """ Try every way of grouping the free students, given that the groups
+        made so far have a total score of <total>.
+        """
+        if not any(self._free):
+            if total > self._best and not is_close(total, self._best):
+                self._best = total
+                self._best_groups = [group[:] for group in self._groups]
+            return
+        key = (sum(1 << i for i, is_free in enumerate(self._free) if is_free),
+               self._last_open)
+        if key in self._rest:
+            bound = total + self._rest[key]
+            if bound <= self._best or is_close(bound, self._best):
+                return
+        best = self._best
+        top, paired, shares = self._top, self._paired, self._shares
+        self._prepare()
+        anchor = self._free.index(True)
+        sizes = [self._size] if self._full else []
+        if self._last_open:
+            sizes.append(self._last)
+        for size in sizes:
+            if size == self._size:
+                self._full -= 1
             else:
-                wind_curr_score = survey.score_students(window)
-                wind_next_score = survey.score_students(windows_[index + 1])
-                if wind_curr_score >= wind_next_score:
-                    new_lst = self._new_windows(window, lst_students)
-                    return [window, new_lst]
-        return None
+                self._last_open = False
+            self._free[anchor] = False
+            self._pair_sum = 0.0
+            self._shares = [self._future_share(i) if is_free else 0.0
+                            for i, is_free in enumerate(self._free)]
+            self._extend([anchor], size, total)
+            self._free[anchor] = True
+            if size == self._size:
+                self._full += 1
+            else:
+                self._last_open = True
+            if self.timed_out:
+                break
+        self._top, self._paired, self._shares = top, paired, shares
+        if not self.timed_out:
+            # Either the best grouping of the free students was found, or
+            # none of them scores more than the best total found before
+            rest = max(best, self._best) - total
+            self._rest[key] = min(self._rest.get(key, rest), rest)
+
+    def _extend(self, members: List[int], size: int, total: float) -> None:
+        """ Try every way of adding free students after the last of <members>
+        to the group being made until it has <size> members, given that the
+        groups made before it have a total score of <total>.
+        """
+        if len(members) == size:
+            pair_sum = self._pair_sum
+            self._groups.append(members)
+            self._start_group(total + self._score(members))
+            self._groups.pop()
+            self._pair_sum = pair_sum
+            return
+        self._steps += 1
+        if self._deadline is not None and self._steps % 256 == 0 and \
+                time.perf_counter() >= self._deadline:
+            self.timed_out = True
+            return
+        slots = size - len(members)
+        candidates = [j for j in range(members[-1] + 1, len(self._free))
+                      if self._free[j]]
+        gains = {j: sum(self._pairs[i][j] for i in members)
+                 for j in candidates}
+        bound = self._bound(members, size, total, gains)
+        if bound <= self._best or is_close(bound, self._best):
+            return
+        candidates.sort(key=lambda j: gains[j], reverse=True)
+        for j in candidates:
+            if sum(self._free[j + 1:]) < slots - 1:
+                continue
+            pair_sum = self._pair_sum
+            self._pair_sum += gains[j]
+            self._free[j] = False
+            self._extend(members + [j], size, total)
+            self._free[j] = True
+            self._pair_sum = pair_sum
+            if self.timed_out:
+                return
+
+    def _score(self, members: List[int]) -> float:
+        """ Return the score of the group of the students at the positions
+        in <members>.
+
+        === Precondition ===
+        <members> is in increasing order
+        """
+        key = tuple(members)
+        if key not in self._scores:
+            self._scores[key] = self._survey.score_students(
+                [self._students[i] for i in members])
+        return self._scores[key]
+
+    def _share(self, i: int, size: int) -> float:
+        """ Return the most that free student <i> can add to the score of a
+        group of <size> through its pair scores and its lonely member
+        questions.
+        """
+        if size == 1:
+            return sum(share for share, _ in self._lonely)
+        return (self._top[i][size - 1] / (size - 1) + self._paired[i]) / size
 
-    def _new_windows(self, window: List, free_students: List) -> List:
+    def _future_share(self, i: int) -> float:
+        """ Return the most that free student <i> can add to the score of a
+        group that has not been started yet, or 0.0 if there is none.
+        """
+        share = 0.0
+        if self._full:
+            share = self._share(i, self._size)
+        if self._last_open:
+            share = max(share, self._share(i, self._last))
+        return share
+
+    def _bound(self, members: List[int], size: int, total: float,
+               gains: Dict[int, float]) -> float:
         """
-        Returns a new_window list
+        Return an upper bound on the total score of every grouping in which
+        the group being made has <members> and grows to <size> members, given
+        that the groups made before it have a total score of <total> and
+        <gains>[j] is the sum of the pair scores of each student j who can
+        still join the group with <members>.
 
-        Helper method
-        Removes the students in the window (who were put in the group) from the
-        free_student list. Calls the windows function to generate new window lst
+        === Precondition ===
+        len(members) < size
         """
-        for student in window:
-            free_students.remove(student)
-        new_windows = windows(free_students, self.group_size)
-        return new_windows
+        slots = size - len(members)
+        pairs = size * (size - 1) / 2
+        shares = self._shares
+        extra = sorted(((gains[j] + self._top[j][slots - 1] / 2) / pairs -
+                        shares[j] for j in gains), reverse=True)
+        if len(extra) < slots:
+            return -math.inf
+        free = sum(share for j, share in enumerate(shares) if self._free[j])
+        bound = total + self._pair_sum / pairs + free + sum(extra[:slots]) + \
+            (self._full + self._last_open + 1) * self._other
+        for share, keys in self._lonely:
+            counts = Counter(keys[j] for j in members + list(gains))
+            if all(keys[i] is None or counts[keys[i]] > 1 for i in members):
+                bound += share
+        if self._last == 1 and self._last_open:
+            bound += self._single
+        return bound
+
+
+class OptimalGrouper(Grouper):
+    """
+    A grouper that finds a grouping with the highest possible score for small
+    courses, by a branch and bound search over every way of splitting the
+    students into groups.
+
+    The search starts from the grouping made by a GreedyGrouper and is
+    stopped after time_limit seconds, in which case the best grouping found
+    so far is returned. The number of groupings grows very quickly with the
+    number of students, so this grouper is meant for courses of fewer than
+    about 30 students.
+
+    === Public Attributes ===
+    group_size: the ideal number of students that should be in each group
+    time_limit: the maximum number of seconds to search for, or None for no
+                limit
+    optimal: True iff the last grouping made by this grouper was proven to
+             have the highest possible score, that is, the search was not
+             stopped by time_limit
+
+    === Representation Invariants ===
+    group_size > 1
+    """
+
+    group_size: int
+    time_limit: Optional[float]
+    optimal: bool
+
+    def __init__(self, group_size: int,
+                 time_limit: Optional[float] = 10.0) -> None:
+        """
+        Initialize a grouper that creates groups of size <group_size>,
+        searching for at most <time_limit> seconds per grouping.
+
+        === Precondition ===
+        group_size > 1
+        """
+        Grouper.__init__(self, group_size)
+        self.time_limit = time_limit
+        self.optimal = False
+
+    def make_grouping(self, course: Course, survey: Survey) -> Grouping:
+        """
+        Return a grouping for all students in <course> with the highest score
+        according to <survey>, among the groupings with as many groups of
+        self.group_size as possible and one smaller group with the students
+        left over (the same group sizes as GreedyGrouper).
+
+        If the search is stopped by self.time_limit, return the best grouping
+        found so far, whose score is at least the score of the grouping made
+        by GreedyGrouper.
+
+        Scores within scoring.TOLERANCE of each other are treated as equal.
+        """
+        deadline = None
+        if self.time_limit is not None:
+            deadline = time.perf_counter() + self.time_limit
+        greedy = GreedyGrouper(self.group_size).make_grouping(course, survey)
+        students = list(course.get_students())
+        if len(students) <= self.group_size:
+            self.optimal = True
+            return greedy
+        search = _PartitionSearch(survey, students, self.group_size,
+                                  deadline)
+        total = sum(survey.score_students(group.get_members())
+                    for group in greedy.get_groups())
+        best = search.run(total)
+        self.optimal = not search.timed_out
+        if best is None:
+            return greedy
+        return _grouping_of([[students[i] for i in group] for group in best])
 
 
 class Group:
@@ -379,20 +1294,24 @@ class Group:
 
     === Private Attributes ===
     _members: a list of unique students in this group
+    _ids: the ids of the students in _members
 
     === Representation Invariants ===
     No two students in _members have the same id
+    _ids contains exactly the id of each student in _members
     """
 
     _members: List[Student]
+    _ids: FrozenSet[int]
 
     def __init__(self, members: List[Student]) -> None:
         """ Initialize a group with members <members> """
+        seen = {}
         for student in members:
-            for others in members:
-                if student.id == others.id and student != others:
-                    raise AttributeError
+            if seen.setdefault(student.id, student) is not student:
+                raise AttributeError
         self._members = members
+        self._ids = frozenset(seen)
 
     def __len__(self) -> int:
         """ Return the number of members in this group """
@@ -403,10 +1322,7 @@ class Group:
         Return True iff this group contains a member with the same id
         as <member>.
         """
-        for student in self._members:
-            if student.id == member.id:
-                return True
-        return False
+        return member.id in self._ids
 
     def __str__(self) -> str:
         """
@@ -427,6 +1343,10 @@ class Group:
         lst = self._members[:]
         return lst
 
+    def get_ids(self) -> FrozenSet[int]:
+        """ Return the ids of the members in this group """
+        return self._ids
+
 
 class Grouping:
     """
@@ -434,22 +1354,34 @@ class Grouping:
 
     === Private Attributes ===
     _groups: a list of Groups
+    _index: a dictionary mapping the id of each student in a group in _groups
+            to that group
 
     === Representation Invariants ===
     No group in _groups contains zero members
     No student appears in more than one group in _groups
+    _index contains exactly the ids of the students in the groups in _groups
     """
 
     _groups: List[Group]
+    _index: Dict[int, Group]
 
     def __init__(self) -> None:
         """ Initialize a Grouping that contains zero groups """
         self._groups = []
+        self._index = {}
 
     def __len__(self) -> int:
         """ Return the number of groups in this grouping """
         return len(self._groups)
 
+    def __contains__(self, student: Student) -> bool:
+        """
+        Return True iff a group in this grouping contains a member with the
+        same id as <student>.
+        """
+        return student.id in self._index
+
     def __str__(self) -> str:
         """
         Return a multi-line string that includes the names of all of the members
@@ -470,26 +1402,53 @@ class Grouping:
         Iff adding <group> to this grouping would violate a representation
         invariant don't add it and return False instead.
         """
-        if not self._groups:
-            self._groups = [group]
-            return True
-        elif not group:
+        if not group or not self._check_duplicates(group):
             return False
-        else:
-            if not self._check_duplicates(group):
-                return False
-            self._groups.append(group)
-            return True
+        self._groups.append(group)
+        for id_ in group.get_ids():
+            self._index[id_] = group
+        return True
 
     def _check_duplicates(self, group: Group) -> bool:
         """
-        Return True if the group does not contain any duplicate students and if
-        no other groups in <self._groups> contain any overlapping students
+        Return True if no other groups in <self._groups> contain any of the
+        students in <group>
         """
-        for student in group.get_members():
-            for sub_groups in self._groups:
-                if sub_groups.__contains__(student):
-                    return False
+        return self._index.keys().isdisjoint(group.get_ids())
+
+    def remove_group(self, group: Group) -> bool:
+        """
+        Remove <group> from this grouping and return True.
+
+        Iff <group> is not in this grouping, return False instead.
+        """
+        if not any(other is group for other in self._groups):
+            return False
+        self._groups = [other for other in self._groups if other is not group]
+        for id_ in group.get_ids():
+            del self._index[id_]
+        return True
+
+    def replace_group(self, old: Group, new: Group) -> bool:
+        """
+        Replace the group <old> in this grouping with <new>, in the same
+        position, and return True.
+
+        Iff <old> is not in this grouping, or replacing it with <new> would
+        violate a representation invariant, don't replace it and return False
+        instead.
+        """
+        positions = [i for i, other in enumerate(self._groups) if other is old]
+        if not positions or not new:
+            return False
+        for id_ in new.get_ids():
+            if self._index.get(id_, old) is not old:
+                return False
+        for id_ in old.get_ids():
+            del self._index[id_]
+        for id_ in new.get_ids():
+            self._index[id_] = new
+        self._groups[positions[0]] = new
         return True
 
     def get_groups(self) -> List[Group]:
@@ -499,10 +1458,228 @@ class Grouping:
         """
         return self._groups[:]
 
+    def find_group(self, student_id: int) -> Optional[Group]:
+        """ Return the group in this grouping that contains the student with
+        id <student_id>, or None if no group contains that student.
+        """
+        return self._index.get(student_id)
+
+
+class Regrouper:
+    """
+    A grouping of the students in a course that is repaired when students are
+    added to or removed from the course, instead of being made again.
+
+    Only the groups that lose a member, the groups with room that new
+    students join and the groups made for new students change. Every other
+    group keeps its members. If every group in the grouping has group_size
+    members except for at most one smaller group (as made by the groupers),
+    this stays true after each repair.
+
+    The score of each group is kept, so the score of the grouping is known
+    without rescoring the groups that did not change.
+
+    === Public Attributes ===
+    group_size: the ideal number of students that should be in each group
+
+    === Private Attributes ===
+    _survey: the survey used to score the groups
+    _grouping: the grouping that is repaired
+    _scores: a dictionary mapping the ids of the members of each group in
+             _grouping to the score of the group according to _survey
+    _total: the sum of the scores in _scores
+    _short: the groups in _grouping with fewer than group_size members
+
+    === Representation Invariants ===
+    group_size > 1
+    """
+
+    group_size: int
+    _survey: Survey
+    _grouping: Grouping
+    _scores: Dict[FrozenSet[int], float]
+    _total: float
+    _short: List[Group]
+
+    def __init__(self, grouping: Grouping, survey: Survey,
+                 group_size: int) -> None:
+        """
+        Initialize a regrouper that repairs <grouping>, made with groups of
+        <group_size>, and scores its groups with <survey>.
+
+        <grouping> itself is changed by every repair.
+
+        === Precondition ===
+        group_size > 1
+        """
+        self.group_size = group_size
+        self._survey = survey
+        self._grouping = grouping
+        self._scores = {}
+        self._total = 0.0
+        self._short = []
+        for group in grouping.get_groups():
+            self._track(group)
+
+    def get_grouping(self) -> Grouping:
+        """ Return the grouping repaired by this regrouper """
+        return self._grouping
+
+    def score(self) -> float:
+        """ Return the score of the grouping, as given by
+        Survey.score_grouping, up to floating point rounding.
+        """
+        if not self._scores:
+            return 0.0
+        return self._total / len(self._scores)
+
+    def _track(self, group: Group) -> None:
+        """ Score <group>, which was just put in the grouping """
+        score = self._survey.score_students(group.get_members())
+        self._scores[group.get_ids()] = score
+        self._total += score
+        if len(group) < self.group_size:
+            self._short.append(group)
+
+    def _untrack(self, group: Group) -> None:
+        """ Forget the score of <group>, which was just taken out of the
+        grouping.
+        """
+        self._total -= self._scores.pop(group.get_ids())
+        self._short = [other for other in self._short if other is not group]
+
+    def update(self, added: List[Student],
+               removed: List[Student]) -> List[Group]:
+        """
+        Repair the grouping after the students in <added> joined the course
+        and the students in <removed> left it, and return the groups that
+        were changed or made by the repair.
+
+        First every student in <removed> leaves their group. Then each student
+        in <added> joins the group with room whose score it would increase the
+        most (or reduce the least), or a new group if no group has room.
+        Finally, while more than one group has room, the members of the
+        smallest of them are moved in the same way to the others with room.
+        Groups left with no members are removed from the grouping.
+
+        Students in <removed> who are not in the grouping, and students in
+        <added> who already are and are not in <removed>, are ignored.
+        """
+        changed = {}
+        leaving = set()
+        for student in removed:
+            group = self._grouping.find_group(student.id)
+            if group is None or student.id in leaving:
+                continue
+            if group not in changed:
+                changed[group] = make_accumulator(self._survey,
+                                                  group.get_members())
+            changed[group].remove(student)
+            leaving.add(student.id)
+        for group in self._short:
+            if group not in changed:
+                changed[group] = make_accumulator(self._survey,
+                                                  group.get_members())
+        made = []
+        joining = set()
+        for student in added:
+            if student.id in joining or (student.id not in leaving and
+                                         student in self._grouping):
+                continue
+            joining.add(student.id)
+            if not self._join(student, list(changed.values()) + made):
+                made.append(make_accumulator(self._survey, [student]))
+        self._consolidate(list(changed.values()) + made)
+        return self._commit(changed, made)
+
+    def _join(self, student: Student, groups: List[Accumulator]) -> bool:
+        """
+        Add <student> to the group in <groups> with fewer than group_size
+        members whose score it would increase the most (or reduce the least),
+        and return True. Return False if every group in <groups> is full.
+        """
+        best = None
+        best_gain = -math.inf
+        for group in groups:
+            if len(group) < self.group_size:
+                gain = group.score_with(student) - \
+                    (group.score() if len(group) else 0.0)
+                if gain > best_gain:
+                    best, best_gain = group, gain
+        if best is None:
+            return False
+        best.add(student)
+        return True
+
+    def _consolidate(self, groups: List[Accumulator]) -> None:
+        """ Move the members of the smallest group in <groups> with room to
+        the other groups in <groups> with room, until at most one group has
+        room.
+        """
+        while True:
+            short = [group for group in groups
+                     if 0 < len(group) < self.group_size]
+            if len(short) < 2:
+                return
+            smallest = min(short, key=len)
+            others = [group for group in short if group is not smallest]
+            for student in smallest.get_members():
+                if not self._join(student, others):
+                    break
+                smallest.remove(student)
+
+    def _commit(self, changed: Dict[Group, Accumulator],
+                made: List[Accumulator]) -> List[Group]:
+        """ Put the members of the accumulators in <changed> in place of the
+        groups they were made from and add a group for each accumulator in
+        <made>, keeping the scores of the groups up to date. Return the
+        groups that were changed or added.
+        """
+        groups = []
+        replaced = []
+        # Students can move between the changed groups in any direction, so
+        # first take every student who moves out of the changed groups, and
+        # only then put in the students who move in.
+        for old, accumulator in changed.items():
+            members = accumulator.get_members()
+            ids = frozenset(member.id for member in members)
+            if ids == old.get_ids():
+                continue
+            self._untrack(old)
+            kept = [member for member in old.get_members() if member.id in ids]
+            if kept:
+                interim = Group(kept)
+                self._grouping.replace_group(old, interim)
+                replaced.append((interim, members))
+            else:
+                self._grouping.remove_group(old)
+                if members:
+                    made.append(accumulator)
+        for interim, members in replaced:
+            group = Group(members)
+            if not self._grouping.replace_group(interim, group):
+                raise ValueError('a student is in more than one group')
+            self._track(group)
+            groups.append(group)
+        for accumulator in made:
+            if len(accumulator):
+                group = Group(accumulator.get_members())
+                self._grouping.add_group(group)
+                self._track(group)
+                groups.append(group)
+        return groups
+
 
 if __name__ == '__main__':
     import python_ta
     python_ta.check_all(config={'extra-imports': ['typing',
+                                                  'collections',
+                                                  'math',
                                                   'random',
+                                                  'time',
+                                                  'importlib',
+                                                  'criterion',
                                                   'survey',
-                                                  'course']})
+                                                  'course',
+                                                  'scoring',
+                                                  'concurrent.futures']})
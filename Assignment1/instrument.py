@@ -0,0 +1,167 @@
+"""CSC148 Assignment 1
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Misha Schwartz, Mario Badr, Christine Murad, Diane Horton, Sophia Huynh
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) 2020 Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+=== Module Description ===
+
+This file contains functions that count and time calls to the methods that
+grouping spends its time in: Survey.score_students, the score_answers and
+score_valid_answers methods of every criterion, and the validate_answer,
+get_similarity and get_group_similarity methods of every type of question.
+
+Instrumentation is off by default. enable replaces these methods with timed
+wrappers and disable puts the original methods back, so nothing is slowed
+down while instrumentation is off. For example:
+
+    with instrumented() as report:
+        grouper.make_grouping(course, survey)
+    print(report['Survey.score_students'])
+
+The time recorded for a method includes the time spent in any instrumented
+method it calls.
+"""
+from __future__ import annotations
+import functools
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+import criterion
+import survey
+
+# The instrumented methods of Survey, of every Criterion and of every Question
+_SURVEY_METHODS = ('score_students',)
+_CRITERION_METHODS = ('score_answers', 'score_valid_answers')
+_QUESTION_METHODS = ('validate_answer', 'get_similarity',
+                     'get_group_similarity')
+
+# For each instrumented method name, a list of the number of calls and the
+# total number of seconds spent in them
+_records: Dict[str, List[Any]] = {}
+# The original methods replaced by enable, by the class and method name
+_originals: Dict[Tuple[type, str], Callable] = {}
+
+
+def _subclasses(cls: type) -> List[type]:
+    """ Return <cls> and every class that inherits from it """
+    classes = [cls]
+    for subclass in cls.__subclasses__():
+        classes.extend(c for c in _subclasses(subclass) if c not in classes)
+    return classes
+
+
+def _timed(name: str, method: Callable) -> Callable:
+    """ Return a function that calls <method> and records the call and the
+    time it took under <name>.
+    """
+    record = _records.setdefault(name, [0, 0.0])
+
+    @functools.wraps(method)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            record[0] += 1
+            record[1] += time.perf_counter() - start
+    return wrapper
+
+
+def is_enabled() -> bool:
+    """ Return True iff instrumentation is enabled """
+    return bool(_originals)
+
+
+def enable() -> None:
+    """
+    Start counting and timing calls to the instrumented methods of Survey and
+    of every criterion and question class defined so far. Do nothing if
+    instrumentation is already enabled.
+    """
+    if _originals:
+        return
+    targets = [(survey.Survey, _SURVEY_METHODS)]
+    targets += [(cls, _CRITERION_METHODS)
+                for cls in _subclasses(criterion.Criterion)]
+    targets += [(cls, _QUESTION_METHODS)
+                for cls in _subclasses(survey.Question)]
+    for cls, names in targets:
+        for name in names:
+            # Only methods a class defines itself, so that an inherited
+            # method is not wrapped twice
+            if name in vars(cls):
+                method = vars(cls)[name]
+                _originals[(cls, name)] = method
+                setattr(cls, name, _timed(f'{cls.__name__}.{name}', method))
+
+
+def disable() -> None:
+    """ Stop counting and timing calls, and restore the original methods. The
+    statistics recorded so far are kept.
+    """
+    for (cls, name), method in _originals.items():
+        setattr(cls, name, method)
+    _originals.clear()
+
+
+def reset() -> None:
+    """ Discard the statistics recorded so far """
+    for record in _records.values():
+        record[0] = 0
+        record[1] = 0.0
+
+
+def stats() -> Dict[str, Dict[str, float]]:
+    """
+    Return a dictionary mapping the name of each instrumented method that has
+    been called (for example 'NumericQuestion.get_similarity') to a dictionary
+    with the number of 'calls' and the total number of 'seconds' spent in it.
+    """
+    return {name: {'calls': calls, 'seconds': seconds}
+            for name, (calls, seconds) in sorted(_records.items()) if calls}
+
+
+@contextmanager
+def instrumented(fresh: bool = True) -> Iterator[Dict[str, Dict[str, float]]]:
+    """
+    Enable instrumentation for the body of a with statement, and fill the
+    dictionary it returns with stats() when the body is done. If <fresh>, the
+    statistics recorded before the with statement are discarded first.
+
+    Instrumentation stays enabled afterwards if it was enabled before.
+    """
+    was_enabled = is_enabled()
+    if fresh:
+        reset()
+    enable()
+    report = {}
+    try:
+        yield report
+    finally:
+        if not was_enabled:
+            disable()
+        report.update(stats())
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={'extra-imports': ['typing',
+                                                  'functools',
+                                                  'time',
+                                                  'contextlib',
+                                                  'criterion',
+                                                  'survey']})
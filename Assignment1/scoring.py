@@ -0,0 +1,585 @@
+"""CSC148 Assignment 1
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Misha Schwartz, Mario Badr, Christine Murad, Diane Horton, Sophia Huynh
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) 2020 Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+=== Module Description ===
+
+This file contains classes that keep track of the score of a group of students
+as students are added to and removed from the group, so that the groupers do
+not need to rescore the whole group every time it changes.
+"""
+from __future__ import annotations
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
+from criterion import HomogeneousCriterion, HeterogeneousCriterion, \
+    LonelyMemberCriterion, InvalidAnswerError
+from survey import Survey
+if TYPE_CHECKING:
+    from course import Student
+    from criterion import Criterion
+    from survey import Question, Answer
+
+# Scores kept by a GroupAccumulator can differ from the scores given by
+# Survey.score_students by floating point rounding. Two scores this close
+# (relative to their size) are compared again using Survey.score_students.
+TOLERANCE = 1e-9
+
+# The criteria whose score only depends on the sum of the similarities of all
+# pairs of answers (and, for LonelyMemberCriterion, on how often each answer
+# was given). Subclasses are not included since they may score differently.
+PAIR_CRITERIA = (HomogeneousCriterion, HeterogeneousCriterion,
+                 LonelyMemberCriterion)
+
+
+def content_key(content: Any) -> Any:
+    """ Return a hashable key for the answer content <content>.
+
+    Two answers have the same key iff their contents compare equal.
+
+    >>> content_key(['a', 'b'])
+    ('a', 'b')
+    >>> content_key(3)
+    3
+    """
+    if isinstance(content, list):
+        return tuple(content)
+    return content
+
+
+def is_close(score1: float, score2: float) -> bool:
+    """ Return True iff <score1> and <score2> are within TOLERANCE of each
+    other, relative to the larger of them.
+
+    >>> is_close(1.0, 1.0 + 1e-12)
+    True
+    >>> is_close(1.0, 1.001)
+    False
+    """
+    return abs(score1 - score2) <= TOLERANCE * max(1.0, abs(score1),
+                                                   abs(score2))
+
+
+def criterion_score(criterion_: Criterion, size: int, pair_sum: float,
+                    singles: int) -> float:
+    """
+    Return the score that <criterion_> gives to a group of <size> valid answers
+    whose pairwise similarities add up to <pair_sum>, and of which <singles>
+    answers do not have the same answer key (see Question.answer_key) as any
+    other answer in the group.
+
+    === Precondition ===
+    type(criterion_) in PAIR_CRITERIA
+    size > 0
+    """
+    if size == 1:
+        mean = 1.0
+    else:
+        mean = pair_sum / (size * (size - 1) / 2)
+    if type(criterion_) is HomogeneousCriterion:
+        return mean
+    if type(criterion_) is HeterogeneousCriterion:
+        return 1.0 - mean
+    if size == 1 or not singles:
+        return 1.0
+    return 0.0
+
+
+class GroupAccumulator:
+    """
+    The score of a group of students according to a survey, kept up to date as
+    students are added to and removed from the group.
+
+    For the questions whose criterion is one of PAIR_CRITERIA, the sum of the
+    similarities of every pair of members is kept per question, so that adding
+    or removing a student only needs the similarities between that student and
+    the current members. Questions with any other criterion are rescored with
+    Criterion.score_valid_answers.
+
+    The sum of the similarities between a student outside the group and the
+    members is also remembered, so that while the group only grows, each
+    similarity between a candidate and a member is computed only once.
+
+    The answers of every student seen by this accumulator are remembered, so
+    the same accumulator can be cleared and reused for many groups.
+
+    === Private Attributes ===
+    _questions: the questions in the survey, in the survey's order
+    _criteria: the criterion associated with each question in _questions
+    _weights: the weight associated with each question in _questions
+    _pairwise: for each question in _questions, True iff its criterion is one
+               of PAIR_CRITERIA
+    _members: the students in the group, in the order they were added
+    _answers: for each question in _questions, the answers of _members in the
+              same order as _members
+    _valid_members: the members whose answers are all valid, in the order
+                    they were added
+    _pair_sums: for each question in _questions, the sum of the similarities
+                of every pair of _valid_members' answers
+    _counts: for each question in _questions, the number of valid members
+             whose answer has each answer key
+    _singles: for each question in _questions, the number of answer keys in
+              the matching counter that occur exactly once
+    _affinity: a dictionary mapping the id of a student outside the group to
+               a tuple of how many of _valid_members have been compared with
+               them and, for each question in _questions, the sum of the
+               similarities between their answer and those members' answers
+    _profiles: a dictionary mapping a student's id to a tuple of their answers
+               to _questions and whether they are all valid
+
+    === Representation Invariants ===
+    _questions, _criteria, _weights, _pairwise, _answers, _pair_sums, _counts
+        and _singles all have the same length
+
+    === Precondition ===
+    The answers of the students given to this accumulator do not change while
+    the accumulator is used.
+    """
+
+    _questions: List[Question]
+    _criteria: List[Criterion]
+    _weights: List[int]
+    _pairwise: List[bool]
+    _members: List[Student]
+    _answers: List[List[Optional[Answer]]]
+    _valid_members: List[Student]
+    _pair_sums: List[float]
+    _counts: List[Counter]
+    _singles: List[int]
+    _affinity: Dict[int, Tuple[int, List[float]]]
+    _profiles: Dict[int, Tuple[List[Optional[Answer]], bool]]
+
+    # Whether score and score_with are exactly the values Survey.score_students
+    # would return, rather than equal up to floating point rounding.
+    exact = False
+
+    def __init__(self, survey: Survey, students: List[Student] = ()) -> None:
+        """
+        Initialize an accumulator for <survey> whose group contains the
+        students in <students>.
+        """
+        self._questions = list(survey.get_questions())
+        self._criteria = [survey._get_criterion(q) for q in self._questions]
+        self._weights = [survey._get_weight(q) for q in self._questions]
+        self._pairwise = [type(c) in PAIR_CRITERIA for c in self._criteria]
+        self._profiles = {}
+        self.clear()
+        for student in students:
+            self.add(student)
+
+    def __len__(self) -> int:
+        """ Return the number of students in the group """
+        return len(self._members)
+
+    def clear(self) -> None:
+        """ Remove every student from the group """
+        self._members = []
+        self._answers = [[] for _ in self._questions]
+        self._valid_members = []
+        self._pair_sums = [0.0 for _ in self._questions]
+        self._counts = [Counter() for _ in self._questions]
+        self._singles = [0 for _ in self._questions]
+        self._affinity = {}
+
+    def get_members(self) -> List[Student]:
+        """ Return a list of the students in the group, in the order they were
+        added.
+        """
+        return self._members[:]
+
+    def _profile(self, student: Student) -> Tuple[List[Optional[Answer]],
+                                                  bool]:
+        """ Return <student>'s answers to the questions and whether they are
+        all valid.
+        """
+        if student.id not in self._profiles:
+            answers = [student.get_answer(q) for q in self._questions]
+            valid = all(student.has_answer(q) for q in self._questions)
+            self._profiles[student.id] = (answers, valid)
+        return self._profiles[student.id]
+
+    def profile_key(self, student: Student) -> Tuple:
+        """ Return a key such that two students have the same key iff their
+        answers to every question have equal content.
+        """
+        answers = self._profile(student)[0]
+        try:
+            return tuple(None if answer is None else content_key(answer.content)
+                         for answer in answers)
+        except TypeError:
+            return ('student', student.id)
+
+    def _similarities(self, student: Student) -> List[float]:
+        """ Return, for each question, the sum of the similarities between the
+        answer of <student> and the answers of the valid members.
+
+        === Precondition ===
+        <student> is not in the group and all their answers are valid
+        """
+        seen, sums = self._affinity.get(student.id, (0, None))
+        if sums is None:
+            sums = [0.0 for _ in self._questions]
+        elif seen == len(self._valid_members):
+            return sums
+        answers = self._profiles[student.id][0]
+        new_members = self._valid_members[seen:]
+        for i, question in enumerate(self._questions):
+            if self._pairwise[i]:
+                answer = answers[i]
+                for member in new_members:
+                    sums[i] += question.get_similarity(
+                        answer, self._profiles[member.id][0][i])
+        self._affinity[student.id] = (len(self._valid_members), sums)
+        return sums
+
+    def add(self, student: Student) -> None:
+        """ Add <student> to the group.
+
+        === Precondition ===
+        <student> is not in the group
+        """
+        answers, valid = self._profile(student)
+        if valid:
+            sums = self._similarities(student)
+            self._affinity.pop(student.id, None)
+        for i, answer in enumerate(answers):
+            if valid and self._pairwise[i]:
+                self._pair_sums[i] += sums[i]
+                key = self._questions[i].answer_key(answer)
+                count = self._counts[i][key]
+                self._singles[i] += (count == 0) - (count == 1)
+                self._counts[i][key] = count + 1
+            self._answers[i].append(answer)
+        self._members.append(student)
+        if valid:
+            self._valid_members.append(student)
+
+    def remove(self, student: Student) -> None:
+        """ Remove the member of the group with the same id as <student>.
+
+        === Precondition ===
+        A student with the same id as <student> is in the group
+        """
+        index = [member.id for member in self._members].index(student.id)
+        answers, valid = self._profile(self._members.pop(index))
+        self._affinity = {}
+        for i, answer in enumerate(answers):
+            self._answers[i].pop(index)
+        if not valid:
+            return
+        index = [member.id for member in self._valid_members].index(student.id)
+        self._valid_members.pop(index)
+        for i, answer in enumerate(answers):
+            if self._pairwise[i]:
+                question = self._questions[i]
+                for member in self._valid_members:
+                    self._pair_sums[i] -= question.get_similarity(
+                        answer, self._profiles[member.id][0][i])
+                key = question.answer_key(answer)
+                count = self._counts[i][key]
+                self._singles[i] += (count == 2) - (count == 1)
+                if count == 1:
+                    del self._counts[i][key]
+                else:
+                    self._counts[i][key] = count - 1
+
+    def score(self) -> float:
+        """
+        Return the score of the group, equal to calling Survey.score_students
+        on its members (up to floating point rounding).
+
+        === Precondition ===
+        The group is not empty
+        """
+        if not self._questions or \
+                len(self._valid_members) < len(self._members):
+            return 0.0
+        size = len(self._members)
+        score = 0.0
+        for i, question in enumerate(self._questions):
+            if self._pairwise[i]:
+                value = criterion_score(self._criteria[i], size,
+                                        self._pair_sums[i], self._singles[i])
+            else:
+                try:
+                    value = self._criteria[i].score_valid_answers(
+                        question, self._answers[i])
+                except InvalidAnswerError:
+                    return 0.0
+            score += value * self._weights[i]
+        return score / len(self._questions)
+
+    def score_with(self, student: Student) -> float:
+        """
+        Return the score the group would have if <student> were added to it,
+        without adding them.
+
+        === Precondition ===
+        <student> is not in the group
+        """
+        answers, valid = self._profile(student)
+        if not self._questions or not valid or \
+                len(self._valid_members) < len(self._members):
+            return 0.0
+        sums = self._similarities(student)
+        size = len(self._members) + 1
+        score = 0.0
+        for i, question in enumerate(self._questions):
+            answer = answers[i]
+            if self._pairwise[i]:
+                count = self._counts[i][question.answer_key(answer)]
+                singles = self._singles[i] + (count == 0) - (count == 1)
+                value = criterion_score(self._criteria[i], size,
+                                        self._pair_sums[i] + sums[i], singles)
+            else:
+                try:
+                    value = self._criteria[i].score_valid_answers(
+                        question, self._answers[i] + [answer])
+                except InvalidAnswerError:
+                    return 0.0
+            score += value * self._weights[i]
+        return score / len(self._questions)
+
+    def scores_with(self, students: List[Student]) -> List[float]:
+        """
+        Return the score the group would have with each student in <students>
+        added to it, in the order of <students>, without adding them.
+
+        === Precondition ===
+        No student in <students> is in the group
+        """
+        return [self.score_with(student) for student in students]
+
+    def score_with_swap(self, leaving: Student, joining: Student) -> float:
+        """
+        Return the score the group would have if <leaving> were replaced by
+        <joining>, without changing the group. Only the similarities between
+        these two students and the other members are computed.
+
+        === Precondition ===
+        A student with the same id as <leaving> is in the group
+        <joining> is not in the group
+        """
+        index = [member.id for member in self._members].index(leaving.id)
+        answers_out, valid_out = self._profile(self._members[index])
+        answers_in, valid_in = self._profile(joining)
+        invalid = len(self._members) - len(self._valid_members) - \
+            (not valid_out)
+        if not self._questions or not valid_in or invalid:
+            return 0.0
+        others = [self._profiles[member.id][0] for member in
+                  self._valid_members if member.id != leaving.id]
+        score = 0.0
+        for i, question in enumerate(self._questions):
+            answer_out = answers_out[i]
+            answer_in = answers_in[i]
+            if self._pairwise[i]:
+                pair_sum = self._pair_sums[i]
+                singles = self._singles[i]
+                counts = self._counts[i]
+                key_in = question.answer_key(answer_in)
+                if valid_out:
+                    for other in others:
+                        pair_sum -= question.get_similarity(answer_out,
+                                                            other[i])
+                    key_out = question.answer_key(answer_out)
+                    count = counts[key_out]
+                    singles += (count == 2) - (count == 1)
+                    count = counts[key_in] - (key_in == key_out)
+                else:
+                    count = counts[key_in]
+                singles += (count == 0) - (count == 1)
+                for other in others:
+                    pair_sum += question.get_similarity(answer_in, other[i])
+                value = criterion_score(self._criteria[i],
+                                        len(self._members), pair_sum, singles)
+            else:
+                answers = self._answers[i][:]
+                answers[index] = answer_in
+                try:
+                    value = self._criteria[i].score_valid_answers(question,
+                                                                  answers)
+                except InvalidAnswerError:
+                    return 0.0
+            score += value * self._weights[i]
+        return score / len(self._questions)
+
+
+class RescoringAccumulator:
+    """
+    A group of students with the same interface as GroupAccumulator, for any
+    survey-like object that only provides score_students (for example a
+    CompiledSurvey). Every score is found by rescoring the whole group.
+
+    === Private Attributes ===
+    _survey: the object used to score the group
+    _members: the students in the group, in the order they were added
+    """
+
+    _survey: Any
+    _members: List[Student]
+
+    exact = True
+
+    def __init__(self, survey: Any, students: List[Student] = ()) -> None:
+        """ Initialize an accumulator that scores the group containing
+        <students> with <survey>.score_students.
+        """
+        self._survey = survey
+        self._members = list(students)
+
+    def __len__(self) -> int:
+        """ Return the number of students in the group """
+        return len(self._members)
+
+    def clear(self) -> None:
+        """ Remove every student from the group """
+        self._members = []
+
+    def get_members(self) -> List[Student]:
+        """ Return a list of the students in the group, in the order they were
+        added.
+        """
+        return self._members[:]
+
+    def add(self, student: Student) -> None:
+        """ Add <student> to the group """
+        self._members.append(student)
+
+    def remove(self, student: Student) -> None:
+        """ Remove the member of the group with the same id as <student> """
+        index = [member.id for member in self._members].index(student.id)
+        self._members.pop(index)
+
+    def score(self) -> float:
+        """ Return the score of the group """
+        return self._survey.score_students(self._members)
+
+    def score_with(self, student: Student) -> float:
+        """ Return the score the group would have if <student> were added to
+        it, without adding them.
+        """
+        return self._survey.score_students(self._members + [student])
+
+    def scores_with(self, students: List[Student]) -> List[float]:
+        """ Return the score the group would have with each student in
+        <students> added to it, in the order of <students>.
+        """
+        return [self.score_with(student) for student in students]
+
+    def score_with_swap(self, leaving: Student, joining: Student) -> float:
+        """ Return the score the group would have if <leaving> were replaced
+        by <joining>, without changing the group.
+        """
+        members = [joining if member.id == leaving.id else member
+                   for member in self._members]
+        return self._survey.score_students(members)
+
+
+Accumulator = Union[GroupAccumulator, RescoringAccumulator]
+
+
+def make_accumulator(survey: Any, students: List[Student] = ()) -> Accumulator:
+    """ Return an accumulator that scores the group containing <students> with
+    <survey>. Surveys get a GroupAccumulator, objects with a make_accumulator
+    method (such as a CompiledSurvey) get the accumulator it returns, and
+    anything else that provides score_students gets a RescoringAccumulator.
+    """
+    if isinstance(survey, Survey):
+        return GroupAccumulator(survey, students)
+    if hasattr(survey, 'make_accumulator'):
+        return survey.make_accumulator(students)
+    return RescoringAccumulator(survey, students)
+
+
+def exact_survey(survey: Any) -> Any:
+    """ Return the object whose score_students gives the exact scores of
+    <survey>: the survey it was compiled from if it is a CompiledSurvey, or
+    <survey> itself otherwise.
+    """
+    if isinstance(survey, Survey):
+        return survey
+    return getattr(survey, 'survey', survey)
+
+
+def best_candidate(survey: Any, group: Accumulator,
+                   candidates: List[Student], scores: List[float]) -> Student:
+    """
+    Return the student GreedyGrouper picks from <candidates> to add to <group>,
+    given that <scores>[i] is <group>.score_with(<candidates>[i]).
+
+    The pick is the last candidate in <candidates> with the highest value of
+    <survey>.score_students, exactly as if every candidate had been scored
+    with it. Since the scores of a GroupAccumulator may be off by rounding, the
+    candidates whose score is close to the highest one are rescored with
+    <survey>.score_students, once per distinct set of answers. A compiled
+    survey is rescored with the survey it was compiled from (see
+    exact_survey), so it picks the same candidates as that survey.
+
+    === Precondition ===
+    len(candidates) == len(scores) > 0
+    """
+    best = max(scores)
+    if group.exact:
+        near = [i for i, score in enumerate(scores) if score == best]
+        return candidates[near[-1]]
+    near = [i for i, score in enumerate(scores) if is_close(score, best)]
+    if len(near) == 1:
+        return candidates[near[0]]
+    members = group.get_members()
+    survey = exact_survey(survey)
+    exact_scores = {}
+    keys = []
+    for i in near:
+        key = group.profile_key(candidates[i])
+        if key not in exact_scores:
+            exact_scores[key] = survey.score_students(members +
+                                                      [candidates[i]])
+        keys.append(key)
+    best = max(exact_scores.values())
+    for i, key in zip(reversed(near), reversed(keys)):
+        if exact_scores[key] == best:
+            return candidates[i]
+    return candidates[near[-1]]
+
+
+def at_least(survey: Any, group: Accumulator, score1: float, score2: float,
+             students1: List[Student], students2: List[Student]) -> bool:
+    """
+    Return True iff <survey>.score_students(<students1>) is greater than or
+    equal to <survey>.score_students(<students2>), given that <score1> and
+    <score2> are the scores of <students1> and <students2> kept by an
+    accumulator like <group>.
+
+    The two groups are only rescored with <survey> (or the survey it was
+    compiled from, see exact_survey) when the accumulator's scores might be
+    off by rounding and are too close to tell apart.
+    """
+    if group.exact or not is_close(score1, score2):
+        return score1 >= score2
+    survey = exact_survey(survey)
+    return survey.score_students(students1) >= \
+        survey.score_students(students2)
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={'extra-imports': ['typing',
+                                                  'collections',
+                                                  'criterion',
+                                                  'survey',
+                                                  'course']})
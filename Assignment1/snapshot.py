@@ -0,0 +1,239 @@
+"""CSC148 Assignment 1
+
+=== CSC148 Winter 2020 ===
+Department of Computer Science,
+University of Toronto
+
+This code is provided solely for the personal and private use of
+students taking the CSC148 course at the University of Toronto.
+Copying for purposes other than this use is expressly prohibited.
+All forms of distribution of this code, whether as given or with
+any changes, are expressly prohibited.
+
+Authors: Misha Schwartz, Mario Badr, Christine Murad, Diane Horton, Sophia Huynh
+and Jaisie Sin
+
+All of the files in this directory and all subdirectories are:
+Copyright (c) 2020 Misha Schwartz, Mario Badr, Christine Murad, Diane Horton,
+Sophia Huynh and Jaisie Sin
+
+=== Module Description ===
+
+This file contains functions that save a course, the answers of its students
+and a survey to a binary snapshot file, and load them back.
+
+A snapshot file starts with a fixed-size header (MAGIC, the format VERSION and
+the length of the metadata), followed by the metadata as JSON (the course name,
+the students, and each question with its weight, criterion and where its
+answers are stored) and then the encoded answer columns of an AnswerTable.
+
+When a snapshot is loaded, the answer columns are not read or decoded. They
+are memory-mapped, so loading is fast and processes that load the same
+snapshot share the pages of the file until they change an answer.
+"""
+from __future__ import annotations
+import json
+import mmap
+import struct
+import sys
+from typing import Any, Dict, Optional, Tuple
+import criterion
+import survey
+from answer_table import AnswerTable
+from course import Course, Student
+
+# The first bytes of every snapshot file
+MAGIC = b'CSC148SS'
+# The version of the snapshot format written by save_snapshot
+VERSION = 1
+# The fixed-size header: MAGIC, the version and the length of the metadata
+_HEADER = struct.Struct('<8sIQ')
+# Every answer column starts at a multiple of this many bytes
+_ALIGN = 8
+
+
+def _padding(size: int) -> int:
+    """ Return the number of bytes needed after <size> bytes to reach a
+    multiple of _ALIGN.
+
+    >>> _padding(13)
+    3
+    >>> _padding(16)
+    0
+    """
+    return -size % _ALIGN
+
+
+def _question_data(question: survey.Question) -> Dict[str, Any]:
+    """ Return the class name and constructor arguments of <question>.
+
+    Raise ValueError if <question> is not one of the questions in the survey
+    module.
+    """
+    if type(question) is survey.YesNoQuestion:
+        args = [question.id, question.text]
+    elif type(question) in (survey.MultipleChoiceQuestion,
+                            survey.CheckboxQuestion):
+        args = [question.id, question.text, list(question.options)]
+    elif type(question) is survey.NumericQuestion:
+        args = [question.id, question.text, question._min, question._max]
+    else:
+        raise ValueError(f'cannot save a {type(question).__name__}')
+    return {'class': type(question).__name__, 'args': args}
+
+
+def _criterion_name(criterion_: criterion.Criterion) -> str:
+    """ Return the class name of <criterion_>.
+
+    Raise ValueError if <criterion_> is not one of the criteria in the
+    criterion module.
+    """
+    name = type(criterion_).__name__
+    if getattr(criterion, name, None) is not type(criterion_):
+        raise ValueError(f'cannot save a {name}')
+    return name
+
+
+def save_snapshot(filename: str, course_: Course,
+                  survey_: survey.Survey) -> None:
+    """
+    Save the students in <course_>, their answers to the questions in
+    <survey_>, and the questions, weights and criteria of <survey_> to a new
+    snapshot file <filename>.
+
+    Raise ValueError if <survey_> has a question or criterion that is not
+    defined in the survey or criterion modules.
+
+    === Precondition ===
+    The content of every answer can be written as JSON
+    """
+    questions = list(survey_.get_questions())
+    students = course_.get_students()
+    table = AnswerTable(questions)
+    for student in students:
+        table.add_student(student.id)
+        for question in questions:
+            answer = student.get_answer(question)
+            if answer is not None:
+                table.set_answer(student.id, question, answer)
+
+    blobs = []
+    offset = 0
+    q_meta = []
+    for question in questions:
+        data = _question_data(question)
+        data['weight'] = survey_._get_weight(question)
+        data['criterion'] = _criterion_name(survey_._get_criterion(question))
+        column = table.get_column(question)
+        validity = bytes(table.get_validity(question))
+        layout = {'valid': offset}
+        blobs.append(validity)
+        offset += len(validity) + _padding(len(validity))
+        if isinstance(column, list):
+            layout['answers'] = [None if answer is None else answer.content
+                                 for answer in column]
+        else:
+            encoded = column.tobytes()
+            layout['typecode'] = column.typecode
+            layout['column'] = offset
+            blobs.append(encoded)
+            offset += len(encoded) + _padding(len(encoded))
+        layout['extra'] = [[row, answer.content] for row, answer in
+                           table.get_extra(question).items()]
+        data['layout'] = layout
+        q_meta.append(data)
+
+    meta = json.dumps({'byteorder': sys.byteorder,
+                       'name': course_.name,
+                       'students': [[s.id, s.name] for s in students],
+                       'questions': q_meta}).encode('utf-8')
+    with open(filename, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(meta)))
+        f.write(meta)
+        f.write(bytes(_padding(_HEADER.size + len(meta))))
+        for blob in blobs:
+            f.write(blob)
+            f.write(bytes(_padding(len(blob))))
+
+
+def load_snapshot(filename: str, pool: Optional[survey.AnswerPool] = None
+                  ) -> Tuple[Course, survey.Survey]:
+    """
+    Return the course and survey saved in the snapshot file <filename>. The
+    students in the course have the answers that were saved, held in an
+    AnswerTable whose columns are memory-mapped from <filename>. Answers that
+    are not stored in a column are shared between students who gave the same
+    answer, using <pool> or a new pool if <pool> is None.
+
+    Raise ValueError if <filename> is not a snapshot file, was written by a
+    different version of the snapshot format or on a machine with a different
+    byte order.
+
+    === Precondition ===
+    <filename> is not changed while the course is in use
+    """
+    with open(filename, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    if len(buffer) < _HEADER.size:
+        raise ValueError(f'{filename} is not a snapshot file')
+    magic, version, length = _HEADER.unpack_from(buffer)
+    if magic != MAGIC:
+        raise ValueError(f'{filename} is not a snapshot file')
+    if version != VERSION:
+        raise ValueError(f'{filename} has unsupported snapshot version '
+                         f'{version}')
+    end = _HEADER.size + length
+    meta = json.loads(buffer[_HEADER.size:end].decode('utf-8'))
+    if meta['byteorder'] != sys.byteorder:
+        raise ValueError(f'{filename} was saved with {meta["byteorder"]} '
+                         f'endian byte order')
+    data = memoryview(buffer)[end + _padding(end):]
+    if pool is None:
+        pool = survey.AnswerPool()
+
+    questions = [getattr(survey, q_data['class'])(*q_data['args'])
+                 for q_data in meta['questions']]
+    survey_ = survey.Survey(questions)
+    students = [Student(id_, name) for id_, name in meta['students']]
+    columns = {}
+    valid = {}
+    extra = {}
+    n = len(students)
+    for question, q_data in zip(questions, meta['questions']):
+        survey_.set_weight(q_data['weight'], question)
+        survey_.set_criterion(getattr(criterion, q_data['criterion'])(),
+                              question)
+        layout = q_data['layout']
+        valid[question.id] = data[layout['valid']:layout['valid'] + n]
+        if 'typecode' in layout:
+            start = layout['column']
+            size = n * struct.calcsize(layout['typecode'])
+            columns[question.id] = \
+                data[start:start + size].cast(layout['typecode'])
+        else:
+            columns[question.id] = [None if content is None else
+                                    pool.get_answer(question, content)
+                                    for content in layout['answers']]
+        for row, content in layout['extra']:
+            extra[(question.id, row)] = pool.get_answer(question, content)
+
+    table = AnswerTable(questions)
+    table.load_columns([student.id for student in students], columns, valid,
+                       extra)
+    course_ = Course(meta['name'])
+    course_.enroll_many(students)
+    course_.set_answer_table(table)
+    return course_, survey_
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={'extra-imports': ['typing',
+                                                  'json',
+                                                  'mmap',
+                                                  'struct',
+                                                  'sys',
+                                                  'criterion',
+                                                  'survey',
+                                                  'answer_table',
+                                                  'course']})
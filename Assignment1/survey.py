@@ -23,13 +23,45 @@ This file contains classes that describe a survey as well as classes that
 described different types of questions that can be asked in a given survey.
 """
 from __future__ import annotations
-from typing import TYPE_CHECKING, Union, Dict, List
+from collections import Counter, OrderedDict
+from typing import TYPE_CHECKING, Any, Union, Dict, List, Optional, \
+    Tuple, FrozenSet, Hashable
 from criterion import HomogeneousCriterion, InvalidAnswerError
 if TYPE_CHECKING:
     from criterion import Criterion
     from grouper import Grouping
     from course import Student
 
+# The largest number of answers to a numeric question whose group similarity
+# is summed pair by pair, in the order of the pairwise definition. Summing in
+# another order can change a score by rounding, and so change which of two
+# groups with the same score a grouper picks.
+PAIRWISE_LIMIT = 32
+
+
+def _popcount(mask: int) -> int:
+    """ Return the number of bits set in the non-negative integer <mask>
+
+    >>> _popcount(0b1011)
+    3
+    """
+    return bin(mask).count('1')
+
+
+def is_valid_answer(question: Question, answer: Optional[Answer]) -> bool:
+    """ Return True iff <answer> is not None and is a valid answer to
+    <question>.
+
+    Unlike Question.validate_answer, an answer whose content has the wrong type
+    for <question> is reported as invalid instead of raising an error.
+    """
+    if answer is None:
+        return False
+    try:
+        return bool(question.validate_answer(answer))
+    except (TypeError, ValueError):
+        return False
+
 
 class Question:
     """ An abstract class representing a question used in a survey
@@ -42,6 +74,8 @@ class Question:
     text is not the empty string
     """
 
+    __slots__ = ('id', 'text')
+
     id: int
     text: str
 
@@ -78,6 +112,36 @@ class Question:
         """
         raise NotImplementedError
 
+    def get_group_similarity(self, answers: List[Answer]) -> float:
+        """ Return the average similarity of every combination of two answers
+        in <answers>.
+
+        Each pair of positions in <answers> is counted once, even if the same
+        answer object appears at both positions.
+
+        === Precondition ===
+        len(answers) > 1
+        Every answer in <answers> is a valid answer to this question
+        """
+        score = 0.0
+        for i, answer in enumerate(answers):
+            for other in answers[i + 1:]:
+                score += self.get_similarity(answer, other)
+        return score / (len(answers) * (len(answers) - 1) / 2)
+
+    def answer_key(self, answer: Answer) -> Hashable:
+        """ Return a hashable key for <answer> such that two valid answers to
+        this question have the same key iff they are the same answer.
+
+        By default an answer's key is its content (as a tuple if it is a list).
+
+        === Precondition ===
+        <answer> is a valid answer to this question
+        """
+        if isinstance(answer.content, list):
+            return tuple(answer.content)
+        return answer.content
+
 
 class MultipleChoiceQuestion(Question):
     """ A question whose answers can be one of several options
@@ -91,6 +155,8 @@ class MultipleChoiceQuestion(Question):
     text is not the empty string
     """
 
+    __slots__ = ('options',)
+
     id: int
     text: str
     options: List[str]
@@ -145,6 +211,23 @@ class MultipleChoiceQuestion(Question):
         else:
             return 0.0
 
+    def get_group_similarity(self, answers: List[Answer]) -> float:
+        """ Return the average similarity of every combination of two answers
+        in <answers>.
+
+        Two answers are only similar when they are the same option, so the
+        number of similar pairs is found by counting how many times each
+        option was chosen.
+
+        === Precondition ===
+        len(answers) > 1
+        Every answer in <answers> is a valid answer to this question
+        """
+        same = 0
+        for count in Counter(answer.content for answer in answers).values():
+            same += count * (count - 1) // 2
+        return same / (len(answers) * (len(answers) - 1) // 2)
+
 
 class NumericQuestion(Question):
     """ A question whose answer can be an integer between some
@@ -162,6 +245,8 @@ class NumericQuestion(Question):
     text is not the empty string
     """
 
+    __slots__ = ('_min', '_max')
+
     id: int
     text: str
     _min: int
@@ -228,6 +313,39 @@ class NumericQuestion(Question):
         return 1.0 - (abs(answer1.content - answer2.content) /
                       (self._max - self._min))
 
+    def get_group_similarity(self, answers: List[Answer]) -> float:
+        """ Return the average similarity of every combination of two answers
+        in <answers>.
+
+        Up to PAIRWISE_LIMIT answers, the similarities of every pair are added
+        up in order, so that the result is exactly the average of the values
+        of get_similarity.
+
+        For more answers, the sum of the absolute differences between every
+        pair of answers is found in one pass after sorting the answers: the
+        answer at position j is larger than the j answers before it, so it
+        contributes j times its own value minus the sum of those j answers.
+
+        === Precondition ===
+        len(answers) > 1
+        Every answer in <answers> is a valid answer to this question
+        """
+        if len(answers) <= PAIRWISE_LIMIT:
+            contents = [answer.content for answer in answers]
+            span = self._max - self._min
+            score = 0.0
+            for i, value in enumerate(contents):
+                for other in contents[i + 1:]:
+                    score += 1.0 - (abs(value - other) / span)
+            return score / (len(contents) * (len(contents) - 1) // 2)
+        difference = 0
+        prefix = 0
+        for j, value in enumerate(sorted(answer.content for answer in answers)):
+            difference += j * value - prefix
+            prefix += value
+        pairs = len(answers) * (len(answers) - 1) / 2
+        return 1.0 - difference / ((self._max - self._min) * pairs)
+
 
 class YesNoQuestion(MultipleChoiceQuestion):
     """ A question whose answer is either yes (represented by True) or
@@ -240,6 +358,9 @@ class YesNoQuestion(MultipleChoiceQuestion):
     === Representation Invariants ===
     text is not the empty string
     """
+
+    __slots__ = ()
+
     id: int
     text: str
 
@@ -263,9 +384,12 @@ class CheckboxQuestion(Question):
     text is not the empty string
     """
 
+    __slots__ = ('options', '_bits')
+
     id: int
     text: str
     options: List[str]
+    _bits: Dict[str, int]
 
     def __init__(self, id_: int, text: str, options: List[str]) -> None:
         """
@@ -278,7 +402,7 @@ class CheckboxQuestion(Question):
         """
         Question.__init__(self, id_, text)
         self.options = options
-
+        self._bits = {option: 1 << i for i, option in enumerate(options)}
 
     def __str__(self) -> str:
         """
@@ -303,13 +427,39 @@ class CheckboxQuestion(Question):
         answers = list(answer.content)
         if not answers:
             return False
+        seen = 0
         for i in answers:
-            if answers.count(i) > 1:
+            try:
+                bit = self._bits.get(i, 0)
+            except TypeError:
                 return False
-            if i not in self.options:
+            if not bit or seen & bit:
                 return False
+            seen |= bit
         return True
 
+    def encode_answer(self, answer: Answer) -> int:
+        """
+        Return a bitmask of the options chosen in <answer>, where bit i is set
+        iff self.options[i] is in <answer>.content.
+
+        === Precondition ===
+        <answer> is a valid answer to this question
+        """
+        mask = 0
+        for option in answer.content:
+            mask |= self._bits[option]
+        return mask
+
+    def answer_key(self, answer: Answer) -> Hashable:
+        """ Return a hashable key for <answer> such that two valid answers to
+        this question have the same key iff they have the same options chosen,
+        in any order.
+
+        === Precondition ===
+        <answer> is a valid answer to this question
+        """
+        return self.encode_answer(answer)
 
     def get_similarity(self, answer1: Answer, answer2: Answer) -> float:
         """
@@ -328,18 +478,26 @@ class CheckboxQuestion(Question):
         === Precondition ===
         <answer1> and <answer2> are both valid answers to this question
         """
-        common_both = []
-        unique_total = []
+        mask1 = self.encode_answer(answer1)
+        mask2 = self.encode_answer(answer2)
+        return _popcount(mask1 & mask2) / _popcount(mask1 | mask2)
 
-        answers = list(self.options)
-        for i in answers:
-            if i in answer1.content and i in answer2.content:
-                common_both.append(i)
-                unique_total.append(i)
-            elif (i in answer2.content or i in answer1.content) and not \
-                    (i in answer1.content and i in answer2.content):
-                unique_total.append(i)
-        return len(common_both) / len(unique_total)
+    def get_group_similarity(self, answers: List[Answer]) -> float:
+        """ Return the average similarity of every combination of two answers
+        in <answers>.
+
+        Each answer is encoded as a bitmask once, rather than once per pair.
+
+        === Precondition ===
+        len(answers) > 1
+        Every answer in <answers> is a valid answer to this question
+        """
+        masks = [self.encode_answer(answer) for answer in answers]
+        score = 0.0
+        for i, mask in enumerate(masks):
+            for other in masks[i + 1:]:
+                score += _popcount(mask & other) / _popcount(mask | other)
+        return score / (len(masks) * (len(masks) - 1) / 2)
 
 
 class Answer:
@@ -348,6 +506,9 @@ class Answer:
     === Public Attributes ===
     content: an answer to a single question
     """
+
+    __slots__ = ('content',)
+
     content: Union[str, bool, int, List[str]]
 
     def __init__(self,
@@ -360,6 +521,67 @@ class Answer:
         return question.validate_answer(self)
 
 
+def _intern_key(content: Any) -> Hashable:
+    """ Return a hashable key for the answer content <content> such that two
+    contents have the same key iff they are equal and of the same types, so
+    that for example True and 1 have different keys. The key cannot be hashed
+    if <content> cannot be.
+
+    >>> _intern_key(['a', 'b'])
+    (<class 'list'>, (<class 'str'>, 'a'), (<class 'str'>, 'b'))
+    >>> _intern_key(True) == _intern_key(1)
+    False
+    """
+    if isinstance(content, list):
+        return (list,) + tuple((type(item), item) for item in content)
+    return type(content), content
+
+
+class AnswerPool:
+    """
+    A table of shared answers, so that all students who give the same answer
+    to a question can be given one Answer object instead of one each.
+
+    === Private Attributes ===
+    _answers: a dictionary mapping the id of each question to a dictionary
+              mapping the key (see _intern_key) of the content of each answer
+              given to it to the shared answer with that content
+
+    === Precondition ===
+    The content of an answer returned by get_answer is never changed, since
+    it may be shared.
+    """
+
+    __slots__ = ('_answers',)
+
+    _answers: Dict[int, Dict[Hashable, Answer]]
+
+    def __init__(self) -> None:
+        """ Initialize an empty pool of answers """
+        self._answers = {}
+
+    def __len__(self) -> int:
+        """ Return the number of distinct answers in this pool """
+        return sum(len(answers) for answers in self._answers.values())
+
+    def get_answer(self, question: Question, content: Any) -> Answer:
+        """
+        Return an answer to <question> with content <content>, which is the
+        same object every time it is called with <question> and equal content
+        of the same type.
+
+        A new answer is returned each time if <content> cannot be hashed.
+        """
+        answers = self._answers.setdefault(question.id, {})
+        try:
+            key = _intern_key(content)
+            if key not in answers:
+                answers[key] = Answer(content)
+            return answers[key]
+        except TypeError:
+            return Answer(content)
+
+
 class Survey:
     """
     A survey containing questions as well as criteria and weights used to
@@ -375,6 +597,15 @@ class Survey:
               question does not have an associated criterion in _criteria
     _default_weight: a weight to use to evaluate a question if the
               question does not have an associated weight in _weights
+    _version: a number that is increased every time a weight or criterion in
+              this survey is changed
+    _cache: a dictionary mapping a (set of student ids, _version) pair to the
+            score of those students, in order from least to most recently
+            used, or None if scores are not cached
+    _cache_size: the maximum number of scores kept in _cache
+    _hits: the number of scores that were found in _cache
+    _misses: the number of scores that were looked up in _cache but had to
+             be calculated
 
     === Representation Invariants ===
     No two questions on this survey have the same id
@@ -383,6 +614,8 @@ class Survey:
     Each key in _weights occurs as a key in _questions
     Each value in _weights is greater than 0
     _default_weight > 0
+    If _cache is not None, len(_cache) <= _cache_size and every key in _cache
+        has _version as its second element
     """
 
     _questions: Dict[int, Question]
@@ -390,6 +623,11 @@ class Survey:
     _weights: Dict[int, int]
     _default_criterion: Criterion
     _default_weight: int
+    _version: int
+    _cache: Optional[OrderedDict[Tuple[FrozenSet[int], int], float]]
+    _cache_size: int
+    _hits: int
+    _misses: int
 
     def __init__(self, questions: List[Question]) -> None:
         """
@@ -401,6 +639,11 @@ class Survey:
         self._default_criterion = HomogeneousCriterion()
         self._criteria = {}
         self._weights = {}
+        self._version = 0
+        self._cache = None
+        self._cache_size = 0
+        self._hits = 0
+        self._misses = 0
         if not questions:
             self._questions = {}
         else:
@@ -481,6 +724,7 @@ class Survey:
         if weight <= 0:
             weight = 0
         self._weights[question.id] = weight
+        self._changed()
         return True
 
 
@@ -495,8 +739,51 @@ class Survey:
         if question.id not in self._questions:
             return False
         self._criteria[question.id] = criterion
+        self._changed()
         return True
 
+    def _changed(self) -> None:
+        """
+        Record that a weight or criterion in this survey has changed, so that
+        no score calculated before the change is used again.
+        """
+        self._version += 1
+        if self._cache is not None:
+            self._cache.clear()
+
+    def enable_cache(self, maxsize: int = 4096) -> None:
+        """
+        Start caching the scores returned by score_students, keeping at most
+        <maxsize> of the most recently used scores. Scores are cached by the
+        set of ids of the students scored.
+
+        Any scores already cached are discarded and the hit and miss counts are
+        reset.
+
+        === Precondition ===
+        maxsize > 0
+        The answers of the students scored do not change while the cache is
+            enabled
+        """
+        self._cache = OrderedDict()
+        self._cache_size = maxsize
+        self._hits = 0
+        self._misses = 0
+
+    def disable_cache(self) -> None:
+        """ Stop caching scores and discard any cached scores """
+        self._cache = None
+
+    def cache_info(self) -> Dict[str, int]:
+        """
+        Return a dictionary with the number of cache 'hits' and 'misses' since
+        the cache was enabled, the number of scores currently cached ('size')
+        and the maximum number of scores that can be cached ('maxsize').
+        """
+        return {'hits': self._hits, 'misses': self._misses,
+                'size': len(self._cache) if self._cache is not None else 0,
+                'maxsize': self._cache_size if self._cache is not None else 0}
+
     def score_students(self, students: List[Student]) -> float:
         """
         Return a quality score for <students> calculated based on their answers
@@ -514,41 +801,70 @@ class Survey:
         If an InvalidAnswerError would be raised by calling this method, or if
         there are no questions in <self>, this method should return zero.
 
+        The validity of each answer is read from the students (see
+        Student.has_answer) rather than checked again, and criteria are scored
+        with Criterion.score_valid_answers.
+
+        If caching is enabled (see enable_cache), a cached score for the same
+        set of students is returned when there is one.
+
         === Precondition ===
         All students in <students> have an answer to all questions in this
             survey
         """
-        count = 0
-        score = 0
+        if self._cache is None:
+            return self._score_students(students)
+        key = (frozenset(student.id for student in students), self._version)
+        if len(key[0]) != len(students):
+            return self._score_students(students)
+        if key in self._cache:
+            self._hits += 1
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        self._misses += 1
+        score = self._score_students(students)
+        self._cache[key] = score
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return score
+
+    def _score_students(self, students: List[Student]) -> float:
+        """
+        Return the score of <students> as described in score_students, without
+        using the cache.
+        """
         if self._questions == {}:
             return 0.0
-        try:
-            for question_id in self._questions:
-                answers = self.get_student_ans(question_id, students)
-                question = self._questions[question_id]
-                criteria = self._get_criterion(question)
-                score += criteria.score_answers(question, answers) * \
+        score = 0
+        for question_id in self._questions:
+            answers = self.get_student_ans(question_id, students)
+            if answers is None:
+                return 0.0
+            question = self._questions[question_id]
+            criteria = self._get_criterion(question)
+            try:
+                score += criteria.score_valid_answers(question, answers) * \
                     self._get_weight(question)
-                count += 1
-
-        except InvalidAnswerError:
-            return 0.0
-
-        return score / count
+            except InvalidAnswerError:
+                return 0.0
+        return score / len(self._questions)
 
     def get_student_ans(self, question_id: int,
-                        students: List[Student]) -> List[Answer]:
+                        students: List[Student]) -> Optional[List[Answer]]:
         """
         Return a list of answers that are given for the question who's id is
-        question_id from all the students who completed the survey
+        question_id from all the students who completed the survey, or None if
+        any of these students does not have a valid answer to that question.
         """
-        answers = []
         question = self._questions[question_id]
+        table = students[0].get_answer_table() if students else None
+        if table is not None:
+            return table.get_valid_answers(question, students)
+        answers = []
         for student in students:
-            ans = student.get_answer(question)
-            if not question.validate_answer(ans):
-                raise InvalidAnswerError
-            answers.append(ans)
+            if not student.has_answer(question):
+                return None
+            answers.append(student.get_answer(question))
         return answers
 
     def score_grouping(self, grouping: Grouping) -> float:
@@ -582,6 +898,7 @@ class Survey:
 if __name__ == '__main__':
     import python_ta
     python_ta.check_all(config={'extra-imports': ['typing',
+                                                  'collections',
                                                   'criterion',
                                                   'course',
                                                   'grouper']})
@@ -1,10 +1,23 @@
+import itertools
+import json
+import random
+import time
+import tracemalloc
 import pytest
 import course
 import survey
 import criterion
 import grouper
+import compiled
+import batch
+import cluster
+import benchmark
+import instrument
+import scoring
+import snapshot
+import example_usage
 import pytest
-from typing import List, Set, FrozenSet
+from typing import Any, List, Set, FrozenSet, Tuple
 
 @pytest.fixture
 def students() -> List[course.Student]:
@@ -100,12 +113,52 @@ class TestCourse:
         assert len(empty_course.students) == 3
         students = students[0:6]
         empty_course.enroll_students(students)
-        assert len(empty_course.students) == 9
+        assert len(empty_course.students) == 3
 
     def test__check_duplicates(self, students, empty_course):
         students = students[4:8]
         assert len(empty_course._check_duplicates(students)) == 3
 
+    def test_enroll_many(self, students, empty_course):
+        assert empty_course.enroll_many(iter(students[4:8])) == 3
+        assert empty_course.enroll_many(s for s in students) == 6
+        assert empty_course.enroll_many(students) == 0
+        ids = [s.id for s in empty_course.get_students()]
+        assert ids == sorted(ids) and len(ids) == len(set(ids)) == 9
+        assert len(empty_course.students) == 9
+
+    def test_get_students_sorted(self, empty_course):
+        ids = list(range(200))
+        random.Random(148).shuffle(ids)
+        for start in range(0, 200, 30):
+            empty_course.enroll_many(course.Student(i, str(i))
+                                     for i in ids[start:start + 30])
+            enrolled = [s.id for s in empty_course.get_students()]
+            assert enrolled == sorted(ids[:start + 30])
+
+    def test_enroll_many_small(self, empty_course):
+        ids = list(range(3000))
+        random.Random(148).shuffle(ids)
+        for id_ in ids:
+            student = course.Student(id_, str(id_))
+            assert empty_course.enroll_many([student]) == 1
+        enrolled = [s.id for s in empty_course.get_students()]
+        assert enrolled == list(range(3000))
+        assert empty_course.get_students() is empty_course.get_students()
+
+    def test_load_course_duplicate_id(self):
+        data = {'name': 'csc148', 'students': [
+            {'id': 1, 'name': 'Zoro'}, {'id': 2, 'name': 'Anna'},
+            {'id': 1, 'name': 'Sophia'}]}
+        course_ = example_usage.load_course(data)
+        assert [(s.id, s.name) for s in course_.get_students()] == \
+            [(1, 'Zoro'), (2, 'Anna')]
+
+    def test_get_student(self, students, course_with_students):
+        for student in students:
+            assert course_with_students.get_student(student.id).id == student.id
+        assert course_with_students.get_student(-1) is None
+
 
     #def test_all_answered(self, ):
 
@@ -131,6 +184,1407 @@ class TestMultipleChoiceQuestion:
 
 
 
+@pytest.fixture
+def example_data():
+    course_data = example_usage.load_data('example_course.json')
+    survey_data = example_usage.load_data('example_survey.json')
+    survey_ = example_usage.load_survey(survey_data)
+    course_ = example_usage.load_course(course_data)
+    example_usage.answer_questions(survey_, course_, course_data)
+    return course_, survey_
+
+
+class TestCompiledSurvey:
+    def test_score_students(self, example_data):
+        course_, survey_ = example_data
+        compiled_ = compiled.CompiledSurvey(survey_, course_)
+        students = list(course_.get_students())
+        for size in range(1, len(students) + 1):
+            for group in itertools.combinations(students, size):
+                assert compiled_.score_students(list(group)) == \
+                    pytest.approx(survey_.score_students(list(group)))
+
+    def test_score_students_invalid(self, example_data):
+        course_, survey_ = example_data
+        students = list(course_.get_students())
+        question = list(survey_.get_questions())[0]
+        students[0].set_answer(question, survey.Answer('not an option'))
+        compiled_ = compiled.CompiledSurvey(survey_, course_)
+        assert compiled_.score_students(students[:2]) == 0.0
+        assert compiled_.score_students(students[1:3]) == \
+            pytest.approx(survey_.score_students(students[1:3]))
+
+    def test_greedy_grouping(self, example_data):
+        course_, survey_ = example_data
+        compiled_ = compiled.CompiledSurvey(survey_, course_)
+        grouping = grouper.GreedyGrouper(2).make_grouping(course_, compiled_)
+        assert compiled_.score_grouping(grouping) == \
+            pytest.approx(survey_.score_grouping(grouping))
+
+    def test_accumulator(self):
+        class Strict(criterion.HomogeneousCriterion):
+            def score_valid_answers(self, question, answers):
+                if len(answers) > 3:
+                    raise criterion.InvalidAnswerError
+                return super().score_valid_answers(question, answers)
+
+        course_, survey_ = benchmark.generate(30, seed=2)
+        questions = list(survey_.get_questions())
+        survey_.set_criterion(Strict(), questions[0])
+        students = list(course_.get_students())
+        students[3].set_answer(questions[1], survey.Answer('not an option'))
+        compiled_ = compiled.CompiledSurvey(survey_, course_)
+        accumulator = scoring.make_accumulator(compiled_)
+        assert isinstance(accumulator, compiled.CompiledAccumulator)
+        rand = random.Random(1)
+        for _ in range(100):
+            members = accumulator.get_members()
+            free = [s for s in students if s not in members]
+            if len(members) > 1 and rand.random() < 0.4:
+                accumulator.remove(rand.choice(members))
+            else:
+                accumulator.add(rand.choice(free))
+            members = accumulator.get_members()
+            free = [s for s in students if s not in members]
+            assert accumulator.score() == \
+                pytest.approx(survey_.score_students(members), abs=1e-12)
+            assert accumulator.scores_with(free) == pytest.approx(
+                [survey_.score_students(members + [s]) for s in free],
+                abs=1e-12)
+            leaving, joining = rand.choice(members), rand.choice(free)
+            swapped = [joining if s is leaving else s for s in members]
+            assert accumulator.score_with_swap(leaving, joining) == \
+                pytest.approx(survey_.score_students(swapped), abs=1e-12)
+
+    def test_same_groupings(self):
+        course_, survey_ = benchmark.generate(120, seed=1)
+        compiled_ = compiled.CompiledSurvey(survey_, course_)
+        for make in [lambda: grouper.GreedyGrouper(4),
+                     lambda: grouper.WindowGrouper(4),
+                     lambda: grouper.LocalSearchGrouper(4, max_iterations=2000,
+                                                        seed=1)]:
+            assert member_ids(make().make_grouping(course_, survey_)) == \
+                member_ids(make().make_grouping(course_, compiled_))
+
+    def test_faster_than_survey(self):
+        course_, survey_ = benchmark.generate(300, seed=1)
+        start = time.perf_counter()
+        expected = grouper.GreedyGrouper(4).make_grouping(course_, survey_)
+        survey_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        compiled_ = compiled.CompiledSurvey(survey_, course_)
+        grouping = grouper.GreedyGrouper(4).make_grouping(course_, compiled_)
+        compiled_seconds = time.perf_counter() - start
+        assert member_ids(grouping) == member_ids(expected)
+        assert compiled_seconds < survey_seconds / 2
+
+
+
+def pairwise_similarity(question, answers):
+    total = 0.0
+    pairs = 0
+    for i, answer in enumerate(answers):
+        for other in answers[i + 1:]:
+            total += question.get_similarity(answer, other)
+            pairs += 1
+    return total / pairs
+
+
+class TestHomogeneousCriterion:
+    def test_score_answers_multiple_choice(self):
+        question = survey.MultipleChoiceQuestion(1, 'why?', ['a', 'b', 'c'])
+        answers = [survey.Answer(c) for c in 'abacbaac']
+        score = criterion.HomogeneousCriterion().score_answers(question,
+                                                               answers)
+        assert score == pairwise_similarity(question, answers)
+
+    def test_score_answers_yes_no(self):
+        question = survey.YesNoQuestion(1, 'really?')
+        answers = [survey.Answer(b) for b in [True, False, True, True]]
+        score = criterion.HomogeneousCriterion().score_answers(question,
+                                                               answers)
+        assert score == 0.5
+
+    def test_score_answers_shared_answer(self):
+        question = survey.MultipleChoiceQuestion(1, 'why?', ['a', 'b'])
+        same = survey.Answer('a')
+        answers = [same, same, survey.Answer('b')]
+        score = criterion.HomogeneousCriterion().score_answers(question,
+                                                               answers)
+        assert score == pytest.approx(1 / 3)
+
+
+class TestNumericQuestion:
+    def test_get_group_similarity(self):
+        question = survey.NumericQuestion(1, 'what?', -2, 4)
+        answers = [survey.Answer(v) for v in [0, 4, -1, 1, -2, 0.5, 4, 2]]
+        assert question.get_group_similarity(answers) == \
+            pytest.approx(pairwise_similarity(question, answers))
+
+    def test_get_group_similarity_identical(self):
+        question = survey.NumericQuestion(1, 'what?', 0, 10)
+        answers = [survey.Answer(3) for _ in range(5)]
+        assert question.get_group_similarity(answers) == 1.0
+
+    def test_small_groups_exact(self):
+        question = survey.NumericQuestion(1, 'what?', 0, 7)
+        rand = random.Random(5)
+        for _ in range(200):
+            answers = [survey.Answer(rand.randint(0, 7))
+                       for _ in range(rand.randint(2, 6))]
+            assert question.get_group_similarity(answers) == \
+                pairwise_similarity(question, answers)
+
+    def test_window_tie_unchanged(self):
+        question = survey.NumericQuestion(1, 'what?', 0, 7)
+        course_ = answered_course(question, [4, 2, 7, 5])
+        grouping = grouper.WindowGrouper(3).make_grouping(
+            course_, survey.Survey([question]))
+        assert member_ids(grouping) == [[1, 2, 3], [0]]
+
+    def test_heterogeneous_section(self):
+        question = survey.NumericQuestion(1, 'what?', 0, 100)
+        answers = [survey.Answer((i * 37) % 101) for i in range(300)]
+        score = criterion.HeterogeneousCriterion().score_answers(question,
+                                                                 answers)
+        assert score == pytest.approx(
+            1.0 - pairwise_similarity(question, answers))
+
+
+class TestCheckboxQuestion:
+    def test_validate_answer(self, questions, answers):
+        check = questions[3]
+        assert check.validate_answer(answers[3][0])
+        assert check.validate_answer(answers[3][4])
+        assert not check.validate_answer(answers[3][2])
+        assert not check.validate_answer(answers[3][5])
+        assert not check.validate_answer(survey.Answer([]))
+
+    def test_encode_answer(self, questions):
+        check = questions[3]
+        assert check.encode_answer(survey.Answer(['d', 'a'])) == 0b1001
+
+    def test_get_similarity(self, questions):
+        check = questions[3]
+        similarity = check.get_similarity(survey.Answer(['a', 'b', 'c']),
+                                          survey.Answer(['c', 'b', 'd']))
+        assert similarity == 0.5
+
+    def test_compiled_many_options(self):
+        options = [str(i) for i in range(30)]
+        question = survey.CheckboxQuestion(1, 'how?', options)
+        survey_ = survey.Survey([question])
+        course_ = course.Course('csc148')
+        students = [course.Student(i, f'student {i}') for i in range(12)]
+        for i, student in enumerate(students):
+            content = options[i:i + 3 + i % 4] + options[-1 - i % 5:]
+            student.set_answer(question, survey.Answer(content))
+        course_.enroll_students(students)
+        compiled_ = compiled.CompiledSurvey(survey_, course_)
+        assert compiled_.score_students(students) == \
+            pytest.approx(survey_.score_students(students))
+
+
+class TestAnswerTable:
+    def test_round_trip(self, example_data):
+        course_, survey_ = example_data
+        questions = list(survey_.get_questions())
+        students = course_.get_students()
+        before = [[student.get_answer(q).content for q in questions]
+                  for student in students]
+        score = survey_.score_students(list(students))
+        table = course_.attach_answer_table(questions)
+        assert len(table) == len(students)
+        for student, contents in zip(students, before):
+            assert student._questions == {}
+            for question, content in zip(questions, contents):
+                answer = student.get_answer(question)
+                if isinstance(content, list):
+                    assert sorted(answer.content) == sorted(content)
+                else:
+                    assert answer.content == content
+        assert survey_.score_students(list(students)) == pytest.approx(score)
+
+    def test_invalid_and_missing(self, questions, answers):
+        course_ = course.Course('csc148')
+        student = course.Student(1, 'Zoro')
+        course_.enroll_students([student])
+        course_.attach_answer_table(questions)
+        for question in questions:
+            assert student.get_answer(question) is None
+        invalid = [answers[0][6], survey.Answer(float('nan')), answers[3][5]]
+        for question, answer in zip([questions[0], questions[1],
+                                     questions[3]], invalid):
+            student.set_answer(question, answer)
+            assert student.get_answer(question) is answer
+            assert not student.has_answer(question)
+        student.set_answer(questions[1], survey.Answer(0.5))
+        assert student.get_answer(questions[1]).content == 0.5
+
+    def test_enroll_after_attach(self, questions, answers):
+        course_ = course.Course('csc148')
+        course_.attach_answer_table(questions)
+        student = course.Student(1, 'Zoro')
+        student.set_answer(questions[2], answers[2][0])
+        course_.enroll_students([student])
+        assert course_.get_answer_table().has_student(1)
+        assert student._questions == {}
+        assert student.get_answer(questions[2]).content is True
+
+    def test_types_kept(self, questions):
+        course_ = course.Course('csc148')
+        students = [course.Student(i, f'student {i}') for i in range(3)]
+        course_.enroll_students(students)
+        course_.attach_answer_table(questions)
+        for content in [1, 0, 3.0]:
+            for question in questions[1:3]:
+                students[0].set_answer(question, survey.Answer(content))
+                read = students[0].get_answer(question).content
+                assert read == content and type(read) is type(content)
+
+    def test_answers_shared(self):
+        course_, survey_ = make_course(20, 9)
+        students = list(course_.get_students())
+        before = [[student.get_answer(q).content for q in
+                   survey_.get_questions()] for student in students]
+        score = survey_.score_students(students)
+        course_.attach_answer_table(list(survey_.get_questions()))
+        question = list(survey_.get_questions())[1]
+        answers = survey_.get_student_ans(question.id, students)
+        assert [answer.content for answer in answers] == \
+            [contents[1] for contents in before]
+        for answer, student in zip(answers, students):
+            assert answer is student.get_answer(question)
+        assert survey_.score_students(students) == pytest.approx(score)
+        students[3].set_answer(question, survey.Answer(11))
+        assert survey_.get_student_ans(question.id, students) is None
+        assert survey_.score_students(students) == 0.0
+
+
+def make_course(n: int, seed: int) -> Tuple[course.Course, survey.Survey]:
+    rand = random.Random(seed)
+    questions = [survey.MultipleChoiceQuestion(1, 'why?', ['a', 'b', 'c']),
+                 survey.NumericQuestion(2, 'what?', 0, 10),
+                 survey.YesNoQuestion(3, 'really?'),
+                 survey.CheckboxQuestion(4, 'how?', ['a', 'b', 'c', 'd'])]
+    survey_ = survey.Survey(questions)
+    survey_.set_criterion(criterion.HeterogeneousCriterion(), questions[1])
+    survey_.set_criterion(criterion.LonelyMemberCriterion(), questions[2])
+    survey_.set_weight(3, questions[0])
+    students = []
+    for i in range(n):
+        student = course.Student(rand.randrange(10 ** 6), f'student {i}')
+        student.set_answer(questions[0], survey.Answer(rand.choice('abc')))
+        student.set_answer(questions[1], survey.Answer(rand.randint(0, 10)))
+        student.set_answer(questions[2],
+                           survey.Answer(rand.choice([True, False])))
+        student.set_answer(questions[3],
+                           survey.Answer(rand.sample('abcd',
+                                                     rand.randint(1, 3))))
+        students.append(student)
+    course_ = course.Course('csc148')
+    course_.enroll_students(students)
+    return course_, survey_
+
+
+def member_ids(grouping: grouper.Grouping) -> List[List[int]]:
+    return [[member.id for member in group.get_members()]
+            for group in grouping.get_groups()]
+
+
+class TestGroupAccumulator:
+    def test_add_remove(self):
+        course_, survey_ = make_course(12, 1)
+        students = list(course_.get_students())
+        accumulator = scoring.GroupAccumulator(survey_, students[:5])
+        assert accumulator.score() == \
+            pytest.approx(survey_.score_students(students[:5]))
+        assert accumulator.score_with(students[5]) == \
+            pytest.approx(survey_.score_students(students[:6]))
+        accumulator.remove(students[2])
+        accumulator.add(students[7])
+        expected = students[:2] + students[3:5] + [students[7]]
+        assert accumulator.get_members() == expected
+        assert accumulator.score() == \
+            pytest.approx(survey_.score_students(expected))
+
+    def test_invalid_member(self, questions, answers):
+        survey_ = survey.Survey(questions[:1])
+        students = [course.Student(i, str(i)) for i in range(3)]
+        for student, answer in zip(students, [answers[0][0], answers[0][6],
+                                              answers[0][4]]):
+            student.set_answer(questions[0], answer)
+        accumulator = scoring.GroupAccumulator(survey_, students)
+        assert accumulator.score() == 0.0
+        accumulator.remove(students[1])
+        assert accumulator.score() == 1.0
+
+
+class TestGreedyGrouper:
+    def test_matches_rescoring(self):
+        course_, survey_ = make_course(30, 2)
+        free_students = list(course_.get_students())
+        expected = []
+        while len(free_students) > 3:
+            group = [free_students.pop(0)]
+            while len(group) < 3:
+                group_scores = {}
+                for student in free_students:
+                    group_scores[survey_.score_students(group + [student])] = \
+                        student
+                next_student = group_scores[max(group_scores)]
+                group.append(next_student)
+                free_students.remove(next_student)
+            expected.append([student.id for student in group])
+        expected.append([student.id for student in free_students])
+        grouping = grouper.GreedyGrouper(3).make_grouping(course_, survey_)
+        assert member_ids(grouping) == expected
+
+
+class TestParallelGreedyGrouper:
+    def test_matches_serial(self):
+        course_, survey_ = make_course(25, 3)
+        serial = grouper.GreedyGrouper(3).make_grouping(course_, survey_)
+        parallel = grouper.GreedyGrouper(3, workers=2).make_grouping(course_,
+                                                                     survey_)
+        assert member_ids(parallel) == member_ids(serial)
+
+
+class TestWindowGrouper:
+    def test_matches_rescoring(self):
+        course_, survey_ = make_course(40, 4)
+        free_students = list(course_.get_students())
+        expected = []
+        while len(free_students) > 3:
+            windows_ = grouper.windows(free_students, 3)
+            for i, window in enumerate(windows_):
+                if i + 1 == len(windows_):
+                    if survey_.score_students(window) < \
+                            survey_.score_students(windows_[0]):
+                        window = windows_[0]
+                    break
+                if survey_.score_students(window) >= \
+                        survey_.score_students(windows_[i + 1]):
+                    break
+            expected.append([student.id for student in window])
+            for student in window:
+                free_students.remove(student)
+        expected.append([student.id for student in free_students])
+        grouping = grouper.WindowGrouper(3).make_grouping(course_, survey_)
+        assert member_ids(grouping) == expected
+
+    def test_small_course(self):
+        course_, survey_ = make_course(3, 5)
+        grouping = grouper.WindowGrouper(4).make_grouping(course_, survey_)
+        assert member_ids(grouping) == \
+            [[student.id for student in course_.get_students()]]
+
+
+class TestLocalSearchGrouper:
+    def test_score_with_swap(self):
+        course_, survey_ = make_course(10, 6)
+        students = list(course_.get_students())
+        accumulator = scoring.GroupAccumulator(survey_, students[:4])
+        for leaving in students[:4]:
+            for joining in students[4:]:
+                members = [joining if student is leaving else student
+                           for student in students[:4]]
+                assert accumulator.score_with_swap(leaving, joining) == \
+                    pytest.approx(survey_.score_students(members))
+
+    def test_improves_grouping(self):
+        course_, survey_ = make_course(30, 7)
+        start = grouper.AlphaGrouper(4).make_grouping(course_, survey_)
+        grouper_ = grouper.LocalSearchGrouper(4, max_iterations=500, seed=1)
+        grouping = grouper_.make_grouping(course_, survey_)
+        assert survey_.score_grouping(grouping) > \
+            survey_.score_grouping(start)
+        assert sorted(len(group) for group in grouping.get_groups()) == \
+            sorted(len(group) for group in start.get_groups())
+        ids = [id_ for group in member_ids(grouping) for id_ in group]
+        assert sorted(ids) == sorted(s.id for s in course_.get_students())
+
+    def test_annealing_keeps_best(self):
+        course_, survey_ = make_course(20, 8)
+        start = grouper.GreedyGrouper(4).make_grouping(course_, survey_)
+        grouper_ = grouper.LocalSearchGrouper(4, max_iterations=300,
+                                              temperature=1.0, seed=2)
+        grouping = grouper_.improve(start, survey_)
+        assert survey_.score_grouping(grouping) >= \
+            survey_.score_grouping(start) - 1e-9
+
+    def test_time_limit(self):
+        course_, survey_ = make_course(20, 9)
+        start = grouper.AlphaGrouper(4).make_grouping(course_, survey_)
+        grouper_ = grouper.LocalSearchGrouper(4, time_limit=0.0)
+        assert member_ids(grouper_.improve(start, survey_)) == \
+            member_ids(start)
+
+
+class TestGrouping:
+    def test_group_rejects_duplicate_ids(self, students):
+        with pytest.raises(AttributeError):
+            grouper.Group(students[5:8])
+        group = grouper.Group(students[:3])
+        assert group.get_ids() == frozenset({1, 2, 3})
+        assert students[0] in group and students[3] not in group
+
+    def test_add_group(self, students):
+        grouping = grouper.Grouping()
+        assert not grouping.add_group(grouper.Group([]))
+        assert grouping.add_group(grouper.Group(students[:3]))
+        assert not grouping.add_group(grouper.Group(students[2:4]))
+        assert grouping.add_group(grouper.Group(students[3:5]))
+        assert len(grouping) == 2
+
+    def test_find_group(self, students):
+        grouping = grouper.Grouping()
+        first = grouper.Group(students[:3])
+        second = grouper.Group(students[3:6])
+        grouping.add_group(first)
+        grouping.add_group(second)
+        for student in students[:3]:
+            assert grouping.find_group(student.id) is first
+            assert student in grouping
+        assert grouping.find_group(students[4].id) is second
+        assert grouping.find_group(students[-1].id) is None
+        assert students[-1] not in grouping
+
+
+class TestAnswerValidity:
+    def test_validated_once(self, questions, answers, monkeypatch):
+        calls = []
+        question = questions[0]
+        original = type(question).validate_answer
+        monkeypatch.setattr(type(question), 'validate_answer',
+                            lambda self, ans: calls.append(ans) or
+                            original(self, ans))
+        students = [course.Student(i, str(i)) for i in range(4)]
+        for student, answer in zip(students, answers[0]):
+            student.set_answer(question, answer)
+        assert len(calls) == 4
+        survey_ = survey.Survey([question])
+        for _ in range(3):
+            survey_.score_students(students)
+        assert len(calls) == 4
+
+    def test_table_bitmap(self, questions, answers):
+        course_ = course.Course('csc148')
+        course_.attach_answer_table(questions)
+        students = [course.Student(i, str(i)) for i in range(8)]
+        course_.enroll_students(students)
+        for student, answer in zip(students, answers[3]):
+            student.set_answer(questions[3], answer)
+        assert [s.has_answer(questions[3]) for s in students] == \
+            [questions[3].validate_answer(a) for a in answers[3]]
+        assert not students[0].has_answer(questions[0])
+
+    def test_wrong_type_is_invalid(self, questions):
+        student = course.Student(1, 'Zoro')
+        student.set_answer(questions[1], survey.Answer('three'))
+        assert not student.has_answer(questions[1])
+        survey_ = survey.Survey([questions[1]])
+        assert survey_.score_students([student]) == 0.0
+
+    def test_score_valid_answers(self, questions, answers):
+        for criterion_ in [criterion.HomogeneousCriterion(),
+                           criterion.HeterogeneousCriterion(),
+                           criterion.LonelyMemberCriterion()]:
+            valid = [a for a in answers[1] if questions[1].validate_answer(a)]
+            assert criterion_.score_valid_answers(questions[1], valid) == \
+                criterion_.score_answers(questions[1], valid)
+
+
+class TestSurveyCache:
+    def test_hits_and_misses(self):
+        course_, survey_ = make_course(12, 10)
+        students = list(course_.get_students())
+        expected = survey_.score_students(students[:4])
+        survey_.enable_cache(maxsize=2)
+        assert survey_.score_students(students[:4]) == expected
+        assert survey_.score_students(students[3::-1]) == expected
+        assert survey_.cache_info() == {'hits': 1, 'misses': 1, 'size': 1,
+                                        'maxsize': 2}
+
+    def test_lru_eviction(self):
+        course_, survey_ = make_course(12, 11)
+        students = list(course_.get_students())
+        survey_.enable_cache(maxsize=2)
+        survey_.score_students(students[0:3])
+        survey_.score_students(students[3:6])
+        survey_.score_students(students[0:3])
+        survey_.score_students(students[6:9])
+        assert survey_.cache_info()['size'] == 2
+        survey_.score_students(students[0:3])
+        survey_.score_students(students[3:6])
+        assert survey_.cache_info()['hits'] == 2
+        assert survey_.cache_info()['misses'] == 4
+
+    def test_invalidated_by_changes(self):
+        course_, survey_ = make_course(12, 12)
+        students = list(course_.get_students())[:4]
+        question = list(survey_.get_questions())[0]
+        survey_.enable_cache()
+        survey_.score_students(students)
+        survey_.set_weight(7, question)
+        survey_.set_criterion(criterion.HeterogeneousCriterion(), question)
+        uncached = survey.Survey(list(survey_.get_questions()))
+        for q in survey_.get_questions():
+            uncached.set_weight(survey_._get_weight(q), q)
+            uncached.set_criterion(survey_._get_criterion(q), q)
+        assert survey_.score_students(students) == \
+            uncached.score_students(students)
+        assert survey_.cache_info()['hits'] == 0
+
+    def test_grouping_scores_unchanged(self):
+        course_, survey_ = make_course(30, 13)
+        grouping = grouper.WindowGrouper(4).make_grouping(course_, survey_)
+        expected = survey_.score_grouping(grouping)
+        survey_.enable_cache()
+        assert survey_.score_grouping(grouping) == expected
+        assert survey_.score_grouping(grouping) == expected
+        survey_.disable_cache()
+        assert survey_.cache_info()['size'] == 0
+
+
+class TestStreamCourse:
+    @staticmethod
+    def answers_of(course_, survey_):
+        return [(s.id, s.name,
+                 [None if s.get_answer(q) is None else s.get_answer(q).content
+                  for q in survey_.get_questions()])
+                for s in course_.get_students()]
+
+    @pytest.mark.parametrize('chunk_size', [1, 5, 64, 1 << 16])
+    def test_matches_load_course(self, example_data, chunk_size):
+        expected, survey_ = example_data
+        course_ = example_usage.stream_course('example_course.json', survey_,
+                                              chunk_size)
+        assert course_.name == expected.name
+        assert self.answers_of(course_, survey_) == \
+            self.answers_of(expected, survey_)
+
+    def test_key_order_and_numbers(self, questions, tmp_path):
+        data = {'students': [{'id': 12345, 'name': 'Zoro', 'answers': [
+            {'question_id': 2, 'answer': 3}]}, {'id': 7, 'name': 'Anna',
+                                                'answers': []}],
+                'year': 2020123, 'name': 'csc148'}
+        path = tmp_path / 'course.json'
+        path.write_text(json.dumps(data))
+        survey_ = survey.Survey(questions)
+        for chunk_size in range(1, 12):
+            course_ = example_usage.stream_course(str(path), survey_,
+                                                  chunk_size)
+            assert course_.name == 'csc148'
+            assert [s.id for s in course_.get_students()] == [7, 12345]
+            assert course_.get_students()[1].get_answer(
+                questions[1]).content == 3
+
+    @pytest.mark.parametrize('text', [
+        '{"term": 2020.25, "name": "c", "students": []}',
+        '{"term": -1.5e+10, "flag": false, "name": "c", "students": []}',
+        '{"term":2020.25,"name":"c","students":[],"extra":[1.25,true,null]}'])
+    def test_numbers_split_across_chunks(self, questions, tmp_path, text):
+        path = tmp_path / 'course.json'
+        path.write_text(text)
+        for chunk_size in range(1, len(text) + 1):
+            course_ = example_usage.stream_course(str(path),
+                                                  survey.Survey(questions),
+                                                  chunk_size)
+            assert course_.name == 'c'
+
+    def test_malformed(self, questions, tmp_path):
+        path = tmp_path / 'course.json'
+        path.write_text('{"name": "csc148", "students": [{"id": 1, "na')
+        with pytest.raises(json.JSONDecodeError):
+            example_usage.stream_course(str(path), survey.Survey(questions))
+
+
+class TestSnapshot:
+    @staticmethod
+    def answers_of(course_, survey_):
+        # Checkbox answers come back in the order of the question's options
+        return [(s.id, s.name,
+                 [None if s.get_answer(q) is None else
+                  sorted(s.get_answer(q).content)
+                  if isinstance(s.get_answer(q).content, list) else
+                  s.get_answer(q).content for q in survey_.get_questions()],
+                 [s.has_answer(q) for q in survey_.get_questions()])
+                for s in course_.get_students()]
+
+    def test_round_trip_example(self, example_data, tmp_path):
+        course_, survey_ = example_data
+        path = str(tmp_path / 'example.snap')
+        snapshot.save_snapshot(path, course_, survey_)
+        loaded_course, loaded_survey = snapshot.load_snapshot(path)
+        assert loaded_course.name == course_.name
+        assert self.answers_of(loaded_course, loaded_survey) == \
+            self.answers_of(course_, survey_)
+        for q1, q2 in zip(survey_.get_questions(),
+                          loaded_survey.get_questions()):
+            assert str(q1) == str(q2)
+            assert survey_._get_weight(q1) == loaded_survey._get_weight(q2)
+            assert type(survey_._get_criterion(q1)) is \
+                type(loaded_survey._get_criterion(q2))
+        grouping = grouper.GreedyGrouper(2).make_grouping(course_, survey_)
+        loaded = grouper.GreedyGrouper(2).make_grouping(loaded_course,
+                                                        loaded_survey)
+        assert member_ids(grouping) == member_ids(loaded)
+        assert survey_.score_grouping(grouping) == \
+            loaded_survey.score_grouping(loaded)
+
+    def test_round_trip_invalid_answers(self, tmp_path):
+        course_, survey_ = make_course(25, 14)
+        students = course_.get_students()
+        questions = list(survey_.get_questions())
+        students[0].set_answer(questions[0], survey.Answer('nope'))
+        students[1].set_answer(questions[3], survey.Answer(['a', 'a']))
+        partial = course.Student(-1, 'Nami')
+        partial.set_answer(questions[2], survey.Answer(True))
+        course_.enroll_students([partial])
+        path = str(tmp_path / 'course.snap')
+        snapshot.save_snapshot(path, course_, survey_)
+        loaded_course, loaded_survey = snapshot.load_snapshot(path)
+        assert self.answers_of(loaded_course, loaded_survey) == \
+            self.answers_of(course_, survey_)
+        table = loaded_course.get_answer_table()
+        assert isinstance(table.get_column(questions[1]), memoryview)
+
+    def test_changes_after_load(self, tmp_path):
+        course_, survey_ = make_course(10, 15)
+        path = str(tmp_path / 'course.snap')
+        snapshot.save_snapshot(path, course_, survey_)
+        loaded_course, loaded_survey = snapshot.load_snapshot(path)
+        question = list(loaded_survey.get_questions())[1]
+        student = loaded_course.get_students()[0]
+        student.set_answer(question, survey.Answer(-3))
+        assert student.get_answer(question).content == -3
+        new_student = course.Student(1000, 'Zoro')
+        new_student.set_answer(question, survey.Answer(2))
+        loaded_course.enroll_students([new_student])
+        assert new_student.get_answer(question).content == 2
+        assert student.get_answer(question).content == -3
+        again = snapshot.load_snapshot(path)[0].get_students()[0]
+        assert again.get_answer(question).content == \
+            course_.get_students()[0].get_answer(question).content
+
+    def test_bad_header(self, tmp_path):
+        course_, survey_ = make_course(4, 16)
+        path = tmp_path / 'course.snap'
+        snapshot.save_snapshot(str(path), course_, survey_)
+        data = bytearray(path.read_bytes())
+        data[8] += 1
+        path.write_bytes(bytes(data))
+        with pytest.raises(ValueError):
+            snapshot.load_snapshot(str(path))
+        path.write_bytes(b'not a snapshot file at all')
+        with pytest.raises(ValueError):
+            snapshot.load_snapshot(str(path))
+
+
+class TestBatchScorer:
+    @pytest.mark.parametrize('seed', range(5))
+    def test_matches_survey(self, seed):
+        course_, survey_ = make_course(23, 20 + seed)
+        students = course_.get_students()
+        questions = list(survey_.get_questions())
+        students[seed].set_answer(questions[0], survey.Answer('z'))
+        scorer = batch.BatchScorer(survey_, course_)
+        for grouper_ in [grouper.AlphaGrouper(4), grouper.RandomGrouper(5),
+                         grouper.GreedyGrouper(3)]:
+            grouping = grouper_.make_grouping(course_, survey_)
+            result = scorer.score_grouping(grouping)
+            assert result.score == pytest.approx(
+                survey_.score_grouping(grouping))
+            for group, score in zip(grouping.get_groups(),
+                                    result.group_scores):
+                assert score == pytest.approx(
+                    survey_.score_students(group.get_members()))
+
+    def test_question_scores(self):
+        course_, survey_ = make_course(12, 25)
+        grouping = grouper.AlphaGrouper(4).make_grouping(course_, survey_)
+        result = batch.BatchScorer(survey_, course_).score_grouping(grouping)
+        for i, group in enumerate(grouping.get_groups()):
+            for j, question in enumerate(result.questions):
+                answers = [member.get_answer(question)
+                           for member in group.get_members()]
+                assert result.question_scores[i, j] == pytest.approx(
+                    survey_._get_criterion(question).score_answers(question,
+                                                                   answers))
+        question = result.questions[1]
+        assert result.get_question_score(question) == \
+            pytest.approx(result.question_scores[:, 1].mean())
+
+    def test_other_criteria(self):
+        class Strict(criterion.HomogeneousCriterion):
+            def score_answers(self, question, answers):
+                if len(answers) > 3:
+                    raise criterion.InvalidAnswerError
+                return 0.5
+
+            def score_valid_answers(self, question, answers):
+                return self.score_answers(question, answers)
+
+        course_, survey_ = make_course(10, 26)
+        survey_.set_criterion(Strict(), list(survey_.get_questions())[0])
+        grouping = grouper.AlphaGrouper(4).make_grouping(course_, survey_)
+        result = batch.BatchScorer(survey_, course_).score_grouping(grouping)
+        assert list(result.group_scores[:2]) == [0.0, 0.0]
+        assert result.group_scores[2] == pytest.approx(
+            survey_.score_students(grouping.get_groups()[2].get_members()))
+
+    def test_empty(self):
+        course_, survey_ = make_course(5, 27)
+        result = batch.BatchScorer(survey_, course_).score_grouping(
+            grouper.Grouping())
+        assert result.score == 0.0 and len(result.group_scores) == 0
+
+    def test_mixed_group_sizes(self):
+        course_, survey_ = make_course(20, 28)
+        students = course_.get_students()
+        students[4].set_answer(list(survey_.get_questions())[0],
+                               survey.Answer('z'))
+        grouping = grouper.Grouping()
+        start = 0
+        for size in [3, 1, 7, 3, 2, 4]:
+            grouping.add_group(grouper.Group(students[start:start + size]))
+            start += size
+        result = batch.BatchScorer(survey_, course_).score_grouping(grouping)
+        assert result.group_scores[2] == 0.0
+        for group, score in zip(grouping.get_groups(), result.group_scores):
+            assert score == pytest.approx(
+                survey_.score_students(group.get_members()))
+        assert result.score == pytest.approx(survey_.score_grouping(grouping))
+
+
+class TestBenchmark:
+    @staticmethod
+    def contents(course_, survey_):
+        return [(s.id, [s.get_answer(q).content
+                        for q in survey_.get_questions()])
+                for s in course_.get_students()]
+
+    def test_generate_is_seeded(self):
+        course1, survey1 = benchmark.generate(30, seed=4)
+        course2, survey2 = benchmark.generate(30, seed=4)
+        course3, survey3 = benchmark.generate(30, seed=5)
+        assert self.contents(course1, survey1) == \
+            self.contents(course2, survey2)
+        assert self.contents(course1, survey1) != \
+            self.contents(course3, survey3)
+
+    def test_generate_mix(self):
+        mix = {'multiple_choice': 2, 'numeric': 0, 'yes_no': 1, 'checkbox': 3}
+        course_, survey_ = benchmark.generate(
+            25, seed=1, question_mix=mix, n_options=6,
+            criteria=['LonelyMemberCriterion'])
+        questions = list(survey_.get_questions())
+        assert len(course_.get_students()) == 25
+        assert [type(q).__name__ for q in questions] == \
+            ['MultipleChoiceQuestion'] * 2 + ['YesNoQuestion'] + \
+            ['CheckboxQuestion'] * 3
+        assert all(len(q.options) == 6 for q in questions
+                   if not isinstance(q, survey.YesNoQuestion))
+        assert all(type(survey_._get_criterion(q)) is
+                   criterion.LonelyMemberCriterion for q in questions)
+        assert course_.all_answered(survey_)
+
+    def test_benchmark(self, tmp_path):
+        output = tmp_path / 'results.json'
+        results = benchmark.main(['--sizes', '10', '20', '--groupers',
+                                  'AlphaGrouper', 'GreedyGrouper',
+                                  '--output', str(output)])
+        assert json.loads(output.read_text()) == results
+        assert [(r['grouper'], r['students']) for r in results] == \
+            [('AlphaGrouper', 10), ('GreedyGrouper', 10),
+             ('AlphaGrouper', 20), ('GreedyGrouper', 20)]
+        course_, survey_ = benchmark.generate(20)
+        grouping = grouper.GreedyGrouper(4).make_grouping(course_, survey_)
+        assert results[3]['score'] == survey_.score_grouping(grouping)
+        assert all(r['seconds'] >= 0 and r['peak_bytes'] > 0
+                   for r in results)
+
+    def test_random_grouper_is_seeded(self):
+        results = [benchmark.benchmark(['RandomGrouper'], [30], seed=6,
+                                       measure_memory=measure)
+                   for measure in [True, False, False]]
+        scores = [result[0]['score'] for result in results]
+        assert scores[0] == scores[1] == scores[2]
+        assert results[0][0]['peak_bytes'] > 0
+        assert results[1][0]['peak_bytes'] is None
+
+    def test_timed_without_tracing(self):
+        class Recording(grouper.AlphaGrouper):
+            def make_grouping(self, course_, survey_):
+                runs.append((tracemalloc.is_tracing(), random.random()))
+                return grouper.AlphaGrouper.make_grouping(self, course_,
+                                                          survey_)
+
+        runs = []
+        course_, survey_ = benchmark.generate(12, seed=7)
+        benchmark.run_grouper(Recording(3), course_, survey_, seed=3)
+        assert [tracing for tracing, _ in runs] == [False, True]
+        assert runs[0][1] == runs[1][1]
+        runs.clear()
+        benchmark.run_grouper(Recording(3), course_, survey_,
+                              measure_memory=False, seed=3)
+        assert [tracing for tracing, _ in runs] == [False]
+
+
+class TestInstrument:
+    def test_counts_calls(self, questions, answers):
+        originals = dict(vars(survey.NumericQuestion))
+        with instrument.instrumented() as report:
+            for answer in answers[1][:4]:
+                questions[1].validate_answer(answer)
+            questions[1].get_similarity(answers[1][0], answers[1][1])
+            criterion.HeterogeneousCriterion().score_answers(questions[1],
+                                                             answers[1][:2])
+        assert report['NumericQuestion.validate_answer']['calls'] == 6
+        assert report['NumericQuestion.get_similarity']['calls'] == 1
+        assert report['HeterogeneousCriterion.score_answers']['calls'] == 1
+        assert report['HeterogeneousCriterion.score_valid_answers'][
+            'calls'] == 1
+        assert report['HomogeneousCriterion.score_valid_answers'][
+            'calls'] == 1
+        assert all(entry['seconds'] >= 0 for entry in report.values())
+        assert not instrument.is_enabled()
+        assert dict(vars(survey.NumericQuestion)) == originals
+
+    def test_grouping_unchanged(self):
+        course_, survey_ = make_course(20, 30)
+        expected = grouper.GreedyGrouper(4).make_grouping(course_, survey_)
+        with instrument.instrumented() as report:
+            grouping = grouper.GreedyGrouper(4).make_grouping(course_,
+                                                              survey_)
+            survey_.score_grouping(grouping)
+        assert member_ids(grouping) == member_ids(expected)
+        assert report['Survey.score_students']['calls'] >= len(grouping)
+
+    def test_stats_and_reset(self, questions, answers):
+        instrument.enable()
+        try:
+            instrument.reset()
+            questions[0].validate_answer(answers[0][0])
+            with instrument.instrumented(fresh=False) as report:
+                questions[0].validate_answer(answers[0][0])
+            assert instrument.is_enabled()
+            assert report['MultipleChoiceQuestion.validate_answer'][
+                'calls'] == 2
+        finally:
+            instrument.disable()
+        questions[0].validate_answer(answers[0][0])
+        assert instrument.stats()['MultipleChoiceQuestion.validate_answer'][
+            'calls'] == 2
+        instrument.reset()
+        assert instrument.stats() == {}
+
+
+class TestExampleUsageMain:
+    def test_run_groupers(self):
+        course_, survey_ = make_course(16, 31)
+        data = (course_, survey_, survey_)
+        serial = example_usage.run_groupers(
+            data, ['GreedyGrouper', 'WindowGrouper'], [3, 4])
+        parallel = example_usage.run_groupers(
+            data, ['GreedyGrouper', 'WindowGrouper'], [3, 4], workers=2)
+        assert [(r['grouper'], r['group_size'], r['groups'], r['score'])
+                for r in serial] == \
+            [(r['grouper'], r['group_size'], r['groups'], r['score'])
+             for r in parallel]
+        grouping = grouper.WindowGrouper(3).make_grouping(course_, survey_)
+        assert serial[2]['groups'] == member_ids(grouping)
+        assert serial[2]['score'] == survey_.score_grouping(grouping)
+
+    def test_snapshot_workers(self, tmp_path):
+        course_, survey_ = make_course(12, 32)
+        path = str(tmp_path / 'course.snap')
+        snapshot.save_snapshot(path, course_, survey_)
+        results = example_usage.run_groupers(path, ['GreedyGrouper'], [4],
+                                             workers=2)
+        grouping = grouper.GreedyGrouper(4).make_grouping(course_, survey_)
+        assert results[0]['groups'] == member_ids(grouping)
+
+    def test_main_json(self, capsys):
+        results = example_usage.main(['--json', '--groupers', 'AlphaGrouper',
+                                      'GreedyGrouper', '--sizes', '2'])
+        assert json.loads(capsys.readouterr().out) == results
+        assert [r['grouper'] for r in results] == ['AlphaGrouper',
+                                                   'GreedyGrouper']
+        assert all(r['group_size'] == 2 for r in results)
+
+
+class _RepeatGrouper(grouper.Grouper):
+    """ A grouper that wrongly puts the lowest id student of every course in
+    its own group twice. """
+
+    def make_grouping(self, course_, survey_):
+        grouping = grouper.AlphaGrouper(self.group_size).make_grouping(
+            course_, survey_)
+        grouping._groups.append(grouper.Group(
+            [course_.get_students()[0]]))
+        return grouping
+
+
+class _SectionStudent(course.Student):
+    """ A student in one of several sections of a course. """
+
+    def __init__(self, student, questions, section):
+        course.Student.__init__(self, student.id, student.name)
+        for question in questions:
+            self.set_answer(question, student.get_answer(question))
+        self.section = section
+
+
+class TestShardedGrouper:
+    def test_shards_by_attribute(self):
+        original, survey_ = make_course(30, 33)
+        questions = survey_.get_questions()
+        course_ = course.Course(original.name)
+        course_.enroll_students([_SectionStudent(student, questions, i % 3)
+                                 for i, student in
+                                 enumerate(original.get_students())])
+        grouper_ = grouper.ShardedGrouper(grouper.GreedyGrouper(4), 'section')
+        grouping = grouper_.make_grouping(course_, survey_)
+        for group in grouping.get_groups():
+            assert len({member.section for member in group.get_members()}) == 1
+        ids = sorted(id_ for group in member_ids(grouping) for id_ in group)
+        assert ids == [s.id for s in course_.get_students()]
+        for section in range(3):
+            shard = course.Course('shard')
+            shard.enroll_students([s for s in course_.get_students()
+                                   if s.section == section])
+            expected = grouper.GreedyGrouper(4).make_grouping(shard, survey_)
+            assert all(group in member_ids(grouping)
+                       for group in member_ids(expected))
+
+    def test_section_of_plain_students(self):
+        course_, survey_ = make_course(30, 33)
+        student = course_.get_students()[0]
+        with pytest.raises(AttributeError):
+            student.section = 1
+        sections = {s.id: i % 3 for i, s in enumerate(course_.get_students())}
+        grouper_ = grouper.ShardedGrouper(grouper.GreedyGrouper(4),
+                                          lambda s: sections[s.id])
+        for group in grouper_.make_grouping(course_, survey_).get_groups():
+            assert len({sections[s.id] for s in group.get_members()}) == 1
+
+    def test_shards_by_question_and_function(self):
+        course_, survey_ = make_course(24, 34)
+        question = list(survey_.get_questions())[2]
+        by_question = grouper.ShardedGrouper(grouper.WindowGrouper(3),
+                                             question)
+        for group in by_question.make_grouping(course_,
+                                               survey_).get_groups():
+            assert len({member.get_answer(question).content
+                        for member in group.get_members()}) == 1
+        by_parity = grouper.ShardedGrouper(grouper.AlphaGrouper(3),
+                                           lambda s: s.id % 2)
+        shards = by_parity.shard(course_)
+        assert sorted(len(shard) for shard in shards) == \
+            sorted([sum(s.id % 2 for s in course_.get_students()),
+                    sum(1 - s.id % 2 for s in course_.get_students())])
+        for group in by_parity.make_grouping(course_, survey_).get_groups():
+            assert len({member.id % 2 for member in group.get_members()}) == 1
+
+    def test_shards_by_checkbox_question(self):
+        question = survey.CheckboxQuestion(1, 'Which?', ['a', 'b', 'c'])
+        course_ = course.Course('checkbox')
+        contents = [['a', 'b'], ['b', 'a'], ['a', 'b'], ['b', 'a'], ['d'],
+                    ['c']]
+        for i, content in enumerate(contents):
+            student = course.Student(i, str(i))
+            student.set_answer(question, survey.Answer(content))
+            course_.enroll_students([student])
+        grouper_ = grouper.ShardedGrouper(grouper.AlphaGrouper(4), question)
+        assert [[s.id for s in shard] for shard in grouper_.shard(course_)] \
+            == [[0, 1, 2, 3], [4], [5]]
+        grouping = grouper_.make_grouping(course_, survey.Survey([question]))
+        assert sorted(sorted(group) for group in member_ids(grouping)) == \
+            [[0, 1, 2, 3], [4], [5]]
+
+    def test_parallel(self):
+        course_, survey_ = make_course(30, 35)
+        question = list(survey_.get_questions())[0]
+        serial = grouper.ShardedGrouper(grouper.GreedyGrouper(4), question)
+        parallel = grouper.ShardedGrouper(grouper.GreedyGrouper(4), question,
+                                          workers=2)
+        assert member_ids(serial.make_grouping(course_, survey_)) == \
+            member_ids(parallel.make_grouping(course_, survey_))
+
+    def test_uniqueness_checked(self):
+        course_, survey_ = make_course(10, 36)
+        grouper_ = grouper.ShardedGrouper(_RepeatGrouper(3), lambda s: 0)
+        with pytest.raises(ValueError):
+            grouper_.make_grouping(course_, survey_)
+
+
+class TestLonelyMemberCriterion:
+    def test_score_answers(self, questions):
+        lonely = criterion.LonelyMemberCriterion()
+        answers = [survey.Answer(x) for x in ['a', 'b', 'a', 'b', 'b']]
+        assert lonely.score_answers(questions[0], answers) == 1.0
+        assert lonely.score_answers(questions[0], answers[:3]) == 0.0
+        assert lonely.score_answers(questions[0], answers[:1]) == 1.0
+
+    def test_checkbox_order(self, questions):
+        lonely = criterion.LonelyMemberCriterion()
+        answers = [survey.Answer(['a', 'b']), survey.Answer(['b', 'a']),
+                   survey.Answer(['c']), survey.Answer(['c'])]
+        assert questions[3].answer_key(answers[0]) == \
+            questions[3].answer_key(answers[1])
+        assert lonely.score_answers(questions[3], answers) == 1.0
+        answers[3] = survey.Answer(['c', 'd'])
+        assert lonely.score_answers(questions[3], answers) == 0.0
+
+    def test_scorers_agree(self):
+        course_, survey_ = make_course(16, 30)
+        lonely = criterion.LonelyMemberCriterion()
+        rand = random.Random(30)
+        question = list(survey_.get_questions())[3]
+        for student in course_.get_students():
+            options = rand.sample(['a', 'b'], rand.randint(1, 2))
+            student.set_answer(question, survey.Answer(options))
+        for q in survey_.get_questions():
+            survey_.set_criterion(lonely, q)
+        grouping = grouper.AlphaGrouper(4).make_grouping(course_, survey_)
+        compiled_ = compiled.CompiledSurvey(survey_, course_)
+        result = batch.BatchScorer(survey_, course_).score_grouping(grouping)
+        for group, score in zip(grouping.get_groups(), result.group_scores):
+            members = group.get_members()
+            expected = survey_.score_students(members)
+            accumulator = scoring.GroupAccumulator(survey_, members)
+            assert accumulator.score() == pytest.approx(expected)
+            assert compiled_.score_students(members) == pytest.approx(expected)
+            assert score == pytest.approx(expected)
+
+
+class TestCompactObjects:
+    def test_slots(self, questions):
+        student = course.Student(1, 'Zoro')
+        for obj in [student, survey.Answer('a')] + questions:
+            assert not hasattr(obj, '__dict__')
+        with pytest.raises(AttributeError):
+            student.section = 1
+
+    def test_answer_pool(self, questions):
+        pool = survey.AnswerPool()
+        answer = pool.get_answer(questions[0], 'a')
+        assert pool.get_answer(questions[0], 'a') is answer
+        assert pool.get_answer(questions[1], 'a') is not answer
+        assert pool.get_answer(questions[1], 1) is not \
+            pool.get_answer(questions[1], True)
+        assert pool.get_answer(questions[3], ['a', 'b']) is \
+            pool.get_answer(questions[3], ['a', 'b'])
+        assert pool.get_answer(questions[3], ['b', 'a']).content == ['b', 'a']
+        assert pool.get_answer(questions[3], [{}]).content == [{}]
+        assert len(pool) == 6
+
+    def test_loaded_answers_shared(self, example_data, tmp_path):
+        course_, survey_ = example_data
+        for question in survey_.get_questions():
+            answers = [student.get_answer(question)
+                       for student in course_.get_students()]
+            assert len({id(answer) for answer in answers}) == \
+                len({scoring.content_key(a.content) for a in answers})
+        course_, survey_ = make_course(20, 37)
+        question = list(survey_.get_questions())[0]
+        for student in course_.get_students()[:2]:
+            student.set_answer(question, survey.Answer('z'))
+        filename = str(tmp_path / 'course.snapshot')
+        snapshot.save_snapshot(filename, course_, survey_)
+        loaded, survey_ = snapshot.load_snapshot(filename)
+        question = list(survey_.get_questions())[0]
+        first, second = loaded.get_students()[:2]
+        assert first.get_answer(question).content == 'z'
+        assert first.get_answer(question) is second.get_answer(question)
+
+
+def partitions(students, size):
+    """ Yield every way of splitting <students> into groups of <size> and one
+    smaller group with the students left over. """
+    if not students:
+        yield []
+        return
+    sizes = {size} if len(students) >= size else set()
+    if len(students) % size:
+        sizes.add(len(students) % size)
+    first, rest = students[0], students[1:]
+    for n in sizes:
+        for others in itertools.combinations(rest, n - 1):
+            left = [s for s in rest if s not in others]
+            if n != size and len(left) % size:
+                continue
+            for groups in partitions(left, size):
+                yield [[first, *others]] + groups
+
+
+class TestOptimalGrouper:
+    @pytest.mark.parametrize('n, size, seed', [(8, 3, 1), (7, 2, 3),
+                                               (8, 4, 4), (9, 3, 38)])
+    def test_matches_exhaustive_search(self, n, size, seed):
+        course_, survey_ = make_course(n, seed)
+        students = list(course_.get_students())
+        students[seed % n].set_answer(list(survey_.get_questions())[0],
+                                      survey.Answer('z'))
+        best = max(sum(survey_.score_students(group) for group in groups) /
+                   len(groups) for groups in partitions(students, size))
+        grouper_ = grouper.OptimalGrouper(size, time_limit=None)
+        grouping = grouper_.make_grouping(course_, survey_)
+        assert grouper_.optimal
+        assert survey_.score_grouping(grouping) == pytest.approx(best)
+        assert sorted(len(group) for group in grouping.get_groups()) == \
+            sorted(len(group) for group in next(partitions(students, size)))
+        assert sorted(id_ for ids in member_ids(grouping) for id_ in ids) == \
+            [s.id for s in students]
+
+    @pytest.mark.parametrize('n, size, seed', [(8, 3, 1), (9, 3, 38)])
+    def test_compiled_survey(self, n, size, seed):
+        course_, survey_ = make_course(n, seed)
+        list(course_.get_students())[2].set_answer(
+            list(survey_.get_questions())[1], survey.Answer(11))
+        compiled_ = compiled.CompiledSurvey(survey_, course_)
+        students = list(course_.get_students())
+        best = max(sum(survey_.score_students(group) for group in groups) /
+                   len(groups) for groups in partitions(students, size))
+        grouper_ = grouper.OptimalGrouper(size, time_limit=None)
+        grouping = grouper_.make_grouping(course_, compiled_)
+        assert grouper_.optimal
+        assert survey_.score_grouping(grouping) == pytest.approx(best)
+
+    def test_time_limit(self):
+        course_, survey_ = make_course(28, 39)
+        grouper_ = grouper.OptimalGrouper(4, time_limit=0.0)
+        grouping = grouper_.make_grouping(course_, survey_)
+        assert not grouper_.optimal
+        greedy = grouper.GreedyGrouper(4).make_grouping(course_, survey_)
+        assert survey_.score_grouping(grouping) >= \
+            survey_.score_grouping(greedy)
+
+    def test_small_course(self):
+        course_, survey_ = make_course(3, 40)
+        grouper_ = grouper.OptimalGrouper(4)
+        grouping = grouper_.make_grouping(course_, survey_)
+        assert grouper_.optimal
+        assert member_ids(grouping) == [[s.id for s in
+                                         course_.get_students()]]
+
+
+def group_sizes(grouping: grouper.Grouping) -> List[int]:
+    return sorted(len(group) for group in grouping.get_groups())
+
+
+class TestRegrouper:
+    def test_grouping_remove_and_replace(self, students):
+        grouping = grouper.Grouping()
+        first = grouper.Group(students[:2])
+        second = grouper.Group(students[2:4])
+        grouping.add_group(first)
+        grouping.add_group(second)
+        assert not grouping.replace_group(first, grouper.Group(students[1:3]))
+        assert not grouping.replace_group(first, grouper.Group([]))
+        new = grouper.Group([students[0], students[4]])
+        assert grouping.replace_group(first, new)
+        assert grouping.get_groups() == [new, second]
+        assert grouping.find_group(students[4].id) is new
+        assert students[1] not in grouping
+        assert not grouping.replace_group(first, new)
+        assert grouping.remove_group(second)
+        assert not grouping.remove_group(second)
+        assert grouping.get_groups() == [new]
+        assert students[2] not in grouping
+
+    def test_remove_and_add(self):
+        course_, survey_ = make_course(30, 41)
+        students = list(course_.get_students())
+        grouping = grouper.GreedyGrouper(4).make_grouping(
+            course_, survey_)
+        regrouper = grouper.Regrouper(grouping, survey_, 4)
+        before = grouping.get_groups()
+        leaving = before[0].get_members()[0]
+        new = course.Student(10 ** 7, 'new student')
+        for question in survey_.get_questions():
+            new.set_answer(question, students[0].get_answer(question))
+        changed = regrouper.update([new], [leaving])
+        assert regrouper.get_grouping() is grouping
+        assert leaving not in grouping and new in grouping
+        assert group_sizes(grouping) == [2, 4, 4, 4, 4, 4, 4, 4]
+        untouched = [group for group in before if group in
+                     grouping.get_groups()]
+        assert len(untouched) >= len(before) - 2
+        assert len(changed) <= 2
+        assert regrouper.score() == pytest.approx(
+            survey_.score_grouping(grouping))
+
+    def test_consolidates_short_groups(self):
+        course_, survey_ = make_course(16, 42)
+        grouping = grouper.AlphaGrouper(4).make_grouping(course_, survey_)
+        regrouper = grouper.Regrouper(grouping, survey_, 4)
+        groups = grouping.get_groups()
+        removed = groups[0].get_members()[:2] + groups[1].get_members()[:1]
+        regrouper.update([], removed)
+        assert group_sizes(grouping) == [1, 4, 4, 4]
+        assert groups[2] in grouping.get_groups()
+        assert groups[3] in grouping.get_groups()
+        regrouper.update([], groups[0].get_members()[2:] +
+                         groups[1].get_members()[1:])
+        assert group_sizes(grouping) == [4, 4]
+        assert regrouper.score() == pytest.approx(
+            survey_.score_grouping(grouping))
+
+    def test_new_groups(self):
+        course_, survey_ = make_course(13, 43)
+        students = list(course_.get_students())
+        grouping = grouper.AlphaGrouper(4).make_grouping(
+            course.Course('empty'), survey_)
+        regrouper = grouper.Regrouper(grouping, survey_, 4)
+        assert regrouper.score() == 0.0
+        regrouper.update(students[:6], [])
+        regrouper.update(students[6:] + students[:2], students[3:4])
+        assert group_sizes(grouping) == [4, 4, 4]
+        assert sorted(id_ for ids in member_ids(grouping) for id_ in ids) == \
+            sorted(s.id for s in students if s is not students[3])
+        assert regrouper.score() == pytest.approx(
+            survey_.score_grouping(grouping))
+
+    def test_many_updates(self):
+        course_, survey_ = make_course(60, 44)
+        students = list(course_.get_students())
+        grouping = grouper.AlphaGrouper(4).make_grouping(
+            course.Course('empty'), survey_)
+        regrouper = grouper.Regrouper(grouping, survey_, 4)
+        rand = random.Random(44)
+        present = []
+        absent = students[:]
+        for _ in range(100):
+            removed = rand.sample(present, min(len(present),
+                                               rand.randint(0, 3)))
+            added = rand.sample(absent, min(len(absent), rand.randint(0, 3)))
+            regrouper.update(added, removed)
+            present = [s for s in present if s not in removed] + added
+            absent = [s for s in absent if s not in added] + removed
+            sizes = group_sizes(grouping)
+            assert sum(sizes) == len(present)
+            assert max(sizes, default=4) <= 4
+            assert len([size for size in sizes if size < 4]) <= 1
+        assert regrouper.score() == pytest.approx(
+            survey_.score_grouping(grouping))
+
+    def test_remove_and_add_again(self):
+        question = survey.NumericQuestion(1, 'q', 0, 10)
+        survey_ = survey.Survey([question])
+        course_ = answered_course(question, [0, 0, 0, 10, 10])
+        students = list(course_.get_students())
+        grouping = grouper.Grouping()
+        grouping.add_group(grouper.Group(students[:4]))
+        grouping.add_group(grouper.Group(students[4:]))
+        regrouper = grouper.Regrouper(grouping, survey_, 4)
+        regrouper.update([students[3]], [students[3]])
+        assert sorted(sorted(ids) for ids in member_ids(grouping)) == \
+            [[0, 1, 2, 4], [3]]
+        assert regrouper.score() == pytest.approx(
+            survey_.score_grouping(grouping))
+
+    @pytest.mark.parametrize('seed, size', [(202, 5), (295, 4), (21, 3),
+                                            (15, 4), (12, 5)])
+    def test_updates_with_students_added_again(self, seed, size):
+        course_, survey_ = make_course(30, seed)
+        students = list(course_.get_students())
+        grouping = grouper.GreedyGrouper(size).make_grouping(
+            course_, survey_)
+        regrouper = grouper.Regrouper(grouping, survey_, size)
+        rand = random.Random(seed)
+        present = set(students)
+        for _ in range(50):
+            removed = rand.sample(sorted(present, key=lambda s: s.id),
+                                  min(len(present), rand.randint(0, 3)))
+            added = rand.sample(students, rand.randint(0, 3))
+            regrouper.update(added, removed)
+            present = (present - set(removed)) | set(added)
+            assert sorted(id_ for ids in member_ids(grouping)
+                          for id_ in ids) == sorted(s.id for s in present)
+            sizes = group_sizes(grouping)
+            assert max(sizes, default=size) <= size
+            assert len([n for n in sizes if n < size]) <= 1
+        assert regrouper.score() == pytest.approx(
+            survey_.score_grouping(grouping))
+
+
+def answered_course(question: survey.Question,
+                    contents: List[Any]) -> course.Course:
+    course_ = course.Course('csc148')
+    for i, content in enumerate(contents):
+        student = course.Student(i, f'student {i}')
+        student.set_answer(question, survey.Answer(content))
+        course_.enroll_students([student])
+    return course_
+
+
+class TestClusterGrouper:
+    def test_embed_answers(self):
+        question = survey.MultipleChoiceQuestion(1, 'why?', ['a', 'b', 'c'])
+        students = answered_course(question, ['b', 'a', 'b']).get_students()
+        vectors = cluster.embed_answers(question, students, 2)
+        assert vectors.ravel().tolist() == pytest.approx([1, 0, 0, 1, 1, 0])
+        question = survey.CheckboxQuestion(2, 'how?', ['a', 'b', 'c'])
+        course_ = answered_course(question, [['a'], ['a', 'b']])
+        vectors = cluster.embed_answers(question, course_.get_students())
+        assert ((vectors[0] - vectors[1]) ** 2).sum() == pytest.approx(
+            1 - 0.5 ** 0.5)
+
+    def test_group_sizes(self):
+        course_, survey_ = make_course(50, 45)
+        grouping = cluster.ClusterGrouper(4).make_grouping(course_, survey_)
+        assert group_sizes(grouping) == [2] + [4] * 12
+        assert sorted(id_ for ids in member_ids(grouping) for id_ in ids) == \
+            sorted(s.id for s in course_.get_students())
+
+    def test_similar_answers_grouped(self):
+        question = survey.MultipleChoiceQuestion(1, 'why?', ['a', 'b', 'c'])
+        survey_ = survey.Survey([question])
+        course_ = answered_course(question, list('abcabcabcabc'))
+        grouping = cluster.ClusterGrouper(4).make_grouping(course_, survey_)
+        for group in grouping.get_groups():
+            assert len({s.get_answer(question).content
+                        for s in group.get_members()}) == 1
+
+    def test_different_answers_spread(self):
+        question = survey.NumericQuestion(1, 'what?', 0, 10)
+        survey_ = survey.Survey([question])
+        survey_.set_criterion(criterion.HeterogeneousCriterion(), question)
+        course_ = answered_course(question, [0, 3, 7, 10] * 4 + [5])
+        grouping = cluster.ClusterGrouper(4).make_grouping(course_, survey_)
+        assert group_sizes(grouping) == [1, 4, 4, 4, 4]
+        for group in grouping.get_groups():
+            if len(group) == 4:
+                assert sorted(s.get_answer(question).content
+                              for s in group.get_members()) == [0, 3, 7, 10]
+
+    def test_better_than_random(self):
+        course_, survey_ = make_course(200, 46)
+        random.seed(46)
+        clustered = cluster.ClusterGrouper(4).make_grouping(course_, survey_)
+        randomly = grouper.RandomGrouper(4).make_grouping(course_, survey_)
+        assert survey_.score_grouping(clustered) > \
+            survey_.score_grouping(randomly)
+
+    def test_found_by_name(self):
+        assert grouper.find_grouper('ClusterGrouper') is cluster.ClusterGrouper
+        assert grouper.find_grouper('GreedyGrouper') is grouper.GreedyGrouper
+        for name in ['NoSuchGrouper', 'Grouping', 'slice_list']:
+            with pytest.raises(AttributeError):
+                grouper.find_grouper(name)
+        course_, survey_ = make_course(12, 47)
+        results = example_usage.run_groupers((course_, survey_, survey_),
+                                             ['ClusterGrouper'], [4])
+        grouping = cluster.ClusterGrouper(4).make_grouping(course_, survey_)
+        assert results[0]['groups'] == member_ids(grouping)
+        results = benchmark.benchmark(['ClusterGrouper'], [20],
+                                      measure_memory=False)
+        assert results[0]['grouper'] == 'ClusterGrouper'
+
+
 
 
 if __name__ == '__main__':